@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试共用的 fixture
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _wait_until(condition, timeout=5.0):
+    """轮询等待条件成立，超时则测试失败"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def wait_until():
+    return _wait_until
+
+
+@pytest.fixture
+def config_manager(tmp_path):
+    """临时目录中的默认配置，缓存也写在临时目录中"""
+    from src.music_generator.config.config_manager import ConfigManager
+    manager = ConfigManager(str(tmp_path / "config.ini"))
+    manager.config.set("cache", "dir", str(tmp_path / "cache"))
+    return manager
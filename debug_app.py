@@ -7,6 +7,7 @@
 import os
 import sys
 import logging
+import subprocess
 from datetime import datetime
 
 # 添加项目路径
@@ -40,12 +41,68 @@ def debug_info():
     print("="*60)
 
 
+# 窗口显示前需要导入的模块（入口 + 界面）
+STARTUP_MODULES = ("src.music_generator.main", "src.music_generator.gui.main_window")
+
+
+def import_time_report(modules=STARTUP_MODULES, top=20):
+    """
+    导入耗时分析（相当于 python -X importtime）
+    在全新的子进程中导入模块，按累计耗时列出最慢的模块
+    """
+    print("="*60)
+    print(f"📦 导入耗时分析: {', '.join(modules)}")
+    print("="*60)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    
+    # 每行格式: "import time: self [us] | cumulative | imported package"
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+        except ValueError:
+            continue
+    
+    if result.returncode != 0 or not entries:
+        print(f"导入失败: {result.stderr.strip().splitlines()[-1:] or '无输出'}")
+        return entries
+    
+    # 顶层模块（名称无缩进）的累计耗时之和即总导入耗时
+    total_us = sum(cumulative for cumulative, _, name in entries if not name.startswith("  "))
+    print(f"总导入耗时: {total_us / 1000:.1f} ms，共 {len(entries)} 个模块")
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for cumulative, self_us, name in sorted(entries, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+    
+    heavy = [name for name in ("numpy", "soundfile", "scipy", "torch", "modelscope", "transformers")
+             if any(entry[2].strip() == name for entry in entries)]
+    if heavy:
+        print(f"⚠️ 启动时导入了重量级模块: {', '.join(heavy)}")
+    else:
+        print("✅ 启动路径未导入重量级模块（numpy/soundfile/torch/modelscope 等延迟加载）")
+    print("="*60)
+    return entries
+
+
 def main():
     """调试主函数"""
+    if "--importtime" in sys.argv:
+        # 只输出导入耗时分析，不启动应用
+        import_time_report()
+        return
+    
     print("启动音乐生成器调试模式...")
     
     # 显示调试信息
     debug_info()
+    import_time_report(top=10)
     
     # 初始化日志
     print("\n初始化日志系统...")
@@ -55,6 +112,7 @@ def main():
     print(f"日志文件位置: {log_file}")
     print("\n即将启动音乐生成器应用...")
     print("提示：应用运行后，您可以使用 'view_logs.py' 查看日志")
+    print("提示：窗口首次绘制耗时会记录在日志中（\"窗口首次绘制耗时\"）")
     print("或者在应用界面中点击 '查看日志' 按钮")
     
     try:
@@ -0,0 +1,255 @@
+"""
+DiffRhythm谛韵音乐生成器 - 端到端基准测试
+分阶段测量：冷启动导入、模型初始化、单条推理延迟（p50/p95）、后处理和各格式编码耗时以及峰值内存，
+结果输出为JSON，便于跨版本比较、发现性能回退
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .config.config_manager import ConfigManager
+from .models.backends import StubBackend
+from .models.modelscope_client import ModelScopeClient
+from .models.resolution_cache import get_library_version
+from .utils.audio_processor import AudioProcessor
+from .utils.audio_stream import as_float32, as_frames
+from .utils.resource_usage import current_rss_bytes, peak_rss_bytes
+
+DEFAULT_PROMPTS = [
+    "舒缓的钢琴曲，古风纯音乐",
+    "欢快的电子音乐，节拍强劲",
+    "轻柔的吉他独奏，乡村风格",
+    "激昂的交响乐，史诗感",
+    "宁静的冥想音乐，自然声音",
+]
+# 比较基线时，数值越小越好的指标
+LOWER_IS_BETTER = ("_ms", "_bytes")
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """计算延迟统计（毫秒）"""
+    ordered = sorted(samples_ms)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(percentile(50), 3),
+        "p95_ms": round(percentile(95), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def bench_cold_import(module: str, repeat: int) -> Dict[str, Any]:
+    """在全新的子进程中测量导入模块的耗时"""
+    src_dir = str(Path(__file__).resolve().parent.parent)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src_dir, os.environ.get("PYTHONPATH")])))
+    code = (f"import time; t = time.perf_counter(); import {module}; "
+            f"print((time.perf_counter() - t) * 1000)")
+    import_ms, process_ms = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+        process_ms.append((time.perf_counter() - started) * 1000)
+        if output.returncode != 0:
+            return {"error": output.stderr.strip().splitlines()[-1:]}
+        import_ms.append(float(output.stdout.strip()))
+    return {"import": summarize(import_ms), "process": summarize(process_ms)}
+
+
+def bench_initialize(client: ModelScopeClient) -> Dict[str, Any]:
+    started = time.perf_counter()
+    client.get_pipeline()
+    return {"initialize_ms": round((time.perf_counter() - started) * 1000, 3), "rss_bytes": current_rss_bytes()}
+
+
+def bench_inference(client: ModelScopeClient, prompts: List[str], iterations: int):
+    """逐条推理（绕过结果缓存），返回延迟统计和最后一条结果"""
+    samples, result = [], None
+    for i in range(iterations):
+        started = time.perf_counter()
+        result = client.run_inference(prompts[i % len(prompts)])
+        samples.append((time.perf_counter() - started) * 1000)
+    stats = summarize(samples)
+    stats["rss_bytes"] = current_rss_bytes()
+    return stats, result
+
+
+def bench_post_process(audio_processor: AudioProcessor, audio, sample_rate: int, repeat: int) -> Dict[str, Any]:
+    """测量后处理链（归一化、裁剪静音、淡入淡出、重采样）的耗时，每次处理一份新副本
+
+    正式计时前先不计时地执行一次，排除首次调用时的延迟导入和滤波器设计等一次性开销。
+    """
+    import numpy as np
+    audio_processor.post_process(np.array(as_float32(audio)), sample_rate)
+    samples = []
+    for _ in range(repeat):
+        copy = np.array(as_float32(audio))
+        started = time.perf_counter()
+        audio_processor.post_process(copy, sample_rate)
+        samples.append((time.perf_counter() - started) * 1000)
+    stats = summarize(samples)
+    stats["stages"] = [stage.name for stage in audio_processor.post_processing.stages]
+    return stats
+
+
+def bench_encode(audio_processor: AudioProcessor, audio, sample_rate: int, formats: List[str],
+                 repeat: int) -> Dict[str, Any]:
+    """测量各编码器的编码耗时、文件大小和吞吐
+    
+    realtime_factor 为音频秒数/实际秒数，throughput_mb_s 为每秒编码的原始PCM（32位浮点）数据量。
+    每种格式正式计时前先不计时地编码一次（首次调用会加载编码库）。
+    """
+    frames = as_frames(audio)
+    audio_seconds = len(frames) / sample_rate
+    pcm_mb = frames.size * 4 / (1024 * 1024)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for audio_format in formats:
+            path = os.path.join(tmp_dir, f"bench.{audio_format}")
+            samples = []
+            try:
+                encoder = audio_processor.encoders.get(audio_format)
+                audio_processor.save_audio(audio, path, sample_rate)
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    audio_processor.save_audio(audio, path, sample_rate)
+                    samples.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                results[audio_format] = {"error": str(e)}
+                continue
+            stats = summarize(samples)
+            stats["file_bytes"] = os.path.getsize(path)
+            stats["realtime_factor"] = round(audio_seconds / (stats["p50_ms"] / 1000), 1) if stats["p50_ms"] else None
+            stats["throughput_mb_s"] = round(pcm_mb / (stats["p50_ms"] / 1000), 1) if stats["p50_ms"] else None
+            stats["encoder"] = encoder.backend
+            results[audio_format] = stats
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, prefix: str = "") -> List[str]:
+    """与基线比较，返回变慢/变大超过阈值的指标"""
+    regressions = []
+    for key, value in current.items():
+        name = f"{prefix}{key}"
+        base = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            regressions.extend(compare(value, base or {}, threshold, name + "."))
+        elif (isinstance(value, (int, float)) and isinstance(base, (int, float)) and base > 0
+              and key.endswith(LOWER_IS_BETTER) and value > base * (1 + threshold)):
+            regressions.append(f"{name}: {base} -> {value} (+{(value / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    config_manager = ConfigManager(args.config)
+    backend = None
+    if args.backend == "stub":
+        backend = StubBackend(duration_s=args.stub_duration, latency_s=args.stub_latency,
+                              sample_rate=args.sample_rate)
+    client = ModelScopeClient(config_manager, inference_mode="thread", backend=backend)
+    client.result_cache = None  # 只测量真实推理
+    audio_processor = AudioProcessor.from_config(config_manager)
+
+    report: Dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "app_version": get_library_version("diyun-music-generator"),
+            "libraries": {name: get_library_version(name)
+                          for name in ("modelscope", "torch", "numpy", "soundfile")},
+            "encoders": audio_processor.encoders.describe(),
+            "bitrate_kbps": audio_processor.bitrate_kbps,
+        },
+        "backend": client.backend.name,
+        "stages": {},
+    }
+    stages = report["stages"]
+
+    if not args.skip_import:
+        logging.info("测量冷启动导入耗时...")
+        stages["cold_import"] = {module: bench_cold_import(module, args.import_repeat)
+                                 for module in ("music_generator.main", "music_generator.cli")}
+
+    logging.info("测量模型初始化耗时...")
+    stages["initialize"] = bench_initialize(client)
+
+    logging.info(f"测量推理延迟（{args.iterations} 次）...")
+    stages["inference"], result = bench_inference(client, DEFAULT_PROMPTS, args.iterations)
+
+    sample_rate = int(result.get("sample_rate", args.sample_rate))
+    logging.info("测量后处理耗时...")
+    stages["post_process"] = bench_post_process(audio_processor, result["output_audio"], sample_rate,
+                                                args.encode_repeat)
+
+    logging.info("测量编码耗时...")
+    stages["encode"] = bench_encode(audio_processor, result["output_audio"], sample_rate,
+                                    args.formats, args.encode_repeat)
+
+    report["peak_rss_bytes"] = peak_rss_bytes()
+    client.shutdown()
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="diyun-music-bench", description="DiffRhythm谛韵音乐生成器 - 基准测试")
+    parser.add_argument("--backend", choices=["stub", "config"], default="stub",
+                        help="stub: 离线模拟管道（默认）；config: 使用配置文件中的后端（真实模型）")
+    parser.add_argument("--config", default="config/config.ini", help="配置文件路径")
+    parser.add_argument("-n", "--iterations", type=int, default=10, help="推理次数")
+    parser.add_argument("--formats", default="wav,flac,ogg,mp3", help="要测量的编码格式，逗号分隔")
+    parser.add_argument("--encode-repeat", type=int, default=3, help="每种格式的编码次数")
+    parser.add_argument("--import-repeat", type=int, default=3, help="冷启动导入测量次数")
+    parser.add_argument("--skip-import", action="store_true", help="跳过冷启动导入测量")
+    parser.add_argument("--stub-duration", type=float, default=30.0, help="模拟管道生成的音频时长（秒）")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="模拟管道的推理耗时（秒）")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="模拟管道的采样率")
+    parser.add_argument("-o", "--output", help="结果JSON文件路径（默认输出到标准输出）")
+    parser.add_argument("--baseline", help="基线结果JSON，与之比较并报告性能回退")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对阈值（默认 0.2 即 20%%）")
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    """基准测试入口"""
+    args = build_parser().parse_args(argv)
+    args.formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    # 基准测试期间只保留进度信息，避免大量日志影响计时
+    logging.getLogger("music_generator").setLevel(logging.WARNING)
+
+    report = run_benchmark(args)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+        logging.info(f"基准测试结果已保存到: {args.output}")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["stages"], baseline.get("stages", {}), args.threshold)
+        if regressions:
+            logging.warning("⚠️ 发现性能回退:\n  " + "\n  ".join(regressions))
+            return 1
+        logging.info("✅ 未发现超过阈值的性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+DiffRhythm谛韵音乐生成器 - 无界面批量生成入口
+从 JSONL 文件或标准输入读取提示词，生成音频文件和结果清单，无需图形界面
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Set
+
+from .config.config_manager import ConfigManager
+from .models.modelscope_client import ModelScopeClient
+from .utils.audio_buffer import audio_from_result
+from .utils.audio_processor import AudioProcessor
+from .utils.job_scheduler import JobScheduler, JobStatus
+from .utils.logging_config import setup_logging
+
+MANIFEST_NAME = "manifest.jsonl"
+# 任务ID直接用作输出文件名，不能包含路径分隔符或 Windows 文件名中的非法字符
+INVALID_ID_CHARS = set('/\\:*?"<>|')
+
+
+def _invalid_id_reason(job_id: str) -> Optional[str]:
+    """任务ID不能安全地用作文件名时返回原因"""
+    if not job_id.strip() or job_id in (".", "..") or ".." in job_id:
+        return "为空或包含 .."
+    if any(ch in INVALID_ID_CHARS or ord(ch) < 32 for ch in job_id):
+        return "包含路径分隔符或文件名非法字符"
+    return None
+
+
+def iter_requests(stream) -> Iterator[Dict[str, Any]]:
+    """逐行解析输入
+
+    每行可以是 JSON 对象（{"id", "prompt", "seed", "params"}）、JSON 字符串或纯文本提示词；
+    未指定 id 时使用行号。id 用作输出文件名，包含路径分隔符或 .. 的行会被跳过（防止写到输出目录之外）；
+    params 必须是对象（null 视为未指定）。
+    """
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = line
+        if isinstance(item, str):
+            item = {"prompt": item}
+        if not isinstance(item, dict) or not str(item.get("prompt", "")).strip():
+            logging.warning(f"第 {line_no} 行缺少提示词，已跳过")
+            continue
+        item.setdefault("id", f"{line_no:06d}")
+        item["id"] = str(item["id"])
+        reason = _invalid_id_reason(item["id"])
+        if reason:
+            logging.warning(f"第 {line_no} 行的 id {item['id']!r} {reason}，已跳过")
+            continue
+        if item.get("params") is None:
+            item["params"] = {}
+        elif not isinstance(item["params"], dict):
+            logging.warning(f"第 {line_no} 行的 params 不是对象，已跳过")
+            continue
+        yield item
+
+
+def load_completed_ids(manifest_path: Path, output_dir: Path) -> Set[str]:
+    """读取已有清单，返回已成功生成且文件仍存在的任务ID"""
+    completed = set()
+    if not manifest_path.exists():
+        return completed
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # 中断时可能写了半行
+            if entry.get("status") == JobStatus.DONE and (output_dir / entry.get("file", "")).is_file():
+                completed.add(str(entry["id"]))
+    return completed
+
+
+class BatchRunner:
+    """批量生成：提交到任务调度器并发执行，结果流式写入输出目录和清单"""
+
+    def __init__(self, client: ModelScopeClient, audio_processor: AudioProcessor, output_dir: Path,
+                 audio_format: str = "wav", workers: int = 1, resume: bool = False):
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self.audio_processor = audio_processor
+        self.output_dir = output_dir
+        self.audio_format = audio_format
+        self.resume = resume
+        # 控制同时在队列中和执行中的任务数，读取输入时形成背压
+        max_pending = workers * 3
+        self.scheduler = JobScheduler(workers=workers, max_queue=max_pending, name="batch")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._manifest_lock = threading.Lock()
+        self._manifest = None
+        self.counts = {"done": 0, "failed": 0, "skipped": 0}
+
+    def _generate(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = self.client.generate_music(item["prompt"], seed=item.get("seed"), **item.get("params", {}))
+        file_name = f"{item['id']}.{self.audio_format}"
+        audio = self.audio_processor.post_process(audio_from_result(result))
+        self.audio_processor.save_audio(audio, str(self.output_dir / file_name))
+        return {"file": file_name, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    def _on_done(self, item: Dict[str, Any], job):
+        entry = {"id": item["id"], "prompt": item["prompt"], "status": job.status, "job_id": job.job_id}
+        if job.status == JobStatus.DONE:
+            entry.update(job.result)
+        else:
+            entry["error"] = str(job.error) if job.error else job.status
+        try:
+            with self._manifest_lock:
+                self.counts["done" if job.status == JobStatus.DONE else "failed"] += 1
+                self._manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._manifest.flush()
+        finally:
+            self._slots.release()
+
+    def run(self, stream) -> Dict[str, int]:
+        """执行批量生成，返回完成/失败/跳过数量"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.output_dir / MANIFEST_NAME
+        completed = load_completed_ids(manifest_path, self.output_dir) if self.resume else set()
+        if completed:
+            self.logger.info(f"断点续跑：跳过已完成的 {len(completed)} 个任务")
+
+        self._manifest = open(manifest_path, "a" if self.resume else "w", encoding="utf-8")
+        jobs = []
+        try:
+            for item in iter_requests(stream):
+                if item["id"] in completed:
+                    self.counts["skipped"] += 1
+                    continue
+                self._slots.acquire()
+                job = self.scheduler.submit(self._generate, item)
+                job.add_done_callback(lambda finished, item=item: self._on_done(item, finished))
+                jobs.append(job)
+            for job in jobs:
+                job.wait()
+        finally:
+            self.scheduler.shutdown(wait=True)
+            self._manifest.close()
+        return dict(self.counts)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="diyun-music-cli",
+        description="DiffRhythm谛韵音乐生成器 - 无界面批量生成")
+    parser.add_argument("-i", "--input", default="-",
+                        help="提示词文件（JSONL，每行一个请求），'-' 表示从标准输入读取（默认）")
+    parser.add_argument("-o", "--output-dir", required=True, help="音频文件和 manifest.jsonl 的输出目录")
+    parser.add_argument("-f", "--format", default="wav", help="输出音频格式（文件扩展名），默认 wav")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="并发推理任务数，默认使用配置 [scheduler] workers")
+    parser.add_argument("--resume", action="store_true", help="断点续跑：跳过清单中已成功生成的任务")
+    parser.add_argument("--config", default="config/config.ini", help="配置文件路径")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出调试日志")
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    """无界面批量生成入口"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    setup_logging(logging.DEBUG if args.verbose else logging.INFO, config_file=args.config)
+
+    config_manager = ConfigManager(args.config)
+    audio_processor = AudioProcessor.from_config(config_manager)
+    # 在加载模型、开始推理之前检查输出格式，而不是每个任务都在保存时失败
+    audio_format = args.format.lower().lstrip(".")
+    if not audio_processor.encoders.supports(audio_format):
+        parser.error(f"不支持的输出格式: {args.format}，可用格式: {', '.join(audio_processor.encoders.available())}")
+    workers = args.workers or int(config_manager.get_value("scheduler", "workers", "1"))
+    client = ModelScopeClient(config_manager)
+    runner = BatchRunner(client, audio_processor, Path(os.path.expanduser(args.output_dir)),
+                         audio_format=audio_format, workers=max(1, workers), resume=args.resume)
+    try:
+        if args.input == "-":
+            counts = runner.run(sys.stdin)
+        else:
+            with open(args.input, "r", encoding="utf-8") as f:
+                counts = runner.run(f)
+    except KeyboardInterrupt:
+        logging.info("用户中断批量生成，可使用 --resume 继续")
+        return 130
+    finally:
+        client.shutdown()
+
+    logging.info(f"批量生成结束: 成功 {counts['done']}，失败 {counts['failed']}，跳过 {counts['skipped']}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -34,13 +34,53 @@ class ConfigManager:
             'token': '',
             'model_id': 'damo/text-to-music-synthesis',  # 更新为实际使用的模型ID
             'device': 'cpu',
-            'model_revision': 'v1.0.0'
+            'model_revision': 'v1.0.0',
+            'backend': 'modelscope',
+            'inference_mode': 'thread',
+            'process_workers': '1',
+            'worker_max_jobs': '20',
+            'worker_max_rss_mb': '0'
         }
         
         self.config['app'] = {
             'default_save_path': os.path.join('~', 'Desktop', 'DiffRhythm生成音乐.mp3'),
             'window_width': '650',
-            'window_height': '320'
+            'window_height': '460',
+            'warmup': 'false',
+            'spectrogram': 'false'
+        }
+        
+        self.config['scheduler'] = {
+            'workers': '1',
+            'max_queue': '4'
+        }
+        
+        self.config['cache'] = {
+            'dir': 'cache',
+            'result_cache': 'true',
+            'result_cache_max_mb': '1024'
+        }
+        
+        self.config['audio'] = {
+            'bitrate_kbps': '192',
+            'sample_rate': '0',
+            'normalize': 'lufs',
+            'target_lufs': '-14',
+            'peak_db': '-1',
+            'trim_silence': 'true',
+            'silence_threshold_db': '-60',
+            'fade_in_ms': '10',
+            'fade_out_ms': '500'
+        }
+        
+        self.config['logging'] = {
+            'format': 'text',
+            'max_file_mb': '10',
+            'rotate_hours': '24',
+            'max_files': '20',
+            'max_total_mb': '200',
+            'max_age_days': '30',
+            'compress': 'true'
         }
         
         # 保存配置文件
@@ -55,6 +95,14 @@ class ConfigManager:
         self.logger.debug(f"获取配置值 - [{section}]{key} = {value}")
         return value
         
+    def get_bool(self, section: str, key: str, fallback: bool = False) -> bool:
+        """获取布尔类型的配置值"""
+        try:
+            return self.config.getboolean(section, key, fallback=fallback)
+        except ValueError:
+            self.logger.warning(f"⚠️ 配置值无法解析为布尔值 - [{section}]{key}，使用默认值 {fallback}")
+            return fallback
+        
     def set_value(self, section: str, key: str, value: str):
         """设置配置值"""
         self.logger.debug(f"设置配置值 - [{section}]{key} = {value}")
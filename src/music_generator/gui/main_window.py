@@ -1,29 +1,81 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import threading
 import os
 import logging
+import threading
+import time
 from pathlib import Path
+from typing import Optional
 from ..config.config_manager import ConfigManager
 from ..models.modelscope_client import ModelScopeClient
+from ..utils.audio_buffer import AudioBuffer, audio_from_result
+from ..utils.audio_player import PlaybackState
 from ..utils.audio_processor import AudioProcessor
+from ..utils.job_scheduler import JobScheduler, QueueFullError
+from ..utils.waveform import peak_pyramid, spectrogram, spectrogram_ppm
 
 
 class MainWindow:
     """主窗口类"""
     
-    def __init__(self):
+    # 窗口显示后在后台预先导入的重量级模块
+    BACKGROUND_IMPORTS = ("numpy", "soundfile", "scipy.signal")
+    # 频谱缩略图尺寸（像素）
+    SPECTROGRAM_SIZE = (600, 64)
+    
+    def __init__(self, started_at: Optional[float] = None):
         self.logger = logging.getLogger(__name__)
         self.logger.info("初始化主窗口")
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.time_to_first_paint_ms: Optional[float] = None
         self.root = tk.Tk()
         self.config_manager = ConfigManager()
         self.model_client = ModelScopeClient(self.config_manager)
-        self.audio_processor = AudioProcessor()  # 初始化音频处理器
+        self.audio_processor = AudioProcessor.from_config(self.config_manager)  # 初始化音频处理器
         self.current_audio = None
+        self._playback_polling = False
+        self._seeking = False
+        # 波形预览：当前音频的峰值金字塔和显示范围（帧）
+        self._waveform = None
+        self._view = (0, 0)
+        self._spectrogram_image = None
+        
+        # 生成任务队列：有界队列 + 固定数量的推理线程
+        self.scheduler = JobScheduler(
+            workers=int(self.config_manager.get_value("scheduler", "workers", "1")),
+            max_queue=int(self.config_manager.get_value("scheduler", "max_queue", "4")),
+        )
         
         self.setup_ui()
         self.load_configs()
         
+        # 窗口绘制完成后再加载重量级模块
+        self.root.after_idle(self._on_first_paint)
+        
+        # 可选：窗口创建完成后立即在后台预热模型
+        if self.config_manager.get_bool("app", "warmup", False):
+            self.start_warmup()
+        
+    def _on_first_paint(self):
+        """记录首次绘制耗时，并在后台线程中预先导入重量级模块、探测音频编码器"""
+        self.root.update_idletasks()
+        self.time_to_first_paint_ms = (time.perf_counter() - self.started_at) * 1000
+        self.logger.info(f"窗口首次绘制耗时: {self.time_to_first_paint_ms:.0f} ms")
+        
+        def preload():
+            import importlib
+            for module in self.BACKGROUND_IMPORTS:
+                started = time.perf_counter()
+                try:
+                    importlib.import_module(module)
+                    self.logger.debug(f"后台导入 {module} 耗时: {(time.perf_counter() - started) * 1000:.0f} ms")
+                except ImportError as e:
+                    self.logger.warning(f"⚠️ 后台导入 {module} 失败: {e}")
+            # 探测可用的音频编码器，首次保存时无需再等待
+            self.audio_processor.encoders
+        
+        threading.Thread(target=preload, name="background-imports", daemon=True).start()
+        
     def setup_ui(self):
         """设置用户界面"""
         self.logger.info("设置用户界面")
@@ -31,7 +83,7 @@ class MainWindow:
         
         # 从配置获取窗口尺寸
         width = int(self.config_manager.get_value("app", "window_width", "650"))
-        height = int(self.config_manager.get_value("app", "window_height", "320"))
+        height = int(self.config_manager.get_value("app", "window_height", "460"))
         
         # 设置窗口居中
         screen_width = self.root.winfo_screenwidth()
@@ -87,6 +139,38 @@ class MainWindow:
                               foreground="gray", font=("微软雅黑", 9))
         info_label.grid(row=4, column=0, columnspan=4, pady=(20, 0))
         
+        # 状态标签（显示模型预热等状态）
+        self.status_var = tk.StringVar(value="")
+        status_label = ttk.Label(main_frame, textvariable=self.status_var,
+                                 foreground="gray", font=("微软雅黑", 9))
+        status_label.grid(row=5, column=0, columnspan=4, pady=(5, 0))
+        
+        # 播放控制：暂停/继续、停止、进度条（拖动跳转）
+        self.btn_pause = ttk.Button(main_frame, text="暂停", command=self.toggle_pause, state=tk.DISABLED)
+        self.btn_pause.grid(row=3, column=2, pady=10)
+        self.btn_stop = ttk.Button(main_frame, text="停止", command=self.stop_playback, state=tk.DISABLED)
+        self.btn_stop.grid(row=3, column=3, pady=10)
+        self.seek_var = tk.DoubleVar(value=0)
+        self.seek_scale = ttk.Scale(main_frame, from_=0, to=1, variable=self.seek_var, orient=tk.HORIZONTAL)
+        self.seek_scale.grid(row=6, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.seek_scale.bind("<ButtonPress-1>", self._on_seek_start)
+        self.seek_scale.bind("<ButtonRelease-1>", self._on_seek_end)
+        
+        # 波形预览：滚轮缩放，双击还原，单击跳转播放位置
+        self.waveform_canvas = tk.Canvas(main_frame, height=80, background="#1e1e1e", highlightthickness=0)
+        self.waveform_canvas.grid(row=7, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.waveform_canvas.bind("<Configure>", lambda event: self._draw_waveform())
+        self.waveform_canvas.bind("<MouseWheel>", lambda event: self._zoom_waveform(event.x, event.delta > 0))
+        self.waveform_canvas.bind("<Button-4>", lambda event: self._zoom_waveform(event.x, True))
+        self.waveform_canvas.bind("<Button-5>", lambda event: self._zoom_waveform(event.x, False))
+        self.waveform_canvas.bind("<Double-Button-1>", lambda event: self._reset_waveform_zoom())
+        self.waveform_canvas.bind("<Button-1>", self._on_waveform_click)
+        
+        # 可选：频谱缩略图
+        self.spectrogram_label = ttk.Label(main_frame)
+        if self.config_manager.get_bool("app", "spectrogram", False):
+            self.spectrogram_label.grid(row=8, column=0, columnspan=4, pady=(5, 0))
+        
         # 绑定回车键到生成音乐
         self.root.bind('<Return>', lambda event: self.generate_music_threaded())
         
@@ -109,11 +193,27 @@ class MainWindow:
         self.entry_prompt.delete(0, tk.END)
         self.entry_prompt.insert(0, random.choice(examples))
         
+    def start_warmup(self):
+        """启动模型后台预热，并在状态栏显示预热进度"""
+        self.logger.info("启动模型后台预热")
+        state_texts = {
+            "loading": "⏳ 模型预热中...（可直接点击生成，将等待预热完成）",
+            "ready": "✅ 模型已就绪",
+            "failed": "⚠️ 模型预热失败，将在生成时重试",
+        }
+        
+        def on_state_change(state):
+            text = state_texts.get(state, "")
+            self.root.after(0, lambda: self.status_var.set(text))
+        
+        self.model_client.start_warmup(on_state_change)
+        
     def view_logs(self):
         """查看日志文件"""
         self.logger.info("打开日志查看器")
         try:
-            from ..utils.logging_config import get_existing_logs, read_log_file
+            from ..utils.logging_config import follow_log_file, get_existing_logs, tail_log_file
+            from ..utils.log_index import LogIndex, format_entries, parse_time
             
             # 获取日志文件列表
             log_files = get_existing_logs()
@@ -145,6 +245,23 @@ class MainWindow:
             log_combo.pack(pady=5)
             log_combo.current(0)  # 默认选中第一个（最新的）
             
+            # 检索栏：按最低级别、时间范围（如 2024-01-01 12:00）和关键字跨所有日志文件检索
+            search_frame = ttk.Frame(logs_window)
+            search_frame.pack(fill=tk.X, padx=10)
+            levels = ["全部", "DEBUG", "INFO", "WARNING", "ERROR"]
+            level_var = tk.StringVar(value=levels[0])
+            start_var, end_var, keyword_var = tk.StringVar(), tk.StringVar(), tk.StringVar()
+            ttk.Label(search_frame, text="级别≥").pack(side=tk.LEFT)
+            ttk.Combobox(search_frame, textvariable=level_var, values=levels, state="readonly",
+                         width=8).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Label(search_frame, text="从").pack(side=tk.LEFT)
+            ttk.Entry(search_frame, textvariable=start_var, width=16).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Label(search_frame, text="到").pack(side=tk.LEFT)
+            ttk.Entry(search_frame, textvariable=end_var, width=16).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Label(search_frame, text="关键字").pack(side=tk.LEFT)
+            keyword_entry = ttk.Entry(search_frame, textvariable=keyword_var, width=14)
+            keyword_entry.pack(side=tk.LEFT, padx=(0, 5))
+            
             # 创建文本框显示日志内容
             text_frame = ttk.Frame(logs_window)
             text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -156,41 +273,88 @@ class MainWindow:
             text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
             scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
             
+            # 当前显示的日志文件及已读取到的位置，刷新时只读取之后新追加的内容
+            current = {"log": None, "offset": 0}
+            
+            def show_log(selected_log):
+                text_widget.config(state=tk.NORMAL)
+                text_widget.delete(1.0, tk.END)
+                try:
+                    log_content, current["offset"] = tail_log_file(selected_log)
+                except Exception as e:
+                    log_content, current["offset"] = [f"无法读取日志文件: {str(e)}"], 0
+                current["log"] = selected_log
+                text_widget.insert(tk.END, ''.join(log_content))
+                text_widget.config(state=tk.DISABLED)  # 设置为只读
+            
             # 显示默认日志内容
-            selected_log = log_files[0]
-            log_content = read_log_file(selected_log)
-            text_widget.insert(tk.END, ''.join(log_content))
-            text_widget.config(state=tk.DISABLED)  # 设置为只读
+            show_log(log_files[0])
             
             # 下拉框事件处理
             def on_log_selected(event):
-                text_widget.config(state=tk.NORMAL)
-                text_widget.delete(1.0, tk.END)
-                
                 selected_name = log_var.get()
                 selected_log = next((f for f in log_files if f.name == selected_name), None)
-                
                 if selected_log:
-                    log_content = read_log_file(selected_log)
-                    text_widget.insert(tk.END, ''.join(log_content))
-                
-                text_widget.config(state=tk.DISABLED)
+                    show_log(selected_log)
             
             log_combo.bind("<<ComboboxSelected>>", on_log_selected)
             
-            # 刷新按钮
+            # 刷新按钮：追加新写入的日志行
             def refresh_logs():
+                if current["log"] is None:
+                    return
+                try:
+                    new_lines, current["offset"] = follow_log_file(current["log"], current["offset"])
+                except Exception as e:
+                    self.logger.warning(f"⚠️ 刷新日志失败: {e}")
+                    return
+                if new_lines:
+                    text_widget.config(state=tk.NORMAL)
+                    text_widget.insert(tk.END, ''.join(new_lines))
+                    text_widget.config(state=tk.DISABLED)
+                    text_widget.see(tk.END)
+            
+            # 索引保存在 logs/.index 中，每次检索只解析新追加的日志
+            log_index = LogIndex()
+            
+            def show_search_result(content):
+                search_btn.config(state=tk.NORMAL)
+                # 显示检索结果时刷新按钮不再追加当前文件的内容
+                current["log"] = None
                 text_widget.config(state=tk.NORMAL)
                 text_widget.delete(1.0, tk.END)
+                text_widget.insert(tk.END, content)
+                text_widget.config(state=tk.DISABLED)
+                text_widget.see(tk.END)
+            
+            def search_logs(event=None):
+                if str(search_btn["state"]) == tk.DISABLED:
+                    return  # 上一次检索尚未完成
+                try:
+                    start, end = parse_time(start_var.get()), parse_time(end_var.get())
+                except ValueError as e:
+                    messagebox.showwarning("时间格式", str(e), parent=logs_window)
+                    return
+                level = level_var.get()
+                min_level = 0 if level == levels[0] else getattr(logging, level)
+                text = keyword_var.get().strip() or None
+                search_btn.config(state=tk.DISABLED)
                 
-                selected_name = log_var.get()
-                selected_log = next((f for f in log_files if f.name == selected_name), None)
-                
-                if selected_log:
-                    log_content = read_log_file(selected_log)
-                    text_widget.insert(tk.END, ''.join(log_content))
+                # 更新索引和读取记录可能较慢（大文件、压缩日志），在后台线程中执行，结果回到主线程显示
+                def worker():
+                    try:
+                        entries = log_index.search(min_level=min_level, start=start, end=end, text=text)
+                        content = format_entries(entries) if entries else "没有符合条件的日志记录"
+                    except Exception as e:
+                        self.logger.warning(f"⚠️ 检索日志失败: {e}")
+                        content = f"检索日志失败: {e}"
+                    self.root.after(0, lambda: logs_window.winfo_exists() and show_search_result(content))
                 
-                text_widget.config(state=tk.DISABLED)
+                threading.Thread(target=worker, name="log-search", daemon=True).start()
+            
+            keyword_entry.bind("<Return>", search_logs)
+            search_btn = ttk.Button(search_frame, text="检索", command=search_logs)
+            search_btn.pack(side=tk.LEFT)
             
             refresh_btn = ttk.Button(logs_window, text="刷新", command=refresh_logs)
             refresh_btn.pack(pady=5)
@@ -203,43 +367,76 @@ class MainWindow:
             self.logger.error(f"查看日志时出错: {e}")
             messagebox.showerror("错误", f"查看日志时出错: {str(e)}")
         
-    def generate_music_threaded(self):
-        """在线程中生成音乐，防止UI冻结"""
-        self.logger.info("启动音乐生成线程")
-        threading.Thread(target=self.generate_music, daemon=True).start()
-        
-    def generate_music(self):
-        """生成音乐的核心函数"""
-        self.logger.info("开始生成音乐")
+    def _get_prompt(self):
+        """读取并校验音乐描述，未输入时提示用户并返回None"""
         prompt = self.entry_prompt.get().strip()
         if not prompt or prompt == "例如：舒缓的钢琴曲，古风纯音乐":
             self.logger.warning("用户未输入音乐描述")
             messagebox.showwarning("提示", "请输入音乐描述（比如：舒缓的钢琴曲，古风纯音乐）！")
+            return None
+        return prompt
+        
+    def generate_music_threaded(self):
+        """将生成任务提交到任务队列，防止UI冻结"""
+        prompt = self._get_prompt()
+        if prompt is None:
+            return
+        try:
+            job = self.scheduler.submit(self.generate_music, prompt)
+        except QueueFullError as e:
+            self.logger.warning(f"生成任务被拒绝: {e}")
+            messagebox.showwarning("提示", f"{e}")
             return
+        self.logger.info(f"已提交音乐生成任务: {job.job_id}")
+        job.add_done_callback(lambda _job: self.root.after(0, self._update_generate_button))
+        self._update_generate_button()
+        
+    def _update_generate_button(self):
+        """根据任务队列状态更新生成按钮文字"""
+        running = self.scheduler.running_count()
+        depth = self.scheduler.queue_depth()
+        if running or depth:
+            self.btn_generate.config(text=f"生成中...(排队 {depth})")
+        else:
+            self.btn_generate.config(text="生成音乐")
+        
+    def generate_music(self, prompt=None):
+        """生成音乐的核心函数（在任务队列的工作线程中执行）"""
+        self.logger.info("开始生成音乐")
+        if prompt is None:
+            prompt = self._get_prompt()
+            if prompt is None:
+                return
         
         # 更新按钮状态
-        self.root.after(0, lambda: self.btn_generate.config(state=tk.DISABLED, text="生成中...(云端处理，无需显卡)"))
+        self.root.after(0, self._update_generate_button)
         
         try:
             # 调用云端DiffRhythm生成音乐
             self.logger.info(f"调用模型生成音乐，提示词: {prompt}")
             result = self.model_client.generate_music(prompt)
-            audio_data = result["output_audio"]
+            # 保留在内存中并带上模型实际的采样率，播放和保存都直接使用原数组；
+            # 流式管道的输出在第一块到达时就开始播放（边生成边播放，播放的是未经后处理的音频）
+            audio_data, streamed = self.audio_processor.play_stream(
+                audio_from_result(result), on_started=lambda: self.root.after(0, self._on_playback_started))
+            # 按配置做响度归一化、裁剪静音、重采样等后处理
+            audio_data = self.audio_processor.post_process(audio_data)
             
-            self.root.after(0, lambda: messagebox.showinfo("生成成功", "✅ 音乐生成完成！已自动播放，可点击保存按钮导出MP3"))
-            
-            # 临时保存播放
-            temp_mp3 = "temp_music.mp3"
-            self.logger.info(f"创建临时音频文件: {temp_mp3}")
-            temp_path = self.audio_processor.create_temp_audio(audio_data, temp_mp3)
+            # 直接从内存播放（后台线程，立即返回，不占用生成任务的工作线程）
+            self.current_audio = audio_data
+            if not streamed:
+                if self.audio_processor.play_buffer(audio_data):
+                    self.root.after(0, self._on_playback_started)
+                else:
+                    # 无法内存播放时在单独的线程中写入临时文件并用playsound播放
+                    threading.Thread(target=self._play_file, args=(audio_data,), name="playsound",
+                                     daemon=True).start()
             
-            # 播放音乐
-            self.logger.info(f"播放临时音频文件: {temp_path}")
-            self.audio_processor.play_audio(temp_path)
+            self.root.after(0, lambda: messagebox.showinfo(
+                "生成成功", f"✅ 音乐生成完成！已自动播放，可点击保存按钮导出{self._default_save_format().upper()}"))
             
-            # 保存引用供后续保存使用
-            self.current_audio = audio_data
-            self.logger.info("音乐生成和播放完成")
+            self.logger.info("音乐生成完成，开始播放")
+            self._prepare_preview(audio_data)
             
         except Exception as e:
             self.logger.error(f"音乐生成失败: {str(e)}")
@@ -252,12 +449,165 @@ class MainWindow:
             self.root.after(0, show_error)
         finally:
             # 恢复按钮状态
-            self.root.after(0, lambda: self.btn_generate.config(state=tk.NORMAL, text="生成音乐"))
+            self.root.after(0, self._update_generate_button)
+    
+    def _play_file(self, audio_data):
+        """写入本次生成独占的临时文件后播放（线程持有音频对象，播放结束前临时文件不会被清理）"""
+        try:
+            temp_path = self.audio_processor.create_temp_audio(audio_data)
+        except Exception as e:
+            self.logger.error(f"❌ 创建临时音频文件失败: {e}")
+            return
+        self.logger.info(f"播放临时音频文件: {temp_path}")
+        self.audio_processor.play_audio(temp_path)
+    
+    def _prepare_preview(self, audio_data):
+        """在后台计算波形峰值金字塔（和可选的频谱缩略图），完成后交给界面线程绘制"""
+        if not isinstance(audio_data, AudioBuffer):
+            return
+        pyramid = peak_pyramid(audio_data)
+        self.root.after(0, lambda: self._show_waveform(pyramid))
+        if self.config_manager.get_bool("app", "spectrogram", False):
+            threading.Thread(target=self._render_spectrogram, args=(audio_data,),
+                             name="spectrogram", daemon=True).start()
+    
+    def _render_spectrogram(self, audio_data):
+        width, height = self.SPECTROGRAM_SIZE
+        try:
+            ppm = spectrogram_ppm(spectrogram(audio_data.samples, audio_data.sample_rate, width=width, height=height))
+        except Exception as e:
+            self.logger.warning(f"⚠️ 生成频谱缩略图失败: {e}")
+            return
+        
+        def show():
+            # PhotoImage 只能在界面线程中创建
+            self._spectrogram_image = tk.PhotoImage(data=ppm, format="PPM")
+            self.spectrogram_label.config(image=self._spectrogram_image)
+        
+        self.root.after(0, show)
+    
+    def _show_waveform(self, pyramid):
+        self._waveform = pyramid
+        self._view = (0, pyramid.frames)
+        self._draw_waveform()
+    
+    def _draw_waveform(self):
+        """按当前显示范围绘制波形：每个像素一对 min/max，与音频长度无关"""
+        canvas = self.waveform_canvas
+        canvas.delete("wave")
+        if self._waveform is None:
+            return
+        import numpy as np
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        if width < 2:
+            return
+        mins, maxs = self._waveform.peaks(width, *self._view)
+        middle = height / 2
+        xs = np.arange(len(maxs))
+        top = middle - np.clip(maxs, -1, 1) * middle * 0.95
+        bottom = middle - np.clip(mins, -1, 1) * middle * 0.95
+        points = np.column_stack([np.concatenate([xs, xs[::-1]]), np.concatenate([top, bottom[::-1]])])
+        canvas.create_polygon(points.ravel().tolist(), fill="#4fc3f7", outline="#4fc3f7", tags="wave")
+        self._draw_playback_cursor()
+    
+    def _draw_playback_cursor(self):
+        canvas = self.waveform_canvas
+        canvas.delete("cursor")
+        player = self.audio_processor.player
+        if self._waveform is None or player is None or player.state == PlaybackState.STOPPED:
+            return
+        start, end = self._view
+        frame = player.position * self._waveform.sample_rate
+        if start <= frame <= end and end > start:
+            x = (frame - start) / (end - start) * canvas.winfo_width()
+            canvas.create_line(x, 0, x, canvas.winfo_height(), fill="#ff7043", tags="cursor")
+    
+    def _zoom_waveform(self, x, zoom_in):
+        """以鼠标位置为中心放大/缩小波形"""
+        if self._waveform is None:
+            return
+        width = max(1, self.waveform_canvas.winfo_width())
+        start, end = self._view
+        anchor = start + x / width * (end - start)
+        span = (end - start) * (0.5 if zoom_in else 2.0)
+        span = min(max(span, width), self._waveform.frames)
+        start = int(min(max(0, anchor - x / width * span), self._waveform.frames - span))
+        self._view = (start, int(start + span))
+        self._draw_waveform()
+    
+    def _reset_waveform_zoom(self):
+        if self._waveform is not None:
+            self._view = (0, self._waveform.frames)
+            self._draw_waveform()
+    
+    def _on_waveform_click(self, event):
+        """单击波形跳转到对应的播放位置"""
+        player = self.audio_processor.player
+        if self._waveform is None or player is None:
+            return
+        start, end = self._view
+        frame = start + event.x / max(1, self.waveform_canvas.winfo_width()) * (end - start)
+        player.seek(frame / self._waveform.sample_rate)
+    
+    def _on_playback_started(self):
+        """内存播放开始：启用播放控制并定时刷新进度条"""
+        player = self.audio_processor.player
+        player.on_state_change = lambda state: self.root.after(0, self._update_playback_controls)
+        self.seek_scale.config(to=max(player.duration, 0.1))
+        self._update_playback_controls()
+        if not self._playback_polling:
+            self._playback_polling = True
+            self._poll_playback()
+    
+    def _poll_playback(self):
+        """播放期间每200毫秒刷新一次进度条（拖动进度条时不覆盖用户的位置）"""
+        player = self.audio_processor.player
+        if player is None or player.state == PlaybackState.STOPPED:
+            self._playback_polling = False
+            self._update_playback_controls()
+            return
+        # 流式播放时音频仍在增长
+        self.seek_scale.config(to=max(player.duration, 0.1))
+        if not self._seeking:
+            self.seek_var.set(player.position)
+        self._draw_playback_cursor()
+        self.root.after(200, self._poll_playback)
+    
+    def _update_playback_controls(self):
+        """根据播放状态更新暂停/停止按钮"""
+        player = self.audio_processor.player
+        state = player.state if player is not None else PlaybackState.STOPPED
+        active = state != PlaybackState.STOPPED
+        self.btn_pause.config(text="继续" if state == PlaybackState.PAUSED else "暂停",
+                              state=tk.NORMAL if active else tk.DISABLED)
+        self.btn_stop.config(state=tk.NORMAL if active else tk.DISABLED)
+        if not active:
+            self.seek_var.set(0)
+            self.waveform_canvas.delete("cursor")
+    
+    def toggle_pause(self):
+        """暂停/继续播放"""
+        if self.audio_processor.player is not None:
+            self.audio_processor.player.toggle_pause()
+    
+    def stop_playback(self):
+        """停止播放"""
+        self.logger.info("用户停止播放")
+        self.audio_processor.stop_playback()
+    
+    def _on_seek_start(self, event):
+        self._seeking = True
+    
+    def _on_seek_end(self, event):
+        """松开进度条时跳转到对应位置"""
+        self._seeking = False
+        if self.audio_processor.player is not None:
+            self.audio_processor.player.seek(self.seek_var.get())
     
     def save_music(self):
         """保存音乐文件"""
         self.logger.info("用户点击保存音乐")
-        if not self.current_audio:
+        if self.current_audio is None:
             self.logger.warning("用户尝试保存音乐前未生成音乐")
             messagebox.showwarning("提示", "请先生成音乐再保存！")
             return
@@ -268,22 +618,52 @@ class MainWindow:
         # 处理 ~ 路径变量
         default_save_path = os.path.expanduser(default_save_path)
         
+        save_formats = self._save_formats()
+        default_ext = self._default_save_format()
         save_path = filedialog.asksaveasfilename(
             title="保存音乐",
-            defaultextension=".mp3",
-            filetypes=[("MP3音频文件", "*.mp3"), ("所有文件", "*.*")],
-            initialfile="DiffRhythm-音乐生成.mp3",
+            defaultextension=f".{default_ext}",
+            filetypes=[(f"{ext.upper()}音频文件", f"*.{ext}") for ext in save_formats] + [("所有文件", "*.*")],
+            initialfile=f"DiffRhythm-音乐生成.{default_ext}",
             initialdir=os.path.dirname(default_save_path) if os.path.dirname(default_save_path) != "~" else os.path.expanduser("~")
         )
         if save_path:
-            try:
-                self.logger.info(f"保存音乐到: {save_path}")
-                self.audio_processor.save_audio(self.current_audio, save_path)
-                messagebox.showinfo("保存成功", f"音乐已保存到：\n{save_path}")
-                self.logger.info("音乐保存成功")
-            except Exception as e:
-                self.logger.error(f"保存音乐失败: {str(e)}")
-                messagebox.showerror("保存失败", f"保存出错：{str(e)}")
+            # 在后台线程池中编码，界面不会在写入长音频时卡住
+            self.logger.info(f"保存音乐到: {save_path}")
+            self.btn_save.config(state=tk.DISABLED)
+            self.status_var.set("💾 保存中...")
+            
+            def on_progress(path, written, total):
+                if total:
+                    percent = written * 100 // total
+                    self.root.after(0, lambda: self.status_var.set(f"💾 保存中... {percent}%"))
+            
+            future = self.audio_processor.save_audio_async(self.current_audio, save_path, progress=on_progress)[0]
+            future.add_done_callback(lambda f: self.root.after(0, lambda: self._on_save_done(f, save_path)))
+    
+    def _save_formats(self):
+        """保存对话框中列出的格式（当前环境可用的编码格式）：有MP3编码器时MP3在前，否则按编码器注册顺序"""
+        available = self.audio_processor.encoders.available()
+        if "mp3" not in available:
+            return available
+        return ["mp3"] + [ext for ext in available if ext != "mp3"]
+    
+    def _default_save_format(self):
+        """保存对话框默认使用的格式：列出的第一个格式，没有可用的编码器时为 wav"""
+        save_formats = self._save_formats()
+        return save_formats[0] if save_formats else "wav"
+    
+    def _on_save_done(self, future, save_path):
+        """后台保存完成后在主线程中提示结果"""
+        self.btn_save.config(state=tk.NORMAL)
+        self.status_var.set("")
+        error = future.exception()
+        if error is None:
+            messagebox.showinfo("保存成功", f"音乐已保存到：\n{save_path}")
+            self.logger.info("音乐保存成功")
+        else:
+            self.logger.error(f"保存音乐失败: {str(error)}")
+            messagebox.showerror("保存失败", f"保存出错：{str(error)}")
 
     def open_settings(self):
         """打开设置界面，允许用户输入API token"""
@@ -341,4 +721,8 @@ class MainWindow:
     def run(self):
         """运行主窗口"""
         self.logger.info("启动主窗口")
-        self.root.mainloop()
\ No newline at end of file
+        try:
+            self.root.mainloop()
+        finally:
+            self.audio_processor.shutdown()
+            self.model_client.shutdown()
\ No newline at end of file
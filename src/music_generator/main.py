@@ -2,6 +2,11 @@
 DiffRhythm谛韵音乐生成器
 使用ModelScope平台的DiffRhythm模型进行文本到音乐生成
 """
+import time
+
+# 记录启动时间，用于统计首次绘制耗时
+STARTED_AT = time.perf_counter()
+
 import sys
 import os
 import logging
@@ -9,7 +14,6 @@ import logging
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from .gui.main_window import MainWindow
 from .utils.logging_config import setup_logging
 
 
@@ -20,7 +24,9 @@ def main():
     
     try:
         logging.info("启动 DiffRhythm谛韵音乐生成器")
-        app = MainWindow()
+        # 延迟导入界面模块；numpy/soundfile/modelscope 等重量级依赖在窗口显示后才加载
+        from .gui.main_window import MainWindow
+        app = MainWindow(started_at=STARTED_AT)
         app.run()
     except KeyboardInterrupt:
         logging.info("用户中断应用")
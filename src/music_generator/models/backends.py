@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ..config.config_manager import ConfigManager
+
+
+class PipelineBackend:
+    """模型管道后端接口
+
+    load() 返回一个可调用的管道：pipeline(text_inputs=..., **params) -> {"output_audio": ..., ...}
+    """
+
+    name = "base"
+
+    def load(self) -> Callable[..., Dict[str, Any]]:
+        """创建模型管道"""
+        raise NotImplementedError
+
+    def cache_identity(self) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        """返回 (模型标识, 版本, 任务类型)，用于区分不同模型生成的缓存结果；尚不确定时返回None"""
+        raise NotImplementedError
+
+
+class ModelScopeBackend(PipelineBackend):
+    """真实的 ModelScope 管道（逐个尝试模型和任务类型，结果写入解析缓存）"""
+
+    name = "modelscope"
+
+    def __init__(self, client):
+        self.client = client
+        # (解析结果, 缓存标识)：解析结果不变时直接复用
+        self._identity = None
+
+    def load(self):
+        return self.client._load_modelscope_pipeline()
+
+    def cache_identity(self):
+        # 使用实际加载的模型组合：配置的模型加载失败时会退回其他模型，其结果不能算在配置的模型名下
+        resolved = self.client.resolved_model()
+        if resolved is None:
+            return None
+        if self._identity is None or self._identity[0] != resolved:
+            self._identity = (resolved, (resolved["model_id"], resolved["revision"], resolved["task"]))
+        return self._identity[1]
+
+
+class StubPipeline:
+    """确定性的模拟管道：根据提示词合成固定长度的音频，可模拟推理耗时
+
+    相同的提示词和参数总是得到相同的音频；支持批量 text_inputs。
+    """
+
+    def __init__(self, duration_s: float = 5.0, latency_s: float = 0.0, sample_rate: int = 44100):
+        self.duration_s = duration_s
+        self.latency_s = latency_s
+        self.sample_rate = sample_rate
+
+    def _synthesize(self, prompt: str, params: Dict[str, Any]):
+        import numpy as np
+        digest = hashlib.sha256(f"{prompt}|{sorted(params.items())}".encode("utf-8")).digest()
+        rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+        frames = int(self.duration_s * self.sample_rate)
+        t = np.arange(frames, dtype=np.float32) / self.sample_rate
+        audio = np.zeros(frames, dtype=np.float32)
+        # 几个随机频率的正弦波叠加，再加一点噪声
+        for freq, amp in zip(rng.uniform(110.0, 880.0, 3), rng.uniform(0.1, 0.3, 3)):
+            audio += np.float32(amp) * np.sin(np.float32(2 * np.pi * freq) * t)
+        audio += rng.standard_normal(frames).astype(np.float32) * np.float32(0.01)
+        return audio
+
+    def __call__(self, text_inputs: Union[str, List[str]], **params) -> Dict[str, Any]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if isinstance(text_inputs, (list, tuple)):
+            import numpy as np
+            audio = np.stack([self._synthesize(prompt, params) for prompt in text_inputs])
+        else:
+            audio = self._synthesize(text_inputs, params)
+        return {"output_audio": audio, "sample_rate": self.sample_rate}
+
+
+class StubBackend(PipelineBackend):
+    """离线模拟后端：无需下载模型，用于基准测试和压力测试"""
+
+    name = "stub"
+
+    def __init__(self, duration_s: float = 5.0, latency_s: float = 0.0, sample_rate: int = 44100,
+                 load_latency_s: float = 0.0):
+        self.duration_s = duration_s
+        self.latency_s = latency_s
+        self.sample_rate = sample_rate
+        self.load_latency_s = load_latency_s
+
+    def load(self):
+        logging.getLogger(__name__).info(
+            f"使用模拟管道: 时长 {self.duration_s}s, 推理耗时 {self.latency_s}s, 采样率 {self.sample_rate}")
+        if self.load_latency_s:
+            time.sleep(self.load_latency_s)
+        return StubPipeline(self.duration_s, self.latency_s, self.sample_rate)
+
+    def cache_identity(self):
+        return f"stub/{self.duration_s}s@{self.sample_rate}", None, None
+
+
+def create_backend(config_manager: ConfigManager, client) -> PipelineBackend:
+    """根据配置 [modelscope] backend 创建后端（modelscope / stub）"""
+    name = config_manager.get_value('modelscope', 'backend', 'modelscope')
+    if name == StubBackend.name:
+        return StubBackend(
+            duration_s=float(config_manager.get_value('stub', 'duration_s', '5')),
+            latency_s=float(config_manager.get_value('stub', 'latency_s', '0')),
+            sample_rate=int(config_manager.get_value('stub', 'sample_rate', '44100')),
+            load_latency_s=float(config_manager.get_value('stub', 'load_latency_s', '0')),
+        )
+    if name != ModelScopeBackend.name:
+        logging.getLogger(__name__).warning(f"⚠️ 未知的管道后端 {name}，使用 modelscope")
+    return ModelScopeBackend(client)
@@ -1,19 +1,122 @@
 import logging
 import os
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, List, Tuple
 from ..config.config_manager import ConfigManager
+from .backends import PipelineBackend, create_backend
+from .resolution_cache import ResolutionCache
+from .result_cache import ResultCache
+from ..utils.logging_config import log_stage, log_timing
 
 
 class ModelScopeClient:
     """ModelScope客户端，用于调用DiffRhythm模型"""
     
-    def __init__(self, config_manager: ConfigManager):
+    # 依次尝试的任务类型：(Tasks属性名, 显示名称)，None 表示让 ModelScope 自动推断
+    TASK_TYPES_TO_TRY = [
+        ('text_to_music', 'text_to_music'),
+        ('text-to-music', 'text-to-music'),
+        ('text_to_audio_synthesis', 'text_to_audio_synthesis'),
+        ('text_to_speech', 'text_to_speech'),
+        (None, '自动推断')
+    ]
+    
+    def __init__(self, config_manager: ConfigManager, inference_mode: Optional[str] = None,
+                 backend: Optional[PipelineBackend] = None):
         self.config_manager = config_manager
         self.logger = logging.getLogger(__name__)
+        # 模型管道后端：真实的 ModelScope 或离线模拟（stub）
+        self.backend = backend or create_backend(config_manager, self)
         self._pipeline = None
+        # 单飞加载：同一时间只有一个线程加载模型，其余调用者等待其结果
+        self._pipeline_lock = threading.Lock()
+        self._pipeline_loaded = threading.Condition(self._pipeline_lock)
+        self._loading = False
+        self._load_error: Optional[Exception] = None
+        self._stats = {'pipeline_loads': 0, 'deduplicated_waiters': 0}
+        # 模型管道是否支持批量 text_inputs（None 表示尚未探测）
+        self._batch_supported: Optional[bool] = None
+        # 实际加载的模型组合 {"model_id", "revision", "task"}（配置的模型加载失败时可能退回其他模型）
+        self._resolved_model: Optional[Dict[str, Any]] = None
+        # (配置的模型ID, 版本) -> 解析缓存键（计算时要查询库版本，只算一次）
+        self._resolution_keys: Dict[Tuple[str, Optional[str]], str] = {}
+        cache_dir = self.config_manager.get_value('cache', 'dir', 'cache')
+        self.resolution_cache = ResolutionCache(cache_dir)
+        self.result_cache: Optional[ResultCache] = None
+        if self.config_manager.get_bool('cache', 'result_cache', True):
+            max_mb = int(self.config_manager.get_value('cache', 'result_cache_max_mb', '1024'))
+            self.result_cache = ResultCache(cache_dir, max_bytes=max_mb * 1024 * 1024)
+        
+        # 推理方式：thread 在当前进程内推理；process 在独立的推理子进程中推理
+        self.inference_mode = inference_mode or self.config_manager.get_value('modelscope', 'inference_mode', 'thread')
+        self._process_pool = None
+        if self.inference_mode == 'process':
+            from .process_backend import ProcessInferencePool
+            max_rss_mb = int(self.config_manager.get_value('modelscope', 'worker_max_rss_mb', '0'))
+            self._process_pool = ProcessInferencePool(
+                config_file=str(self.config_manager.config_file.resolve()),
+                workers=int(self.config_manager.get_value('modelscope', 'process_workers', '1')),
+                max_jobs_per_worker=int(self.config_manager.get_value('modelscope', 'worker_max_jobs', '20')),
+                max_rss_bytes=max_rss_mb * 1024 * 1024 if max_rss_mb > 0 else None,
+            )
+        
+        # 后台预热状态：idle / loading / ready / failed
+        self.warmup_state = 'idle'
+        self.warmup_error: Optional[Exception] = None
+        self._warmup_thread: Optional[threading.Thread] = None
+        
+    def _create_pipeline(self, pipeline, Tasks, model_id: str, revision: Optional[str], task_attr: Optional[str]):
+        """按指定的模型、版本和任务类型创建管道"""
+        pipeline_args = {
+            'model': model_id,
+            'trust_remote_code': True
+        }
+        if revision:
+            pipeline_args['model_revision'] = revision
+        if task_attr is None:
+            return pipeline(**pipeline_args)
+        return pipeline(task=getattr(Tasks, task_attr), **pipeline_args)
+        
+    def _candidate_models(self) -> List[Tuple[str, Optional[str]]]:
+        """依次尝试加载的 (模型ID, 版本)，优先使用配置中的模型"""
+        model_id = self.config_manager.get_value('modelscope', 'model_id', 'ASLP-lab/DiffRhythm-base')
+        return [
+            (model_id, None),  # 用户配置的模型（不指定版本）
+            # ('ASLP-lab/DiffRhythm-base', None),  # 正确的 DiffRhythm 模型（不指定版本）
+            # ('AI-ModelScope/musicgen-melody', None),  # MusicGen，不指定版本
+            ('facebook/musicgen-melody', None),  # Facebook MusicGen，不指定版本
+            # ('damo/speech_sambert-hifigan_tts_zh-cn_16k', 'v1.0.0'),  # TTS模型（最后尝试）
+        ]
+        
+    def _resolution_key(self) -> str:
+        """模型解析缓存键（配置的模型ID和版本、候选模型列表、库版本），按配置缓存"""
+        config = (self.config_manager.get_value('modelscope', 'model_id', 'ASLP-lab/DiffRhythm-base'),
+                  self.config_manager.get_value('modelscope', 'model_revision', None))
+        key = self._resolution_keys.get(config)
+        if key is None:
+            key = self._resolution_keys[config] = self.resolution_cache.make_key(
+                config[0], config[1], self._candidate_models())
+        return key
+        
+    def resolved_model(self) -> Optional[Dict[str, Any]]:
+        """实际加载的模型组合 {"model_id", "revision", "task"}
+        
+        本进程尚未加载模型时从解析缓存中读取（推理子进程加载成功后会写入解析缓存，
+        文件未变化时不会重新解析），都没有时返回None。
+        """
+        if self._resolved_model is not None:
+            return self._resolved_model
+        return self.resolution_cache.get(self._resolution_key())
         
     def initialize_model(self):
-        """初始化模型，使用配置文件中的token"""
+        """初始化模型管道（由配置的后端创建）"""
+        with log_stage(self.logger, "init", "模型管道初始化", backend=type(self.backend).__name__):
+            self._pipeline = self.backend.load()
+        return self._pipeline
+        
+    def _load_modelscope_pipeline(self):
+        """初始化ModelScope模型，使用配置文件中的token"""
         try:
             self.logger.info("开始初始化云端DiffRhythm音乐生成模型...")
             from modelscope.pipelines import pipeline
@@ -27,63 +130,53 @@ class ModelScopeClient:
             else:
                 self.logger.warning("⚠️ 未找到配置文件中的token，请在设置中配置API Token")
             
-            # 从配置中获取模型ID和版本
-            model_id = self.config_manager.get_value('modelscope', 'model_id', 'ASLP-lab/DiffRhythm-base')
-            model_revision = self.config_manager.get_value('modelscope', 'model_revision', None)
-            
             # 尝试一些可能的音乐生成模型，优先使用配置中的模型
-            possible_models = [
-                (model_id, None),  # 用户配置的模型（不指定版本）
-                # ('ASLP-lab/DiffRhythm-base', None),  # 正确的 DiffRhythm 模型（不指定版本）
-                # ('AI-ModelScope/musicgen-melody', None),  # MusicGen，不指定版本
-                ('facebook/musicgen-melody', None),  # Facebook MusicGen，不指定版本
-                # ('damo/speech_sambert-hifigan_tts_zh-cn_16k', 'v1.0.0'),  # TTS模型（最后尝试）
-            ]
+            possible_models = self._candidate_models()
+            
+            # 优先使用上次成功的模型/任务组合，跳过耗时的逐个尝试
+            cache_key = self._resolution_key()
+            cached = self.resolution_cache.get(cache_key)
+            if cached:
+                try:
+                    self.logger.info(f"使用缓存的模型解析结果: {cached['model_id']} "
+                                     f"({cached['task'] or '自动推断'})")
+                    self._pipeline = self._create_pipeline(
+                        pipeline, Tasks, cached['model_id'], cached['revision'], cached['task'])
+                    self._resolved_model = cached
+                    self.logger.info("✅ 模型初始化成功（命中解析缓存）")
+                    return self._pipeline
+                except Exception as e:
+                    self.logger.warning(f"⚠️ 缓存的模型组合加载失败，重新探测: {e}")
+                    self.resolution_cache.invalidate(cache_key)
             
             # 创建模型管道
             # 尝试不同的模型和任务类型
             pipeline_created = False
             last_error = None
+            probe_started = time.perf_counter()
             
             for model_to_try, version in possible_models:
                 try:
                     self.logger.info(f"尝试加载模型: {model_to_try} (版本: {version or 'latest'})")
                     
-                    # 准备参数
-                    pipeline_args = {
-                        'model': model_to_try,
-                        'trust_remote_code': True
-                    }
-                    if version:
-                        pipeline_args['model_revision'] = version
-                    
-                    # 尝试不同的任务类型
-                    task_types_to_try = [
-                        ('text_to_music', 'text_to_music'),
-                        ('text-to-music', 'text-to-music'),
-                        ('text_to_audio_synthesis', 'text_to_audio_synthesis'),
-                        ('text_to_speech', 'text_to_speech'),
-                        (None, '自动推断')
-                    ]
-                    
-                    for task_attr, task_name in task_types_to_try:
+                    for task_attr, task_name in self.TASK_TYPES_TO_TRY:
+                        if task_attr is not None and not hasattr(Tasks, task_attr):
+                            self.logger.info(f"任务类型 {task_name} 不存在，跳过")
+                            continue
                         try:
                             if task_attr is None:
                                 # 不指定任务类型，让 ModelScope 自动推断
                                 self.logger.info("尝试自动推断任务类型")
-                                self._pipeline = pipeline(**pipeline_args)
                             else:
-                                # 尝试指定的任务类型
-                                if hasattr(Tasks, task_attr):
-                                    task = getattr(Tasks, task_attr)
-                                    self.logger.info(f"尝试使用任务类型: {task_name}")
-                                    self._pipeline = pipeline(task=task, **pipeline_args)
-                                else:
-                                    self.logger.info(f"任务类型 {task_name} 不存在，跳过")
-                                    continue
+                                self.logger.info(f"尝试使用任务类型: {task_name}")
+                            self._pipeline = self._create_pipeline(
+                                pipeline, Tasks, model_to_try, version, task_attr)
                             
                             pipeline_created = True
+                            self._resolved_model = {"model_id": model_to_try, "revision": version,
+                                                    "task": task_attr}
                             self.logger.info(f"✅ 成功使用 {task_name} 加载模型: {model_to_try}")
+                            self.resolution_cache.put(cache_key, model_to_try, version, task_attr)
                             break
                             
                         except Exception as task_e:
@@ -98,6 +191,8 @@ class ModelScopeClient:
                     self.logger.warning(f"模型 {model_to_try} 加载失败: {e}")
                     continue
             
+            log_timing(self.logger, "probe", probe_started, "模型探测结束",
+                       status="ok" if pipeline_created else "error")
             if not pipeline_created:
                 raise Exception(f"所有模型都加载失败，最后一个错误: {last_error}")
             
@@ -134,29 +229,277 @@ class ModelScopeClient:
                 self.logger.error(f"❌ 模型初始化失败: {error_message}")
                 raise Exception(f"模型初始化失败: {error_message}") from e
             
+    def start_warmup(self, on_state_change: Optional[Callable[[str], None]] = None) -> bool:
+        """在后台线程中预先加载模型管道
+        
+        on_state_change 会在状态变化时以新状态为参数被调用（在预热线程中）。
+        已加载或正在预热时不会重复启动，返回False。
+        """
+        if self.is_ready() or self._loading or (self._warmup_thread and self._warmup_thread.is_alive()):
+            self.logger.debug("模型管道已加载或正在预热，跳过")
+            return False
+        
+        def set_state(state: str):
+            self.warmup_state = state
+            if on_state_change:
+                try:
+                    on_state_change(state)
+                except Exception as e:
+                    self.logger.warning(f"⚠️ 预热状态回调出错: {e}")
+        
+        def run():
+            try:
+                if self._process_pool is not None:
+                    self._process_pool.warmup()
+                else:
+                    self.get_pipeline()
+                set_state('ready')
+                self.logger.info("✅ 模型后台预热完成")
+            except Exception as e:
+                self.warmup_error = e
+                set_state('failed')
+                self.logger.error(f"❌ 模型后台预热失败: {e}")
+        
+        self.logger.info("开始后台预热模型管道...")
+        self.warmup_error = None
+        set_state('loading')
+        self._warmup_thread = threading.Thread(target=run, name="pipeline-warmup", daemon=True)
+        self._warmup_thread.start()
+        return True
+        
+    def is_ready(self) -> bool:
+        """模型管道是否已加载、可以立即推理（推理子进程模式下看子进程中的管道）"""
+        if self._process_pool is not None:
+            return self._process_pool.is_ready()
+        return self._pipeline is not None
+        
     def get_pipeline(self):
-        """获取模型管道"""
-        if self._pipeline is None:
+        """获取模型管道
+        
+        线程安全：并发调用时只有一个线程执行加载，其余线程等待并复用结果。
+        """
+        with self._pipeline_lock:
+            if self._pipeline is not None:
+                self.logger.debug("使用已初始化的模型管道")
+                return self._pipeline
+            if self._loading:
+                # 已有线程（包括后台预热）在加载：等待，而不是再加载一次模型
+                self._stats['deduplicated_waiters'] += 1
+                self.logger.info("模型正在加载中，等待加载完成...")
+                while self._loading:
+                    self._pipeline_loaded.wait()
+                if self._pipeline is not None:
+                    return self._pipeline
+                raise Exception(f"模型初始化失败: {self._load_error}") from self._load_error
+            self._loading = True
+            self._load_error = None
+            self._stats['pipeline_loads'] += 1
+        
+        pipeline = None
+        try:
             self.logger.info("模型管道尚未初始化，正在初始化...")
-            self._pipeline = self.initialize_model()
-        else:
-            self.logger.debug("使用已初始化的模型管道")
-        return self._pipeline
+            pipeline = self.initialize_model()
+            return pipeline
+        except Exception as e:
+            self._load_error = e
+            raise
+        finally:
+            with self._pipeline_lock:
+                self._pipeline = pipeline
+                self._loading = False
+                self._pipeline_loaded.notify_all()
+        
+    def get_stats(self) -> Dict[str, int]:
+        """获取运行统计（模型加载次数、被合并的并发加载请求数）"""
+        with self._pipeline_lock:
+            return dict(self._stats)
         
-    def generate_music(self, prompt: str) -> Dict[str, Any]:
-        """生成音乐"""
+    def _apply_seed(self, seed: Optional[int]):
+        """设置随机种子，使相同参数的生成结果可复现"""
+        if seed is None:
+            return
+        import random
+        random.seed(seed)
+        try:
+            import torch
+            torch.manual_seed(seed)
+        except ImportError:
+            self.logger.debug("未安装torch，跳过设置torch随机种子")
+        
+    def _result_cache_key(self, prompt: str, seed: Optional[int], params: Dict[str, Any]) -> Optional[str]:
+        """计算结果缓存键；未启用结果缓存或尚不知道实际使用的模型时返回None"""
+        if self.result_cache is None:
+            return None
+        identity = self.backend.cache_identity()
+        if identity is None:
+            return None
+        model_id, model_revision, task = identity
+        return self.result_cache.make_key(prompt, model_id, model_revision, seed, params, task=task)
+        
+    def _infer(self, prompt: str, seed: Optional[int], params: Dict[str, Any]) -> Dict[str, Any]:
+        """按配置的推理方式执行一次推理"""
+        if self._process_pool is not None:
+            self.logger.info("🎵 在推理子进程中开始音乐生成推理...")
+            return self._process_pool.run(prompt, seed, params)
+        return self.run_inference(prompt, seed, params)
+        
+    def generate_music(self, prompt: str, seed: Optional[int] = None, **params) -> Dict[str, Any]:
+        """生成音乐
+        
+        seed 和 params（透传给模型管道的生成参数）与提示词一起组成结果缓存的键，
+        相同的请求直接返回缓存的音频。
+        """
         self.logger.info(f"开始生成音乐，提示词: {prompt}")
+        
+        started = time.perf_counter()
+        cache_key = self._result_cache_key(prompt, seed, params)
+        if cache_key is not None:
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                log_timing(self.logger, "inference", started, "命中结果缓存", cached=True)
+                return cached
+        
         self.logger.info("⏳ 正在使用CPU推理，首次生成可能需要几分钟，请耐心等待...")
         
         try:
-            pipeline = self.get_pipeline()
-            
-            # 添加更详细的日志
-            self.logger.info("🎵 开始音乐生成推理...")
-            result = pipeline(text_inputs=prompt)
+            with log_stage(self.logger, "inference", "音乐生成推理", cached=False,
+                           mode="process" if self._process_pool is not None else "thread"):
+                result = self._infer(prompt, seed, params)
             self.logger.info("✅ 音乐生成完成")
+            # 首次加载模型前无法确定缓存键，推理后再计算
+            cache_key = cache_key or self._result_cache_key(prompt, seed, params)
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result)
             return result
         
         except Exception as e:
-                elf.logger.error(f"❌ 音乐生成失败: {e}")
-                raise Exception(f"音乐生成失败: {e}") from e
\ No newline at end of file
+            self.logger.error(f"❌ 音乐生成失败: {e}")
+            raise Exception(f"音乐生成失败: {e}") from e
+        
+    def generate_batch(self, prompts: List[str], batch_size: int = 4, seed: Optional[int] = None,
+                       **params) -> List[Dict[str, Any]]:
+        """批量生成音乐（吞吐优先，适合夜间批处理）
+        
+        模型管道支持批量 text_inputs 时按 batch_size 组成小批次推理，否则逐条推理。
+        返回与 prompts 顺序一致的结果列表，每项额外包含：
+        latency_ms（单条耗时，批量推理时为批次耗时的均摊值）、batch_size、cached；
+        单条失败不会中断整批，该项只包含 error 字段。
+        """
+        self.logger.info(f"开始批量生成音乐，共 {len(prompts)} 条，批大小 {batch_size}")
+        results: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        
+        # 先查结果缓存，只对未命中的提示词推理
+        pending = []
+        for index, prompt in enumerate(prompts):
+            started = time.perf_counter()
+            cache_key = self._result_cache_key(prompt, seed, params)
+            cached = self.result_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                results[index] = dict(cached, latency_ms=(time.perf_counter() - started) * 1000,
+                                      batch_size=1, cached=True)
+            else:
+                pending.append((index, prompt, cache_key))
+        
+        for offset in range(0, len(pending), max(1, batch_size)):
+            chunk = pending[offset:offset + max(1, batch_size)]
+            outputs = None
+            if len(chunk) > 1 and self._process_pool is None and self._batch_supported is not False:
+                started = time.perf_counter()
+                outputs = self._run_batch([prompt for _, prompt, _ in chunk], seed, params)
+                per_item_ms = (time.perf_counter() - started) * 1000 / len(chunk)
+            if outputs is not None:
+                for (index, prompt, cache_key), result in zip(chunk, outputs):
+                    cache_key = cache_key or self._result_cache_key(prompt, seed, params)
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, result)
+                    results[index] = dict(result, latency_ms=per_item_ms, batch_size=len(chunk), cached=False)
+                continue
+            
+            # 不支持批量推理：逐条推理
+            for index, prompt, cache_key in chunk:
+                started = time.perf_counter()
+                try:
+                    result = self._infer(prompt, seed, params)
+                except Exception as e:
+                    self.logger.error(f"❌ 批量生成中第 {index + 1} 条失败: {e}")
+                    results[index] = {'error': str(e), 'latency_ms': (time.perf_counter() - started) * 1000,
+                                      'batch_size': 1, 'cached': False}
+                    continue
+                cache_key = cache_key or self._result_cache_key(prompt, seed, params)
+                if cache_key is not None:
+                    self.result_cache.put(cache_key, result)
+                results[index] = dict(result, latency_ms=(time.perf_counter() - started) * 1000,
+                                      batch_size=1, cached=False)
+        
+        self.logger.info(f"✅ 批量生成完成，共 {len(prompts)} 条")
+        return results
+        
+    def _run_batch(self, prompts: List[str], seed: Optional[int],
+                   params: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """尝试一次批量推理，失败时返回None（调用方改为逐条推理）
+
+        只有管道拒绝列表输入（TypeError/ValueError）或输出无法按条拆分时才记住“不支持批量”；
+        模型加载失败等其他异常只影响本次调用。
+        """
+        try:
+            pipeline = self.get_pipeline()
+        except Exception as e:
+            self.logger.info(f"模型管道不可用，本批改为逐条推理: {e}")
+            return None
+        try:
+            self.logger.info(f"🎵 开始批量推理，本批 {len(prompts)} 条...")
+            self._apply_seed(seed)
+            output = pipeline(text_inputs=list(prompts), **params)
+        except (TypeError, ValueError) as e:
+            self.logger.info(f"模型管道不支持批量输入，改为逐条推理: {e}")
+            self._batch_supported = False
+            return None
+        except Exception as e:
+            self.logger.warning(f"⚠️ 批量推理失败，本批改为逐条推理: {e}")
+            return None
+        outputs = self._split_batch_output(output, len(prompts))
+        if outputs is None:
+            self.logger.info("无法识别批量推理的输出，改为逐条推理")
+            self._batch_supported = False
+            return None
+        self._batch_supported = True
+        return outputs
+        
+    @staticmethod
+    def _split_batch_output(output: Any, count: int) -> Optional[List[Dict[str, Any]]]:
+        """把批量推理（text_inputs 为列表）的输出拆成逐条结果，无法识别时返回None
+
+        音频数组的第一维等于提示词条数时按第一维拆分：二维为 (批, 采样) 的单声道批次，
+        三维为 (批, 声道, 采样)。只有单条提示词时，(2, N) 这样的二维数组视为一条立体声音频。
+        """
+        if isinstance(output, (list, tuple)) and len(output) == count and all(isinstance(o, dict) for o in output):
+            return [dict(o) for o in output]
+        if not isinstance(output, dict) or 'output_audio' not in output:
+            return None
+        audio = output['output_audio']
+        extras = {k: v for k, v in output.items() if k != 'output_audio'}
+        if isinstance(audio, (list, tuple)) and len(audio) == count:
+            return [dict(extras, output_audio=item) for item in audio]
+        shape = getattr(audio, 'shape', None)
+        if shape is None:
+            return None
+        if count == 1 and len(shape) in (1, 2) and shape[0] != 1:
+            return [dict(output)]
+        if len(shape) in (2, 3) and shape[0] == count:
+            return [dict(extras, output_audio=audio[i]) for i in range(count)]
+        return None
+        
+    def run_inference(self, prompt: str, seed: Optional[int] = None,
+                      params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """在当前进程内执行一次推理（不经过结果缓存）"""
+        pipeline = self.get_pipeline()
+        
+        # 添加更详细的日志
+        self.logger.info("🎵 开始音乐生成推理...")
+        self._apply_seed(seed)
+        return pipeline(text_inputs=prompt, **(params or {}))
+        
+    def shutdown(self):
+        """释放资源（停止推理子进程）"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
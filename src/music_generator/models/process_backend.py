@@ -0,0 +1,237 @@
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from ..utils.resource_usage import current_rss_bytes
+
+
+def _json_safe(result: Dict[str, Any]) -> Dict[str, Any]:
+    """只保留可JSON序列化的字段（音频数组通过共享内存传回）"""
+    meta = {}
+    for name, value in result.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        meta[name] = value
+    return meta
+
+
+def _worker_main(conn, config_file: str):
+    """推理子进程入口：在子进程中加载模型管道并循环处理请求"""
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - [推理进程] %(message)s")
+    logger = logging.getLogger(__name__)
+
+    from ..config.config_manager import ConfigManager
+    from .modelscope_client import ModelScopeClient
+
+    client = ModelScopeClient(ConfigManager(config_file), inference_mode="thread")
+    # 上一次结果所在的共享内存：Windows 上最后一个句柄关闭时映射即被销毁，
+    # 因此要保持打开，直到父进程复制完数据后发来下一条消息
+    pending_shm = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            message = None
+        if pending_shm is not None:
+            pending_shm.close()
+            pending_shm = None
+        if message is None:
+            break
+        command = message[0]
+        try:
+            if command == "warmup":
+                client.get_pipeline()
+                conn.send(("ok", None, current_rss_bytes()))
+                continue
+
+            _, prompt, seed, params = message
+            result = dict(client.run_inference(prompt, seed, params))
+            audio = np.ascontiguousarray(np.asarray(result.pop("output_audio")))
+            if audio.dtype.kind not in "fiu":
+                raise TypeError(f"不支持的音频数据类型: {audio.dtype}")
+            # 音频写入共享内存，父进程复制后负责 unlink；本进程在收到下一条消息时关闭句柄
+            pending_shm = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 1))
+            np.ndarray(audio.shape, dtype=audio.dtype, buffer=pending_shm.buf)[...] = audio
+            payload = {
+                "shm_name": pending_shm.name,
+                "shape": audio.shape,
+                "dtype": audio.dtype.str,
+                "meta": _json_safe(result),
+            }
+            conn.send(("ok", payload, current_rss_bytes()))
+        except Exception as e:
+            logger.error(f"❌ 推理进程处理请求失败: {e}")
+            conn.send(("error", str(e), current_rss_bytes()))
+
+
+def _read_shared_audio(payload: Dict[str, Any]) -> np.ndarray:
+    """从子进程创建的共享内存中复制音频并释放该内存块"""
+    shm = shared_memory.SharedMemory(name=payload["shm_name"])
+    try:
+        return np.ndarray(tuple(payload["shape"]), dtype=np.dtype(payload["dtype"]), buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+class _Worker:
+    """父进程中的推理子进程句柄"""
+
+    def __init__(self, ctx, config_file: str, index: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, config_file),
+                                   name=f"inference-worker-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs_done = 0
+        self.rss_bytes: Optional[int] = None
+        # 子进程中的模型管道是否已加载（预热或推理成功过一次）
+        self.pipeline_loaded = False
+
+    def request(self, message):
+        """发送请求并等待结果；结果音频在本子进程被再次使用前从共享内存复制出来"""
+        self.conn.send(message)
+        status, payload, self.rss_bytes = self.conn.recv()
+        if status == "ok":
+            self.pipeline_loaded = True
+        if status == "ok" and isinstance(payload, dict) and "shm_name" in payload:
+            try:
+                payload = dict(payload, audio=_read_shared_audio(payload))
+            except (OSError, ValueError) as e:
+                # 读取失败不代表子进程异常，不触发回收
+                return "error", f"读取推理结果失败: {e}"
+        return status, payload
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ProcessInferencePool:
+    """多进程推理后端
+
+    模型管道运行在常驻子进程中：推理不与Tk主进程争用GIL，
+    子进程崩溃或内存暴涨也不会拖垮GUI。音频通过共享内存传回，
+    子进程在完成 max_jobs_per_worker 个任务或RSS超过上限后自动回收重建。
+    """
+
+    def __init__(self, config_file: str, workers: int = 1, max_jobs_per_worker: int = 20,
+                 max_rss_bytes: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.config_file = config_file
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_bytes = max_rss_bytes
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self._stats = {"jobs": 0, "failed": 0, "crashes": 0, "recycled": 0}
+        self._all_workers = set()
+        # None 表示空闲槽位尚未启动子进程，首次使用时再创建
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        for _ in range(max(1, workers)):
+            self._idle.put(None)
+
+    def _spawn(self) -> _Worker:
+        with self._lock:
+            self._spawned += 1
+            index = self._spawned
+        self.logger.info(f"启动推理子进程 #{index}")
+        worker = _Worker(self._ctx, self.config_file, index)
+        with self._lock:
+            self._all_workers.add(worker)
+        return worker
+
+    def _retire(self, worker: _Worker):
+        with self._lock:
+            self._all_workers.discard(worker)
+        worker.stop()
+
+    def _should_recycle(self, worker: _Worker) -> bool:
+        if self.max_jobs_per_worker and worker.jobs_done >= self.max_jobs_per_worker:
+            self.logger.info(f"推理子进程已完成 {worker.jobs_done} 个任务，回收重建")
+            return True
+        if self.max_rss_bytes and worker.rss_bytes and worker.rss_bytes > self.max_rss_bytes:
+            self.logger.warning(f"⚠️ 推理子进程内存 {worker.rss_bytes / 1024 / 1024:.0f}MB 超过上限，回收重建")
+            return True
+        return False
+
+    def _request(self, message):
+        """取一个空闲子进程发送请求，返回 (status, payload)"""
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.process.is_alive():
+                worker = self._spawn()
+            try:
+                return worker.request(message)
+            except (EOFError, OSError) as e:
+                with self._lock:
+                    self._stats["crashes"] += 1
+                self.logger.error(f"❌ 推理子进程异常退出: {e}")
+                self._retire(worker)
+                worker = None
+                raise Exception(f"推理进程异常退出: {e}") from e
+        finally:
+            if worker is not None and message[0] == "generate":
+                worker.jobs_done += 1
+                if self._should_recycle(worker):
+                    with self._lock:
+                        self._stats["recycled"] += 1
+                    self._retire(worker)
+                    worker = None
+            self._idle.put(worker)
+
+    def warmup(self):
+        """启动一个子进程并预先加载模型管道"""
+        status, payload = self._request(("warmup",))
+        if status != "ok":
+            raise Exception(f"推理进程加载模型失败: {payload}")
+
+    def run(self, prompt: str, seed: Optional[int] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """在子进程中执行一次推理，返回与管道相同格式的结果"""
+        status, payload = self._request(("generate", prompt, seed, params or {}))
+        with self._lock:
+            self._stats["jobs"] += 1
+            if status != "ok":
+                self._stats["failed"] += 1
+        if status != "ok":
+            raise Exception(payload)
+
+        result = dict(payload["meta"])
+        result["output_audio"] = payload["audio"]
+        return result
+
+    def is_ready(self) -> bool:
+        """是否有存活的子进程已加载好模型管道（可以立即推理）"""
+        with self._lock:
+            return any(w.pipeline_loaded and w.process.is_alive() for w in self._all_workers)
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取子进程池统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["workers_alive"] = sum(1 for w in self._all_workers if w.process.is_alive())
+        return stats
+
+    def shutdown(self):
+        """停止所有推理子进程"""
+        with self._lock:
+            workers = list(self._all_workers)
+            self._all_workers.clear()
+        for worker in workers:
+            worker.stop()
+        self.logger.info("推理子进程已全部停止")
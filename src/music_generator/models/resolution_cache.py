@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+
+def get_library_version(package: str) -> str:
+    """获取已安装库的版本号（不导入库本身）"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:  # pragma: no cover - Python < 3.8
+        return "unknown"
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return "not-installed"
+
+
+class ResolutionCache:
+    """模型解析结果缓存
+
+    记录上一次成功加载的 (model_id, revision, task) 组合，
+    下次启动时直接使用，避免逐个尝试模型和任务类型。
+    缓存键包含配置的模型ID、版本以及 modelscope/torch 版本，
+    任意一项变化都会自动失效。
+    """
+
+    CACHE_VERSION = 1
+    LIBRARIES = ("modelscope", "torch")
+
+    def __init__(self, cache_dir: str = "cache", filename: str = "model_resolution.json"):
+        self.cache_file = Path(cache_dir) / filename
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # 上次读取的缓存文件内容：((修改时间, 文件大小), 数据)；文件未变化时不再重新解析
+        self._loaded: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+
+    def make_key(self, model_id: str, model_revision: Optional[str], candidates=()) -> str:
+        """根据模型配置和库版本生成缓存键"""
+        payload = {
+            "cache_version": self.CACHE_VERSION,
+            "model_id": model_id,
+            "model_revision": model_revision,
+            "candidates": [list(c) for c in candidates],
+            "libraries": {name: get_library_version(name) for name in self.LIBRARIES},
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            stat = self.cache_file.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._loaded is None or self._loaded[0] != signature:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._loaded = (signature, data if isinstance(data, dict) else {})
+            return dict(self._loaded[1])
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ 模型解析缓存损坏，已忽略: {e}")
+            return {}
+
+    def _save(self, data: Dict[str, Any]):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_file.replace(self.cache_file)
+        self._loaded = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的解析结果，不存在时返回None"""
+        with self._lock:
+            entry = self._load().get(key)
+        if entry:
+            self.logger.debug(f"命中模型解析缓存: {entry}")
+        return entry
+
+    def put(self, key: str, model_id: str, revision: Optional[str], task: Optional[str]):
+        """保存成功的解析结果；同一配置只保留最新的一条"""
+        entry = {"model_id": model_id, "revision": revision, "task": task}
+        try:
+            with self._lock:
+                # 只保留当前键，旧配置/旧版本的记录自然失效
+                self._save({key: entry})
+            self.logger.info(f"已缓存模型解析结果: {model_id} ({task or '自动推断'})")
+        except OSError as e:
+            self.logger.warning(f"⚠️ 写入模型解析缓存失败: {e}")
+
+    def invalidate(self, key: Optional[str] = None):
+        """清除缓存；指定key时只清除该条目"""
+        with self._lock:
+            data = self._load()
+            if key is None:
+                data = {}
+            else:
+                data.pop(key, None)
+            try:
+                self._save(data)
+            except OSError as e:
+                self.logger.warning(f"⚠️ 清除模型解析缓存失败: {e}")
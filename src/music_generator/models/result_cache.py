@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+class ResultCache:
+    """生成结果缓存（内容寻址，磁盘存储）
+
+    以规范化提示词、模型ID、版本、随机种子和生成参数的哈希作为键，
+    将生成的音频保存为 .npz 文件；总大小超过上限时按最近最少使用（LRU）淘汰。
+    """
+
+    SUFFIX = ".npz"
+    TMP_SUFFIX = ".tmp" + SUFFIX
+    # 启动时删除超过该时长（秒）未修改的临时文件
+    STALE_TMP_SECONDS = 600
+
+    def __init__(self, cache_dir: str = "cache", max_bytes: int = 1024 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir) / "results"
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # key -> 文件大小，按访问时间从旧到新排列
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._scan()
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """规范化提示词：统一全/半角、合并空白、忽略大小写"""
+        prompt = unicodedata.normalize("NFKC", prompt)
+        return " ".join(prompt.split()).lower()
+
+    def make_key(self, prompt: str, model_id: str, revision: Optional[str],
+                 seed: Optional[int] = None, params: Optional[Dict[str, Any]] = None,
+                 task: Optional[str] = None) -> str:
+        """生成缓存键"""
+        payload = {
+            "prompt": self.normalize_prompt(prompt),
+            "model_id": model_id,
+            "revision": revision,
+            "task": task,
+            "seed": seed,
+            "params": params or {},
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.SUFFIX}"
+
+    def _scan(self):
+        """启动时扫描缓存目录，按修改时间恢复LRU顺序
+
+        写入中途退出留下的临时文件（*.tmp.npz）不计入缓存；超过 STALE_TMP_SECONDS 的直接删除
+        （更新的可能是其他进程正在写入的文件）。
+        """
+        if not self.cache_dir.exists():
+            return
+        files = []
+        now = time.time()
+        for path in self.cache_dir.glob(f"*{self.SUFFIX}"):
+            try:
+                stat = path.stat()
+                if path.name.endswith(self.TMP_SUFFIX):
+                    if now - stat.st_mtime > self.STALE_TMP_SECONDS:
+                        path.unlink()
+                    continue
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self.logger.debug(f"结果缓存: {len(self._entries)} 条, {self._total_bytes} 字节")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存结果，未命中返回None"""
+        import numpy as np
+        with self._lock:
+            if key not in self._entries:
+                self._stats["misses"] += 1
+                return None
+            path = self._path(key)
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    result = json.loads(str(data["meta"]))
+                    result["output_audio"] = data["output_audio"]
+                os.utime(path)
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"⚠️ 结果缓存条目损坏，已删除: {e}")
+                self._remove(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        self.logger.info(f"✅ 命中生成结果缓存: {key[:12]}")
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> bool:
+        """保存生成结果；无法序列化的音频对象不缓存"""
+        import numpy as np
+        audio = np.asarray(result.get("output_audio"))
+        if audio.dtype.kind not in "fiu":
+            self.logger.debug("生成结果不是数值数组，跳过缓存")
+            return False
+        # 其余字段只保留可JSON序列化的部分
+        meta = {}
+        for name, value in result.items():
+            if name == "output_audio":
+                continue
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+            meta[name] = value
+        path = self._path(key)
+        tmp_path = path.with_name(f"{key}.{threading.get_ident()}{self.TMP_SUFFIX}")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            np.savez(tmp_path, output_audio=audio, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+            size = tmp_path.stat().st_size
+            if size > self.max_bytes:
+                tmp_path.unlink()
+                return False
+            with self._lock:
+                tmp_path.replace(path)
+                if key in self._entries:
+                    self._total_bytes -= self._entries.pop(key)
+                self._entries[key] = size
+                self._total_bytes += size
+                self._stats["stores"] += 1
+                self._evict()
+        except OSError as e:
+            self.logger.warning(f"⚠️ 写入结果缓存失败: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return False
+        return True
+
+    def _remove(self, key: str):
+        size = self._entries.pop(key, 0)
+        self._total_bytes -= size
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """淘汰最久未使用的条目，直到总大小不超过上限"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+            self.logger.debug(f"淘汰结果缓存条目: {oldest[:12]}")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取命中/未命中等统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._total_bytes
+        return stats
@@ -0,0 +1,226 @@
+"""
+DiffRhythm谛韵音乐生成器 - 本地HTTP生成服务
+多个用户共享同一个已预热的模型管道；相同的进行中请求合并为一次推理
+"""
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+
+from .config.config_manager import ConfigManager
+from .models.modelscope_client import ModelScopeClient
+from .models.result_cache import ResultCache
+from .utils.audio_buffer import audio_from_result
+from .utils.audio_processor import AudioProcessor
+from .utils.job_scheduler import Job, JobScheduler, JobStatus, QueueFullError
+from .utils.logging_config import setup_logging
+
+CONTENT_TYPES = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "mp3": "audio/mpeg",
+}
+# 响应体分块写出的大小（音频已完整编码，只是避免一次写入整段数据）
+WRITE_CHUNK_SIZE = 64 * 1024
+
+
+class GenerationService:
+    """生成服务：任务调度 + 进行中请求合并"""
+
+    def __init__(self, client: ModelScopeClient, audio_processor: AudioProcessor,
+                 workers: int = 1, max_queue: int = 16):
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self.audio_processor = audio_processor
+        self.scheduler = JobScheduler(workers=workers, max_queue=max_queue, name="http")
+        self._lock = threading.Lock()
+        # 请求键 -> 进行中的任务；相同请求等待同一个任务
+        self._inflight: Dict[str, Job] = {}
+        self._coalesced = 0
+
+    @staticmethod
+    def request_key(prompt: str, seed: Optional[int], params: Dict[str, Any], audio_format: str) -> str:
+        payload = {
+            "prompt": ResultCache.normalize_prompt(prompt),
+            "seed": seed,
+            "params": params,
+            "format": audio_format,
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _generate(self, prompt: str, seed: Optional[int], params: Dict[str, Any], audio_format: str) -> bytes:
+        result = self.client.generate_music(prompt, seed=seed, **params)
+        audio = self.audio_processor.post_process(audio_from_result(result))
+        return self.audio_processor.encode_audio(audio, audio_format)
+
+    def submit(self, prompt: str, seed: Optional[int] = None, params: Optional[Dict[str, Any]] = None,
+               audio_format: str = "wav") -> Tuple[Job, bool]:
+        """提交生成请求，返回 (任务, 是否合并到已有任务)；队列已满时抛出 QueueFullError"""
+        params = params or {}
+        key = self.request_key(prompt, seed, params, audio_format)
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None and job.status not in JobStatus.FINISHED:
+                self._coalesced += 1
+                self.logger.info(f"合并相同的进行中请求: {job.job_id}")
+                return job, True
+            job = self.scheduler.submit(self._generate, prompt, seed, params, audio_format)
+            self._inflight[key] = job
+        job.add_done_callback(lambda finished: self._forget(key, finished))
+        return job, False
+
+    def _forget(self, key: str, job: Job):
+        with self._lock:
+            if self._inflight.get(key) is job:
+                del self._inflight[key]
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "warmup_state": self.client.warmup_state,
+            "pipeline_loaded": self.client.is_ready(),
+        }
+
+    def queue_stats(self) -> Dict[str, Any]:
+        stats = self.scheduler.get_stats()
+        with self._lock:
+            stats["inflight"] = len(self._inflight)
+            stats["coalesced"] = self._coalesced
+        return stats
+
+    def shutdown(self):
+        self.scheduler.shutdown(wait=False)
+
+
+class GenerationRequestHandler(BaseHTTPRequestHandler):
+    """HTTP接口
+
+    GET  /health    服务状态
+    GET  /queue     队列深度等统计
+    POST /generate  {"prompt", "seed", "params", "format"}，返回编码后的音频
+
+    生成和编码全部完成后才开始响应（带 Content-Length），音频按 64KiB 分块写出，
+    不是边生成边传输。
+    """
+
+    server_version = "DiffRhythmServer/1.0"
+    service: GenerationService = None
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug("%s - %s" % (self.address_string(), format % args))
+
+    def _send_json(self, status: HTTPStatus, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, self.service.health())
+        elif self.path == "/queue":
+            self._send_json(HTTPStatus.OK, self.service.queue_stats())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+            prompt = str(request.get("prompt", "")).strip()
+            audio_format = str(request.get("format", "wav")).lower()
+            params = request.get("params") or {}
+            seed = request.get("seed")
+            if not prompt:
+                raise ValueError("缺少 prompt")
+            if audio_format not in CONTENT_TYPES or not self.service.audio_processor.encoders.supports(audio_format):
+                raise ValueError(f"不支持的音频格式: {audio_format}")
+            if not isinstance(params, dict):
+                raise ValueError("params 必须是对象")
+            if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+                raise ValueError("seed 必须是整数或 null")
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        try:
+            job, coalesced = self.service.submit(prompt, seed, params, audio_format)
+        except QueueFullError as e:
+            self._send_json(HTTPStatus.TOO_MANY_REQUESTS, {"error": str(e)})
+            return
+
+        job.wait()
+        if job.status != JobStatus.DONE:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR,
+                            {"error": str(job.error) if job.error else job.status, "job_id": job.job_id})
+            return
+
+        audio_bytes = job.result
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPES[audio_format])
+        self.send_header("Content-Length", str(len(audio_bytes)))
+        self.send_header("X-Job-Id", job.job_id)
+        self.send_header("X-Coalesced", "1" if coalesced else "0")
+        self.end_headers()
+        view = memoryview(audio_bytes)
+        for offset in range(0, len(view), WRITE_CHUNK_SIZE):
+            self.wfile.write(view[offset:offset + WRITE_CHUNK_SIZE])
+
+
+def create_server(service: GenerationService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """创建HTTP服务器（port=0 时自动分配端口）"""
+    handler = type("BoundGenerationRequestHandler", (GenerationRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[list] = None) -> int:
+    """HTTP生成服务入口"""
+    parser = argparse.ArgumentParser(prog="diyun-music-server", description="DiffRhythm谛韵音乐生成器 - 本地HTTP生成服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认仅本机）")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--config", default="config/config.ini", help="配置文件路径")
+    parser.add_argument("--no-warmup", action="store_true", help="启动时不预热模型")
+    args = parser.parse_args(argv)
+
+    setup_logging(logging.INFO, config_file=args.config)
+    config_manager = ConfigManager(args.config)
+    client = ModelScopeClient(config_manager)
+    service = GenerationService(
+        client, AudioProcessor.from_config(config_manager),
+        workers=int(config_manager.get_value("scheduler", "workers", "1")),
+        max_queue=int(config_manager.get_value("scheduler", "max_queue", "4")),
+    )
+    if not args.no_warmup:
+        client.start_warmup()
+
+    server = create_server(service, args.host, args.port)
+    logging.info(f"HTTP生成服务已启动: http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("用户中断，HTTP生成服务退出")
+    finally:
+        server.server_close()
+        service.shutdown()
+        client.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
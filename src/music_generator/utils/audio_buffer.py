@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from .audio_stream import as_frames
+
+DEFAULT_SAMPLE_RATE = 44100
+# 管道结果中表示采样率的字段（不同模型的命名不一致）
+SAMPLE_RATE_KEYS = ("sample_rate", "sampling_rate", "sr")
+
+
+class AudioBuffer:
+    """内存中的音频：持有生成结果的原始数组及其采样率
+
+    播放和编码直接读取原数组（np.asarray(buffer) 不复制数据）。确实需要文件路径时（如用 playsound 播放），
+    在本对象独占的临时目录中按格式写一次文件，之后再需要同一格式（包括保存）时直接复用，不再重新编码。
+    对象被回收或调用 cleanup() 时删除临时目录，并发的生成任务之间互不覆盖。
+    """
+
+    def __init__(self, samples: Any, sample_rate: int = DEFAULT_SAMPLE_RATE):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self._files: Dict[str, str] = {}
+        # 由音频派生、只需计算一次的数据（如波形峰值）
+        self._derived: Dict[str, Any] = {}
+        self._temp_dir: Optional[str] = None
+        self._finalizer = None
+        self._lock = threading.Lock()
+
+    def __array__(self, dtype=None, copy=None):
+        import numpy as np
+        return np.asarray(self.samples, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self.frames
+
+    @property
+    def frames(self) -> int:
+        """帧数"""
+        return len(as_frames(self.samples))
+
+    @property
+    def duration(self) -> float:
+        """时长（秒）"""
+        return self.frames / self.sample_rate
+
+    def _ensure_temp_dir(self) -> str:
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix="diyun-audio-")
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._temp_dir, True)
+        return self._temp_dir
+
+    def encoded_file(self, extension: str) -> Optional[str]:
+        """已编码的指定格式文件路径，没有时返回None"""
+        path = self._files.get(extension.lower().lstrip("."))
+        return path if path and os.path.exists(path) else None
+
+    def file_for(self, extension: str, writer: Callable[[str], Any]) -> str:
+        """返回指定格式的文件路径；第一次需要时调用 writer(path) 在临时目录中写入"""
+        extension = extension.lower().lstrip(".")
+        with self._lock:
+            path = self.encoded_file(extension)
+            if path is None:
+                path = os.path.join(self._ensure_temp_dir(), f"audio.{extension}")
+                writer(path)
+                self._files[extension] = path
+            return path
+
+    def cached(self, name: str, factory: Callable[[], Any]) -> Any:
+        """返回名为 name 的派生数据，第一次调用时用 factory() 计算"""
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = factory()
+            return self._derived[name]
+
+    def cleanup(self):
+        """删除临时目录及其中已编码的文件"""
+        with self._lock:
+            self._files.clear()
+            if self._finalizer is not None:
+                self._finalizer()
+                self._finalizer = None
+                self._temp_dir = None
+
+    def __repr__(self):
+        return f"AudioBuffer(frames={self.frames}, sample_rate={self.sample_rate})"
+
+
+def audio_from_result(result: Mapping[str, Any], default_rate: int = DEFAULT_SAMPLE_RATE) -> Any:
+    """从管道结果构建带真实采样率的 AudioBuffer
+
+    结果中没有采样率字段时使用 default_rate；带 write_audio 方法的模型输出对象自带采样率，原样返回。
+    """
+    audio = result["output_audio"]
+    if isinstance(audio, AudioBuffer) or hasattr(audio, 'write_audio'):
+        return audio
+    sample_rate = next((result[key] for key in SAMPLE_RATE_KEYS if result.get(key)), default_rate)
+    return AudioBuffer(audio, int(sample_rate))
@@ -0,0 +1,261 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .audio_stream import as_float32, as_frames
+
+
+class PlaybackState:
+    """播放状态"""
+    STOPPED = "stopped"
+    PLAYING = "playing"
+    PAUSED = "paused"
+
+
+class NullAudioOutput:
+    """空音频设备：丢弃音频数据，用于测试和没有声卡的环境
+
+    realtime=True 时按实际播放速度消费数据，否则立即返回。
+    """
+
+    def __init__(self, realtime: bool = False):
+        self.realtime = realtime
+        self.sample_rate = None
+        self.channels = None
+        self.frames_written = 0
+
+    def open(self, sample_rate: int, channels: int):
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    def write(self, block):
+        self.frames_written += len(block)
+        if self.realtime:
+            time.sleep(len(block) / self.sample_rate)
+
+    def close(self):
+        pass
+
+
+class SoundDeviceOutput:
+    """声卡输出（需要可选依赖 sounddevice）"""
+
+    def __init__(self):
+        import sounddevice  # 未安装时抛出 ImportError
+        self._sounddevice = sounddevice
+        self._stream = None
+
+    def open(self, sample_rate: int, channels: int):
+        self._stream = self._sounddevice.OutputStream(samplerate=sample_rate, channels=channels, dtype="float32")
+        self._stream.start()
+
+    def write(self, block):
+        self._stream.write(block)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+def default_output():
+    """返回可用的声卡输出；未安装 sounddevice 时返回None"""
+    try:
+        return SoundDeviceOutput()
+    except ImportError:
+        return None
+
+
+class AudioPlayer:
+    """非阻塞音频播放引擎
+
+    直接播放内存中的 numpy 数组（不重新解码文件），在独立线程中按小块写入输出设备，
+    支持暂停、继续、停止和跳转；play() 立即返回，不会阻塞生成任务。
+    流式管道的输出用 open_stream() / feed() / end_stream() 逐块送入，收到第一块即开始播放。
+    """
+
+    def __init__(self, output=None, block_frames: int = 2048,
+                 on_state_change: Optional[Callable[[str], None]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.output = output if output is not None else NullAudioOutput()
+        self.block_frames = block_frames
+        self.on_state_change = on_state_change
+        self.state = PlaybackState.STOPPED
+        self.sample_rate = 0
+        self._buffer = None
+        self._position = 0
+        self._generation = 0
+        # 音频是否已全部送达；流式播放时播放到已收到的末尾会等待后续的块
+        self._complete = True
+        self._stream_generation = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def _set_state(self, state: str):
+        self.state = state
+        if self.on_state_change:
+            try:
+                self.on_state_change(state)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 播放状态回调出错: {e}")
+
+    def play(self, audio: Any, sample_rate: int):
+        """开始播放一段音频（会先停止当前播放）"""
+        self.stop()
+        frames = as_frames(audio)
+        with self._cond:
+            self._buffer = frames
+            self.sample_rate = sample_rate
+            self._position = 0
+            self._complete = True
+            self._generation += 1
+            generation = self._generation
+        self._start(generation)
+        self.logger.info(f"开始播放音频: {self.duration:.1f}s @ {sample_rate}Hz")
+
+    def open_stream(self, sample_rate: int):
+        """准备流式播放（会先停止当前播放）：之后用 feed() 追加音频块，第一块到达时开始播放"""
+        self.stop()
+        with self._cond:
+            self._buffer = None
+            self.sample_rate = sample_rate
+            self._position = 0
+            self._complete = False
+            self._generation += 1
+            self._stream_generation = self._generation
+
+    def feed(self, chunk: Any):
+        """追加一块流式音频；流已结束或已被停止时忽略"""
+        import numpy as np
+        frames = as_frames(chunk)
+        with self._cond:
+            if self._complete or self._generation != self._stream_generation or not len(frames):
+                return
+            first = self._buffer is None
+            # 复制一份：流式管道可能复用同一个缓冲区产出后续的块
+            self._buffer = np.array(frames) if first else np.concatenate((self._buffer, frames))
+            generation = self._generation
+            self._cond.notify_all()
+        if first:
+            self._start(generation)
+            self.logger.info(f"收到第一块音频，开始流式播放 @ {self.sample_rate}Hz")
+
+    def end_stream(self):
+        """流式音频已全部送达，播放到末尾后结束"""
+        with self._cond:
+            self._complete = True
+            self._stream_generation = None
+            self._cond.notify_all()
+
+    def _start(self, generation: int):
+        self._set_state(PlaybackState.PLAYING)
+        self._thread = threading.Thread(target=self._run, args=(generation,), name="audio-player", daemon=True)
+        self._thread.start()
+
+    def _waiting(self, generation: int) -> bool:
+        """暂停中，或流式播放已追上已收到的音频"""
+        if self._generation != generation:
+            return False
+        return self.state == PlaybackState.PAUSED or (not self._complete and self._position >= len(self._buffer))
+
+    def _run(self, generation: int):
+        import numpy as np
+        buffer = self._buffer
+        channels = 1 if buffer.ndim == 1 else buffer.shape[1]
+        try:
+            self.output.open(self.sample_rate, channels)
+            while True:
+                with self._cond:
+                    while self._waiting(generation):
+                        self._cond.wait()
+                    if self._generation != generation or self.state == PlaybackState.STOPPED:
+                        return
+                    buffer = self._buffer
+                    start = self._position
+                    if start >= len(buffer):
+                        break
+                    self._position = min(start + self.block_frames, len(buffer))
+                block = np.ascontiguousarray(as_float32(buffer[start:start + self.block_frames]))
+                self.output.write(block)
+        except Exception as e:
+            self.logger.error(f"❌ 播放失败: {e}")
+        finally:
+            try:
+                self.output.close()
+            except Exception as e:
+                self.logger.warning(f"⚠️ 关闭音频设备出错: {e}")
+        with self._cond:
+            finished = self._generation == generation and self.state != PlaybackState.STOPPED
+        if finished:
+            self._set_state(PlaybackState.STOPPED)
+            self.logger.info("✅ 音频播放完成")
+
+    def pause(self):
+        """暂停播放"""
+        with self._cond:
+            if self.state != PlaybackState.PLAYING:
+                return
+            self.state = PlaybackState.PAUSED
+        self._set_state(PlaybackState.PAUSED)
+
+    def resume(self):
+        """继续播放"""
+        with self._cond:
+            if self.state != PlaybackState.PAUSED:
+                return
+            self.state = PlaybackState.PLAYING
+            self._cond.notify_all()
+        self._set_state(PlaybackState.PLAYING)
+
+    def toggle_pause(self):
+        """在暂停和播放之间切换"""
+        if self.state == PlaybackState.PLAYING:
+            self.pause()
+        elif self.state == PlaybackState.PAUSED:
+            self.resume()
+
+    def stop(self):
+        """停止播放并等待播放线程退出"""
+        with self._cond:
+            was_active = self.state != PlaybackState.STOPPED
+            self.state = PlaybackState.STOPPED
+            self._generation += 1
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+        if was_active:
+            self._set_state(PlaybackState.STOPPED)
+
+    def seek(self, seconds: float):
+        """跳转到指定时间（秒）"""
+        with self._cond:
+            if self._buffer is None:
+                return
+            self._position = max(0, min(len(self._buffer), int(seconds * self.sample_rate)))
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待播放结束，返回是否在超时前结束"""
+        thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    @property
+    def position(self) -> float:
+        """当前播放位置（秒）"""
+        with self._cond:
+            if self._buffer is None or not self.sample_rate:
+                return 0.0
+            return min(self._position, len(self._buffer)) / self.sample_rate
+
+    @property
+    def duration(self) -> float:
+        """当前音频时长（秒）"""
+        if self._buffer is None or not self.sample_rate:
+            return 0.0
+        return len(self._buffer) / self.sample_rate
@@ -1,45 +1,319 @@
+import contextvars
+import io
 import logging
-from typing import Any
-import soundfile as sf
-import numpy as np
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Union
 import os
 
+from .audio_buffer import DEFAULT_SAMPLE_RATE, AudioBuffer
+from .audio_player import AudioPlayer, default_output
+from .audio_stream import as_frames, iter_audio_chunks
+from .encoders import Encoder, EncoderRegistry, get_encoder_registry
+from .logging_config import log_stage, log_timing
+from .post_processing import PostProcessingChain, build_chain, resample
+
+# 保存进度回调：progress(file_path, 已写入帧数, 总帧数)，总帧数未知时为None
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+
+# soundfile / numpy 在首次使用时才导入，避免拖慢窗口启动
+
 
 class AudioProcessor:
     """音频处理工具类"""
     
-    def __init__(self):
+    def __init__(self, player: Optional[AudioPlayer] = None, save_workers: int = 4, bitrate_kbps: int = 192,
+                 post_processing: Optional[PostProcessingChain] = None):
         self.logger = logging.getLogger(__name__)
+        # 有损格式（MP3）导出码率
+        self.bitrate_kbps = bitrate_kbps
+        # 生成结果的后处理链（归一化、裁剪静音、淡入淡出、重采样），默认不处理
+        self.post_processing = post_processing or PostProcessingChain()
+        # 内存播放引擎；未指定时在首次播放时按可用的声卡创建
+        self.player = player
+        self._player_checked = player is not None
+        # 后台编码线程池，首次异步保存时创建
+        self.save_workers = save_workers
+        self._save_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config_manager, **kwargs) -> "AudioProcessor":
+        """按配置 [audio] 创建音频处理器"""
+        kwargs.setdefault("bitrate_kbps", int(config_manager.get_value("audio", "bitrate_kbps", "192")))
+        kwargs.setdefault("post_processing", build_chain(config_manager))
+        return cls(**kwargs)
+    
+    @property
+    def encoders(self) -> EncoderRegistry:
+        """可用编码器注册表（进程内只探测一次）"""
+        return get_encoder_registry()
+    
+    def _open_sink(self, encoder: Encoder, file_path: Any, sample_rate: int):
+        return encoder.open_sink(file_path, sample_rate, bitrate_kbps=self.bitrate_kbps)
+    
+    @staticmethod
+    def _sample_rate(audio_data: Any, sample_rate: Optional[int]) -> int:
+        """未指定采样率时使用音频对象自带的采样率"""
+        if sample_rate is not None:
+            return sample_rate
+        return getattr(audio_data, 'sample_rate', None) or DEFAULT_SAMPLE_RATE
     
-    def save_audio(self, audio_data: Any, file_path: str, sample_rate: int = 44100):
+    def _at_rate(self, audio_data: Any, sample_rate: Optional[int]):
+        """返回 (要写出的音频, 采样率)
+        
+        音频对象自带采样率（AudioBuffer）且与指定的采样率不同时先多相重采样，而不是只改写文件头中的采样率；
+        指定的采样率只作为不带采样率的原始数组的采样率。
+        """
+        own_rate = getattr(audio_data, 'sample_rate', None)
+        if (sample_rate is None or not own_rate or own_rate == sample_rate
+                or hasattr(audio_data, 'write_audio') or hasattr(audio_data, '__next__')):
+            return audio_data, self._sample_rate(audio_data, sample_rate)
+        with log_stage(self.logger, "resample", f"重采样 {own_rate}Hz -> {sample_rate}Hz", level=logging.DEBUG):
+            samples = resample(as_frames(audio_data.samples), own_rate, sample_rate)
+        return AudioBuffer(samples, sample_rate), sample_rate
+    
+    @staticmethod
+    def _extension(file_path: Any) -> str:
+        return os.path.splitext(os.fspath(file_path))[1].lower().lstrip(".")
+        
+    def _copy_encoded(self, audio_data: Any, file_path: str) -> bool:
+        """音频对象已有同格式的编码文件时直接复制，返回是否已复制"""
+        if not isinstance(audio_data, AudioBuffer):
+            return False
+        encoded = audio_data.encoded_file(os.path.splitext(file_path)[1])
+        if encoded is None:
+            return False
+        shutil.copyfile(encoded, file_path)
+        self.logger.info(f"✅ 已复用编码好的音频文件保存到: {file_path}")
+        return True
+    
+    def post_process(self, audio_data: Any, sample_rate: Optional[int] = None) -> Any:
+        """对生成的音频执行后处理链，返回 AudioBuffer
+        
+        未配置任何阶段或音频对象不是数组（如带 write_audio 的模型输出）时原样返回；
+        float32 数组会被原地修改。
+        """
+        if not self.post_processing or hasattr(audio_data, 'write_audio'):
+            return audio_data
+        sample_rate = self._sample_rate(audio_data, sample_rate)
+        samples = audio_data.samples if isinstance(audio_data, AudioBuffer) else audio_data
+        started = time.perf_counter()
+        samples, sample_rate = self.post_processing(samples, sample_rate)
+        log_timing(self.logger, "post_process", started, "音频后处理完成", stages=len(self.post_processing))
+        return AudioBuffer(samples, sample_rate)
+    
+    def save_audio(self, audio_data: Any, file_path: str, sample_rate: Optional[int] = None):
         """保存音频数据到文件"""
+        audio_data, sample_rate = self._at_rate(audio_data, sample_rate)
         try:
             self.logger.info(f"开始保存音频到: {file_path}")
-            # 如果音频数据有write_audio方法（如ModelScope的输出），则直接使用
-            if hasattr(audio_data, 'write_audio'):
-                audio_data.write_audio(file_path, samplerate=sample_rate)
-            else:
-                # 否则使用soundfile保存
-                sf.write(file_path, audio_data, sample_rate)
+            with log_stage(self.logger, "save", "保存音频", format=self._extension(file_path)) as fields:
+                # 已有同格式的临时文件时直接复制，不再重新编码
+                fields["reused"] = self._copy_encoded(audio_data, file_path)
+                if fields["reused"]:
+                    return
+                # 如果音频数据有write_audio方法（如ModelScope的输出），则直接使用
+                if hasattr(audio_data, 'write_audio'):
+                    audio_data.write_audio(file_path, samplerate=sample_rate)
+                else:
+                    # 否则按块写入
+                    self.stream_audio(audio_data, file_path, sample_rate)
             self.logger.info(f"✅ 音频已成功保存到: {file_path}")
         except Exception as e:
             self.logger.error(f"❌ 保存音频失败: {e}")
             raise
             
+    def save_audio_async(self, audio_data: Any, file_paths: Union[str, Iterable[str]],
+                         sample_rate: Optional[int] = None,
+                         progress: Optional[ProgressCallback] = None) -> List["Future[str]"]:
+        """在后台线程池中保存音频，立即返回
+        
+        file_paths 可以是多个路径（如 .wav/.flac/.ogg），同一份音频并行编码为各个格式；
+        每个路径对应一个 Future，结果为保存的文件路径，失败时抛出编码异常。
+        progress 在工作线程中随写入进度调用。
+        """
+        if isinstance(file_paths, (str, os.PathLike)):
+            file_paths = [file_paths]
+        executor = self._get_save_executor()
+        # 在提交时的上下文中执行，保存日志带有发起保存的任务ID
+        return [executor.submit(contextvars.copy_context().run, self._save_with_progress, audio_data,
+                                os.fspath(path), sample_rate, progress)
+                for path in file_paths]
+        
+    def _get_save_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._save_executor is None:
+                self._save_executor = ThreadPoolExecutor(max_workers=self.save_workers,
+                                                         thread_name_prefix="audio-save")
+            return self._save_executor
+        
+    def _save_with_progress(self, audio_data: Any, file_path: str, sample_rate: Optional[int],
+                            progress: Optional[ProgressCallback]) -> str:
+        audio_data, sample_rate = self._at_rate(audio_data, sample_rate)
+        if (progress is None or hasattr(audio_data, 'write_audio') or hasattr(audio_data, '__next__')
+                or (isinstance(audio_data, AudioBuffer) and audio_data.encoded_file(os.path.splitext(file_path)[1]))):
+            self.save_audio(audio_data, file_path, sample_rate)
+            if progress is not None:
+                progress(file_path, 1, 1)
+            return file_path
+        total = len(as_frames(audio_data))
+        written = 0
+        
+        def on_chunk(chunk):
+            nonlocal written
+            written += len(chunk)
+            progress(file_path, written, total)
+        
+        self.logger.info(f"开始保存音频到: {file_path}")
+        try:
+            with log_stage(self.logger, "save", "保存音频", format=self._extension(file_path), frames=total):
+                self.stream_audio(audio_data, file_path, sample_rate, consumers=[on_chunk])
+        except Exception as e:
+            self.logger.error(f"❌ 保存音频失败: {e}")
+            raise
+        self.logger.info(f"✅ 音频已成功保存到: {file_path}")
+        return file_path
+            
+    def stream_audio(self, audio_data: Any, file_path: str, sample_rate: Optional[int] = None,
+                     consumers: Iterable[Callable[[Any], None]] = ()) -> int:
+        """按固定大小的块写入音频文件，每写完一块就交给消费者（如进度回调）
+        
+        audio_data 可以是整段数组、AudioBuffer，也可以是流式管道产出的音频块迭代器；返回写入的帧数。
+        """
+        audio_data, sample_rate = self._at_rate(audio_data, sample_rate)
+        encoder = self.encoders.for_path(file_path)
+        with self._open_sink(encoder, file_path, sample_rate) as sink:
+            for consumer in consumers:
+                sink.add_consumer(consumer)
+            return sink.write_all(audio_data)
+            
+    def encode_audio(self, audio_data: Any, audio_format: str = "wav", sample_rate: Optional[int] = None) -> bytes:
+        """将音频数据编码为指定格式的字节串（libsndfile 编码时不落盘）"""
+        audio_data, sample_rate = self._at_rate(audio_data, sample_rate)
+        encoder = self.encoders.get(audio_format)
+        with log_stage(self.logger, "encode", "音频编码", format=encoder.extension, backend=encoder.backend) as fields:
+            if encoder.backend == "ffmpeg":
+                # ffmpeg 需要可定位的输出文件（容器头在结束时回写）
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    path = os.path.join(tmp_dir, f"audio.{encoder.extension}")
+                    self.stream_audio(audio_data, path, sample_rate)
+                    with open(path, "rb") as f:
+                        data = f.read()
+            else:
+                buffer = io.BytesIO()
+                with self._open_sink(encoder, buffer, sample_rate) as sink:
+                    sink.write_all(audio_data)
+                data = buffer.getvalue()
+            fields["bytes"] = len(data)
+        return data
+            
+    def get_player(self) -> Optional[AudioPlayer]:
+        """获取内存播放引擎；没有可用的声卡输出（未安装sounddevice）时返回None"""
+        if not self._player_checked:
+            self._player_checked = True
+            output = default_output()
+            if output is not None:
+                self.player = AudioPlayer(output)
+            else:
+                self.logger.debug("未安装sounddevice，使用playsound播放文件")
+        return self.player
+        
+    def play_buffer(self, audio_data: Any, sample_rate: Optional[int] = None) -> bool:
+        """在后台线程中直接播放内存中的音频，立即返回；无法内存播放时返回False"""
+        player = self.get_player()
+        if player is None or hasattr(audio_data, 'write_audio'):
+            return False
+        try:
+            # 记录的是开始播放的延迟（播放本身在后台线程中进行）
+            with log_stage(self.logger, "play", "开始内存播放", level=logging.DEBUG):
+                player.play(*self._at_rate(audio_data, sample_rate))
+        except Exception as e:
+            self.logger.error(f"❌ 播放失败: {e}")
+            return False
+        return True
+        
+    def play_stream(self, audio_data: Any, sample_rate: Optional[int] = None,
+                    on_started: Optional[Callable[[], None]] = None) -> Tuple[Any, bool]:
+        """边生成边播放流式管道的输出（音频块迭代器），第一块到达即开始内存播放
+        
+        在调用线程中逐块读取迭代器直到生成结束，返回 (收集到的完整音频 AudioBuffer, 是否已开始播放)；
+        开始播放时调用 on_started()。不是流式输出时原样返回 (audio_data, False)，没有可用的播放器时只收集音频。
+        """
+        samples = audio_data.samples if isinstance(audio_data, AudioBuffer) else audio_data
+        if not hasattr(samples, '__next__'):
+            return audio_data, False
+        import numpy as np
+        sample_rate = self._sample_rate(audio_data, sample_rate)
+        player = self.get_player()
+        chunks = []
+        started = time.perf_counter()
+        if player is not None:
+            player.open_stream(sample_rate)
+        try:
+            for chunk in iter_audio_chunks(samples):
+                if not len(chunk):
+                    continue
+                if not chunks:
+                    log_timing(self.logger, "first_chunk", started, "收到第一块音频", level=logging.DEBUG)
+                chunks.append(np.array(chunk))
+                if player is not None:
+                    player.feed(chunk)
+                    if len(chunks) == 1 and on_started is not None:
+                        on_started()
+        finally:
+            if player is not None:
+                player.end_stream()
+        frames = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+        return AudioBuffer(frames, sample_rate), player is not None and bool(chunks)
+        
+    def stop_playback(self):
+        """停止当前的内存播放"""
+        if self.player is not None:
+            self.player.stop()
+            
     def play_audio(self, file_path: str):
-        """播放音频文件"""
+        """播放音频文件（阻塞到播放结束，仅在无法内存播放时使用）"""
         try:
             self.logger.info(f"开始播放音频: {file_path}")
             from playsound import playsound
-            playsound(file_path)
+            with log_stage(self.logger, "play", "播放音频文件"):
+                playsound(file_path)
             self.logger.info(f"✅ 音频播放完成: {file_path}")
         except ImportError:
             self.logger.warning("⚠️ 未安装playsound，跳过播放")
         except Exception as e:
             self.logger.error(f"❌ 播放失败: {e}")
             
-    def create_temp_audio(self, audio_data: Any, temp_path: str = "temp_music.mp3", sample_rate: int = 44100):
-        """创建临时音频文件"""
+    def create_temp_audio(self, audio_data: Any, temp_path: Optional[str] = None, sample_rate: Optional[int] = None,
+                          consumers: Iterable[Callable[[Any], None]] = ()) -> str:
+        """在需要文件路径时（如用 playsound 播放）创建临时音频文件；consumers 会随写入进度逐块收到音频
+        
+        未指定路径时使用编码最快的无损格式（通常为WAV），写入独占的临时目录而不是当前目录：
+        AudioBuffer 每种格式只写一次，之后保存为同一格式时直接复用。
+        """
+        original = audio_data
+        audio_data, sample_rate = self._at_rate(audio_data, sample_rate)
+        if temp_path is None:
+            extension = self.encoders.temp_encoder().extension
+            # 重采样得到的是新的临时对象，文件不能放在它的临时目录中（对象回收时会被删除）
+            if isinstance(audio_data, AudioBuffer) and audio_data is original and not consumers:
+                return audio_data.file_for(extension, lambda path: self.save_audio(audio_data, path, sample_rate))
+            temp_path = os.path.join(tempfile.mkdtemp(prefix="diyun-audio-"), f"audio.{extension}")
         self.logger.info(f"创建临时音频文件: {temp_path}")
-        self.save_audio(audio_data, temp_path, sample_rate)
-        return temp_path
\ No newline at end of file
+        if consumers and not hasattr(audio_data, 'write_audio'):
+            self.stream_audio(audio_data, temp_path, sample_rate, consumers)
+        else:
+            self.save_audio(audio_data, temp_path, sample_rate)
+        return temp_path
+        
+    def shutdown(self, wait: bool = True):
+        """停止播放并关闭后台编码线程池（wait=True 时等待未完成的保存）"""
+        self.stop_playback()
+        with self._executor_lock:
+            executor, self._save_executor = self._save_executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,126 @@
+import logging
+import os
+from typing import Any, Callable, Iterator, List, Optional
+
+# 每块的帧数（44.1kHz 下约1.5秒）
+DEFAULT_CHUNK_FRAMES = 65536
+
+
+def as_frames(audio: Any):
+    """把音频整理为 (帧数,) 或 (帧数, 声道数) 的数组视图
+
+    模型常输出 (声道数, 帧数) 的数组，这里只做转置视图，不复制数据。
+    """
+    import numpy as np
+    audio = np.asarray(audio)
+    if audio.ndim == 2 and audio.shape[0] <= 8 and audio.shape[0] < audio.shape[1]:
+        audio = audio.T
+    return audio
+
+
+def as_float32(audio: Any):
+    """转换为 float32 数组：整数PCM按类型的最大值缩放到 [-1, 1]（无符号类型先减去中点），已是 float32 时不复制"""
+    import numpy as np
+    audio = np.asarray(audio)
+    if audio.dtype.kind == "i":
+        converted = audio.astype(np.float32)
+        converted /= np.float32(np.iinfo(audio.dtype).max)
+        return converted
+    if audio.dtype.kind == "u":
+        midpoint = np.float32((int(np.iinfo(audio.dtype).max) + 1) / 2)
+        converted = audio.astype(np.float32)
+        converted -= midpoint
+        converted /= midpoint
+        return converted
+    return audio.astype(np.float32, copy=False)
+
+
+def iter_audio_chunks(audio: Any, chunk_frames: int = DEFAULT_CHUNK_FRAMES) -> Iterator[Any]:
+    """按固定帧数切分音频
+
+    整段数组按帧切片（只产生视图）；管道若返回可迭代的音频块（流式输出），则按到达顺序逐块产出。
+    """
+    if hasattr(audio, "__next__"):
+        for block in audio:
+            yield as_frames(block)
+        return
+    frames = as_frames(audio)
+    for start in range(0, len(frames), chunk_frames):
+        yield frames[start:start + chunk_frames]
+
+
+class StreamingAudioSink:
+    """流式音频写入器
+
+    逐块写入音频文件，同时把每个块分发给消费者（例如进度回调或网络发送），
+    播放可以在第一块写完后立即开始，长音频也不需要在内存中再生成一份完整副本。
+    """
+
+    def __init__(self, file_path: str, sample_rate: int, channels: Optional[int] = None,
+                 audio_format: Optional[str] = None, subtype: Optional[str] = None,
+                 chunk_frames: int = DEFAULT_CHUNK_FRAMES, **sf_options):
+        self.logger = logging.getLogger(__name__)
+        self.file_path = file_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.audio_format = audio_format
+        self.subtype = subtype
+        self.chunk_frames = chunk_frames
+        # 传给 soundfile 的额外编码参数（如 compression_level、bitrate_mode）
+        self.sf_options = sf_options
+        self.frames_written = 0
+        self._consumers: List[Callable[[Any], None]] = []
+        # 文件在写入第一块时才创建，未指定声道数时由第一块决定
+        self._file = None
+
+    def _open(self, chunk: Any):
+        import soundfile as sf
+        if self.channels is None:
+            self.channels = 1 if chunk.ndim == 1 else chunk.shape[1]
+        self._file = sf.SoundFile(self.file_path, mode="w", samplerate=self.sample_rate,
+                                  channels=self.channels, format=self.audio_format, subtype=self.subtype,
+                                  **self.sf_options)
+
+    def _write_frames(self, chunk: Any):
+        self._file.write(chunk)
+        self._file.flush()
+
+    def add_consumer(self, consumer: Callable[[Any], None]):
+        """注册块消费者，每写入一块调用一次 consumer(chunk)"""
+        self._consumers.append(consumer)
+
+    def write(self, chunk: Any):
+        """写入一块音频并分发给消费者"""
+        if self._file is None:
+            self._open(chunk)
+        self._write_frames(chunk)
+        self.frames_written += len(chunk)
+        for consumer in self._consumers:
+            try:
+                consumer(chunk)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 音频块消费者出错: {e}")
+
+    def write_all(self, audio: Any) -> int:
+        """把整段音频（或流式音频块）按块写入，返回写入的帧数"""
+        for chunk in iter_audio_chunks(audio, self.chunk_frames):
+            self.write(chunk)
+        return self.frames_written
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None and isinstance(self.file_path, (str, os.PathLike)):
+            # 写入失败时删除不完整的文件
+            try:
+                os.remove(self.file_path)
+            except OSError:
+                pass
+        return False
+
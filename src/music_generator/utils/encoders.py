@@ -0,0 +1,196 @@
+import io
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from typing import Any, Dict, List, Optional
+
+from .audio_stream import DEFAULT_CHUNK_FRAMES, StreamingAudioSink, as_float32
+
+# MP3 码率范围（kbps），libsndfile 用 0~1 的压缩级别表示：0 为最高码率
+MP3_MAX_KBPS = 320
+MP3_MIN_KBPS = 32
+
+
+def mp3_compression_level(bitrate_kbps: int) -> float:
+    """把MP3码率换算为 libsndfile 的压缩级别"""
+    level = (MP3_MAX_KBPS - bitrate_kbps) / (MP3_MAX_KBPS - MP3_MIN_KBPS)
+    return min(0.99, max(0.0, level))
+
+
+# Vorbis 质量（libsndfile 中为 1 - 压缩级别）与近似码率（kbps，44.1kHz 立体声）的对应关系
+VORBIS_QUALITY_KBPS = ((0.0, 64), (0.1, 80), (0.2, 96), (0.3, 112), (0.4, 128), (0.5, 160),
+                       (0.6, 192), (0.7, 224), (0.8, 256), (0.9, 320), (1.0, 500))
+
+
+def vorbis_compression_level(bitrate_kbps: int) -> float:
+    """把目标码率换算为 libsndfile 的 Vorbis 压缩级别（Vorbis 为可变码率，按质量档位线性插值）"""
+    quality = VORBIS_QUALITY_KBPS[-1][0]
+    for (low_q, low_kbps), (high_q, high_kbps) in zip(VORBIS_QUALITY_KBPS, VORBIS_QUALITY_KBPS[1:]):
+        if bitrate_kbps <= high_kbps:
+            quality = low_q + (high_q - low_q) * max(0, bitrate_kbps - low_kbps) / (high_kbps - low_kbps)
+            break
+    return 1.0 - quality
+
+
+class FfmpegAudioSink(StreamingAudioSink):
+    """通过 ffmpeg 子进程编码的流式写入器（libsndfile 不支持目标格式时使用）
+
+    音频块以 32 位浮点 PCM 写入 ffmpeg 的标准输入，由 ffmpeg 按扩展名选择容器。
+    """
+
+    def __init__(self, file_path: str, sample_rate: int, channels: Optional[int] = None,
+                 bitrate_kbps: Optional[int] = None, chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+                 ffmpeg: str = "ffmpeg"):
+        super().__init__(file_path, sample_rate, channels, chunk_frames=chunk_frames)
+        self.bitrate_kbps = bitrate_kbps
+        self.ffmpeg = ffmpeg
+
+    def _open(self, chunk: Any):
+        if self.channels is None:
+            self.channels = 1 if chunk.ndim == 1 else chunk.shape[1]
+        command = [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+                   "-f", "f32le", "-ar", str(self.sample_rate), "-ac", str(self.channels), "-i", "pipe:0"]
+        if self.bitrate_kbps:
+            command += ["-b:a", f"{self.bitrate_kbps}k"]
+        command.append(os.fspath(self.file_path))
+        self._file = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _write_frames(self, chunk: Any):
+        import numpy as np
+        self._file.stdin.write(np.ascontiguousarray(as_float32(chunk)).tobytes())
+
+    def close(self):
+        process, self._file = self._file, None
+        if process is None:
+            return
+        process.stdin.close()
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg 编码失败: {stderr.decode('utf-8', 'replace').strip()}")
+
+
+class Encoder:
+    """一种输出格式的编码方式"""
+
+    def __init__(self, extension: str, lossless: bool, backend: str, sf_format: Optional[str] = None,
+                 subtype: Optional[str] = None, ffmpeg: Optional[str] = None):
+        self.extension = extension
+        self.lossless = lossless
+        self.backend = backend  # libsndfile / ffmpeg
+        self.sf_format = sf_format
+        self.subtype = subtype
+        self.ffmpeg = ffmpeg
+
+    def open_sink(self, file_path: Any, sample_rate: int, channels: Optional[int] = None,
+                  bitrate_kbps: Optional[int] = None,
+                  chunk_frames: int = DEFAULT_CHUNK_FRAMES) -> StreamingAudioSink:
+        """创建该格式的流式写入器；bitrate_kbps 只对有损格式生效"""
+        if self.lossless:
+            bitrate_kbps = None
+        if self.backend == "ffmpeg":
+            return FfmpegAudioSink(file_path, sample_rate, channels, bitrate_kbps, chunk_frames, self.ffmpeg)
+        options = {}
+        if bitrate_kbps and self.sf_format == "MP3":
+            options = {"compression_level": mp3_compression_level(bitrate_kbps), "bitrate_mode": "CONSTANT"}
+        elif bitrate_kbps and self.subtype == "VORBIS":
+            options = {"compression_level": vorbis_compression_level(bitrate_kbps)}
+        return StreamingAudioSink(file_path, sample_rate, channels, audio_format=self.sf_format,
+                                  subtype=self.subtype, chunk_frames=chunk_frames, **options)
+
+    def __repr__(self):
+        return f"Encoder({self.extension}, {self.backend})"
+
+
+class EncoderRegistry:
+    """音频编码器注册表
+
+    启动时探测一次当前环境实际可用的编码器（libsndfile 版本不同，支持的格式也不同；
+    MP3 在 libsndfile 不支持时回退到 ffmpeg），保存时按扩展名选择，不支持的格式直接报错，
+    不会再写出扩展名与内容不符的文件。
+    """
+
+    # (扩展名, soundfile格式, 子类型, 是否无损)；无损格式按编码速度从快到慢排列
+    CANDIDATES = (
+        ("wav", "WAV", "PCM_16", True),
+        ("flac", "FLAC", "PCM_16", True),
+        ("ogg", "OGG", "VORBIS", False),
+        ("mp3", "MP3", "MPEG_LAYER_III", False),
+    )
+    FFMPEG_FALLBACK = ("mp3", "ogg", "flac")
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._encoders: Dict[str, Encoder] = {}
+        self._probe()
+
+    def _probe(self):
+        try:
+            import soundfile as sf
+            formats = sf.available_formats()
+        except (ImportError, OSError) as e:
+            self.logger.warning(f"⚠️ soundfile 不可用: {e}")
+            sf, formats = None, {}
+        for extension, sf_format, subtype, lossless in self.CANDIDATES:
+            if sf_format in formats and self._try_encode(sf, sf_format, subtype):
+                self._encoders[extension] = Encoder(extension, lossless, "libsndfile", sf_format, subtype)
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg:
+            for extension in self.FFMPEG_FALLBACK:
+                if extension not in self._encoders:
+                    lossless = extension == "flac"
+                    self._encoders[extension] = Encoder(extension, lossless, "ffmpeg", ffmpeg=ffmpeg)
+        self.logger.info(f"可用的音频编码器: {self.describe()}")
+
+    @staticmethod
+    def _try_encode(sf, sf_format: str, subtype: str) -> bool:
+        """试编码一小段静音：部分 libsndfile 构建列出了格式但实际无法编码"""
+        import numpy as np
+        try:
+            sf.write(io.BytesIO(), np.zeros(1024, dtype=np.float32), 44100, format=sf_format, subtype=subtype)
+            return True
+        except Exception:
+            return False
+
+    def get(self, extension: str) -> Encoder:
+        """按扩展名获取编码器，不支持时抛出 ValueError"""
+        extension = extension.lower().lstrip(".")
+        encoder = self._encoders.get(extension)
+        if encoder is None:
+            raise ValueError(f"不支持的音频格式: {extension or '(无扩展名)'}，可用格式: {', '.join(self.available())}")
+        return encoder
+
+    def for_path(self, file_path: Any) -> Encoder:
+        """按文件扩展名获取编码器"""
+        return self.get(os.path.splitext(os.fspath(file_path))[1])
+
+    def supports(self, extension: str) -> bool:
+        return extension.lower().lstrip(".") in self._encoders
+
+    def available(self) -> List[str]:
+        return list(self._encoders)
+
+    def temp_encoder(self) -> Encoder:
+        """临时文件使用的编码器：编码最快的无损格式"""
+        for extension, _, _, lossless in self.CANDIDATES:
+            if lossless and extension in self._encoders:
+                return self._encoders[extension]
+        raise ValueError("没有可用的无损音频编码器")
+
+    def describe(self) -> Dict[str, str]:
+        """{扩展名: 编码后端}"""
+        return {extension: encoder.backend for extension, encoder in self._encoders.items()}
+
+
+_registry: Optional[EncoderRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_encoder_registry() -> EncoderRegistry:
+    """获取全局编码器注册表（首次调用时探测，之后复用）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = EncoderRegistry()
+        return _registry
@@ -0,0 +1,222 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from .logging_config import job_context
+
+
+class JobStatus:
+    """任务状态"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+
+class Job:
+    """一个生成任务"""
+
+    def __init__(self, job_id: str, func: Callable, args: tuple, kwargs: dict):
+        self.job_id = job_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = JobStatus.QUEUED
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+        self._callbacks: List[Callable[["Job"], None]] = []
+        self._lock = threading.Lock()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待任务结束，返回是否在超时前结束"""
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, callback: Callable[["Job"], None]):
+        """任务结束（完成/失败/取消）时回调；已结束则立即回调"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _finish(self, status: str, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"⚠️ 任务回调出错 [{self.job_id}]: {e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """任务状态摘要"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": str(self.error) if self.error else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobScheduler:
+    """有界任务队列 + 固定数量的工作线程
+
+    GUI 和无界面入口都通过 submit() 提交生成任务：
+    队列满时抛出 QueueFullError（背压），排队中的任务可以取消，
+    任务按提交顺序执行。
+    """
+
+    def __init__(self, workers: int = 1, max_queue: int = 8, name: str = "generation",
+                 max_history: int = 200):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.max_queue = max_queue
+        self.max_history = max_history
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._queued = 0
+        self._running = 0
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0, "cancelled": 0}
+        self._shutdown = False
+        self._workers = []
+        for i in range(max(1, workers)):
+            worker = threading.Thread(target=self._worker_loop, name=f"{name}-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        self.logger.info(f"任务调度器已启动: {len(self._workers)} 个工作线程, 队列上限 {max_queue}")
+
+    def submit(self, func: Callable, *args, **kwargs) -> Job:
+        """提交任务，返回Job；队列已满时抛出 QueueFullError"""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("任务调度器已关闭")
+            if self._queued >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"任务队列已满（{self.max_queue}），请稍后再试")
+            job = Job(f"{self.name}-{next(self._ids):06d}", func, args, kwargs)
+            self._jobs[job.job_id] = job
+            self._queued += 1
+            self._stats["submitted"] += 1
+            self._prune_history()
+        self._queue.put(job)
+        self.logger.info(f"任务已加入队列: {job.job_id}（排队中: {self._queued}）")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """按ID获取任务"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[str]:
+        """获取任务状态，未知ID返回None"""
+        job = self.get_job(job_id)
+        return job.status if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        """取消排队中的任务；正在运行或已结束的任务无法取消"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JobStatus.QUEUED:
+                return False
+            job.status = JobStatus.CANCELLED
+            self._queued -= 1
+            self._stats["cancelled"] += 1
+        job._finish(JobStatus.CANCELLED)
+        self.logger.info(f"任务已取消: {job_id}")
+        return True
+
+    def queue_depth(self) -> int:
+        """排队中（尚未开始）的任务数"""
+        with self._lock:
+            return self._queued
+
+    def running_count(self) -> int:
+        """正在运行的任务数"""
+        with self._lock:
+            return self._running
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取调度统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queue_depth"] = self._queued
+            stats["running"] = self._running
+            stats["workers"] = len(self._workers)
+        return stats
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = True):
+        """关闭调度器；默认取消所有排队中的任务"""
+        with self._lock:
+            self._shutdown = True
+            pending = [job.job_id for job in self._jobs.values() if job.status == JobStatus.QUEUED]
+        if cancel_pending:
+            for job_id in pending:
+                self.cancel(job_id)
+        for _ in self._workers:
+            self._queue.put(None)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self.logger.info("任务调度器已关闭")
+
+    def _prune_history(self):
+        """只保留最近 max_history 个已结束的任务记录"""
+        excess = len(self._jobs) - self.max_history
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job.status in JobStatus.FINISHED][:excess]:
+            del self._jobs[job_id]
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            with self._lock:
+                if job.status != JobStatus.QUEUED:
+                    continue  # 已取消
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+                self._queued -= 1
+                self._running += 1
+            self.logger.info(f"开始执行任务: {job.job_id}")
+            try:
+                # 任务执行期间的日志都带上任务ID
+                with job_context(job.job_id):
+                    result = job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                self.logger.error(f"❌ 任务失败 [{job.job_id}]: {e}")
+                with self._lock:
+                    self._running -= 1
+                    self._stats["failed"] += 1
+                job._finish(JobStatus.FAILED, error=e)
+            else:
+                with self._lock:
+                    self._running -= 1
+                    self._stats["done"] += 1
+                job._finish(JobStatus.DONE, result=result)
+                self.logger.info(f"✅ 任务完成: {job.job_id}（耗时 {job.finished_at - job.started_at:.1f}s）")
@@ -0,0 +1,321 @@
+import gzip
+import json
+import logging
+import os
+import struct
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .logging_config import LOG_DIR, scan_logs
+
+# 每条日志记录的索引项：(字节偏移, 时间戳, 字节长度, 级别, 记录器编号)
+RECORD = struct.Struct("<QdIBH")
+INDEX_DIR_NAME = ".index"
+INDEX_VERSION = 1
+# 读取记录时，相距不超过该字节数的记录合并为一次连续读取
+MERGE_GAP_BYTES = 4096
+
+
+class LogEntry:
+    """一条日志记录（可能包含多行，如异常堆栈）"""
+
+    __slots__ = ("file", "offset", "timestamp", "level", "logger", "text")
+
+    def __init__(self, file: Path, offset: int, timestamp: float, level: int, logger: str, text: str):
+        self.file = file
+        self.offset = offset
+        self.timestamp = timestamp
+        self.level = level
+        self.logger = logger
+        self.text = text
+
+    @property
+    def level_name(self) -> str:
+        return logging.getLevelName(self.level) if self.level else "-"
+
+    def __repr__(self):
+        return f"LogEntry({self.file.name}@{self.offset}, {self.level_name}, {self.logger})"
+
+
+def parse_header(line: bytes) -> Optional[Tuple[float, int, str]]:
+    """解析一行日志的开头，返回 (时间戳, 级别, 记录器名)；不是新记录的开头（如堆栈的续行）时返回None
+
+    同时支持文本格式（"2024-01-01 12:00:00,123 - 名称 - INFO - 消息"）和 JSON Lines 格式。
+    """
+    if line.startswith(b"{"):
+        try:
+            entry = json.loads(line)
+            timestamp, level_name, logger_name = float(entry["ts"]), entry["level"], entry["logger"]
+        except (ValueError, KeyError, TypeError):
+            return None
+    else:
+        header = _parse_text_header(line)
+        if header is None:
+            return None
+        timestamp, level_name, logger_name = header
+    level = logging.getLevelName(level_name)
+    return timestamp, level if isinstance(level, int) else 0, logger_name
+
+
+def _parse_text_header(line: bytes) -> Optional[Tuple[float, str, str]]:
+    if len(line) < 23 or line[4:5] != b"-" or line[10:11] != b" " or line[19:20] != b",":
+        return None
+    parts = line.split(b" - ", 3)
+    if len(parts) < 4:
+        return None
+    try:
+        stamp = line[:23].decode("ascii")
+        timestamp = datetime(int(stamp[0:4]), int(stamp[5:7]), int(stamp[8:10]), int(stamp[11:13]),
+                             int(stamp[14:16]), int(stamp[17:19]), int(stamp[20:23]) * 1000).timestamp()
+    except ValueError:
+        return None
+    return timestamp, parts[2].decode("ascii", "replace"), parts[1].decode("utf-8", "replace")
+
+
+class FileIndex:
+    """单个日志文件的索引：<日志目录>/.index/<文件名>.idx（定长索引项）和 .json（已索引的字节数、记录器名表）
+
+    每次使用前只解析上次索引位置之后新追加的完整行；文件变小（被截断或替换）时重建。
+    """
+
+    def __init__(self, log_file: Path, index_dir: Path):
+        self.log_file = Path(log_file)
+        self.index_path = index_dir / f"{self.log_file.name}.idx"
+        self.meta_path = index_dir / f"{self.log_file.name}.json"
+        self.indexed_bytes = 0
+        self.loggers: List[str] = []
+        self._logger_ids: Dict[str, int] = {}
+        self.records: List[Tuple[int, float, int, int, int]] = []
+        # 压缩文件的解压内容：((修改时间, 文件大小), 数据)
+        self._decompressed: Optional[Tuple[Tuple[int, int], bytes]] = None
+
+    @property
+    def compressed(self) -> bool:
+        return self.log_file.name.endswith(".gz")
+
+    def _load(self):
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                return
+            with open(self.index_path, "rb") as f:
+                # 只信任元数据中记录的条数（写入中途退出时索引文件末尾可能有多余的项）
+                data = f.read(meta["count"] * RECORD.size)
+        except (OSError, ValueError, KeyError):
+            return
+        if len(data) != meta["count"] * RECORD.size:
+            return
+        self.indexed_bytes = meta["indexed_bytes"]
+        self.loggers = meta["loggers"]
+        self._logger_ids = {name: i for i, name in enumerate(self.loggers)}
+        self.records = list(RECORD.iter_unpack(data))
+
+    def _reset(self):
+        self.indexed_bytes = 0
+        self.loggers = []
+        self._logger_ids = {}
+        self.records = []
+
+    def _decompress(self) -> bytes:
+        """压缩后的文件不会再变化，解压结果缓存在内存中，只在文件被替换时重新解压"""
+        stat = self.log_file.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._decompressed is None or self._decompressed[0] != signature:
+            with gzip.open(self.log_file, "rb") as f:
+                self._decompressed = (signature, f.read())
+        return self._decompressed[1]
+
+    def _read_from(self, offset: int) -> bytes:
+        if self.compressed:
+            return self._decompress()[offset:]
+        with open(self.log_file, "rb") as f:
+            f.seek(offset)
+            return f.read()
+
+    def _size(self) -> int:
+        return self.log_file.stat().st_size
+
+    def update(self) -> "FileIndex":
+        """把上次索引之后新追加的内容加入索引"""
+        if not self.records and not self.indexed_bytes:
+            self._load()
+        if self.compressed and self.indexed_bytes:
+            return self  # 压缩后的文件不会再变化
+        if not self.compressed and self._size() < self.indexed_bytes:
+            self._reset()
+        data = self._read_from(self.indexed_bytes)
+        complete = data.rfind(b"\n") + 1
+        if complete == 0:
+            return self
+        first_new = len(self.records)
+        offset = self.indexed_bytes
+        for line in data[:complete].splitlines(keepends=True):
+            header = parse_header(line)
+            if header is None and self.records:
+                # 续行（如异常堆栈）归入上一条记录
+                position, timestamp, length, level, logger_id = self.records[-1]
+                self.records[-1] = (position, timestamp, length + len(line), level, logger_id)
+                first_new = min(first_new, len(self.records) - 1)
+            else:
+                timestamp, level, logger_name = header or (0.0, 0, "")
+                logger_id = self._logger_ids.get(logger_name)
+                if logger_id is None:
+                    logger_id = self._logger_ids[logger_name] = len(self.loggers)
+                    self.loggers.append(logger_name)
+                self.records.append((offset, timestamp, len(line), level, logger_id))
+            offset += len(line)
+        self.indexed_bytes = offset
+        self._save(first_new)
+        return self
+
+    def _save(self, first_changed: int):
+        """从第 first_changed 项开始写回索引（之前的项不变），再原子地替换元数据"""
+        self.index_path.parent.mkdir(exist_ok=True)
+        mode = "r+b" if self.index_path.exists() and first_changed else "wb"
+        with open(self.index_path, mode) as f:
+            f.seek(first_changed * RECORD.size)
+            f.write(b"".join(RECORD.pack(*record) for record in self.records[first_changed:]))
+            f.truncate()
+        partial = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "indexed_bytes": self.indexed_bytes,
+                       "count": len(self.records), "loggers": self.loggers}, f, ensure_ascii=False)
+        os.replace(partial, self.meta_path)
+
+    def select(self, min_level: int = 0, start: Optional[float] = None, end: Optional[float] = None,
+               logger: Optional[str] = None) -> List[Tuple[int, float, int, int, int]]:
+        """只用索引筛选记录，不读取日志内容"""
+        logger_ids = None
+        if logger:
+            logger_ids = {i for i, name in enumerate(self.loggers) if name.startswith(logger)}
+        return [record for record in self.records
+                if record[3] >= min_level
+                and (start is None or record[1] >= start)
+                and (end is None or record[1] <= end)
+                and (logger_ids is None or record[4] in logger_ids)]
+
+    def read(self, records: Iterable[Tuple[int, float, int, int, int]]) -> List[LogEntry]:
+        """读取指定记录的内容（只读取这些记录所在的字节范围，相邻的记录合并为一次连续读取）"""
+        entries = []
+        records = list(records)
+        if not records:
+            return entries
+        data = self._decompress() if self.compressed else None
+        with open(self.log_file, "rb") if data is None else nullcontext() as f:
+            for start, end, run in _merge_ranges(records):
+                if data is None:
+                    f.seek(start)
+                    chunk = f.read(end - start)
+                else:
+                    chunk = data[start:end]
+                for offset, timestamp, length, level, logger_id in run:
+                    raw = chunk[offset - start:offset - start + length]
+                    entries.append(LogEntry(self.log_file, offset, timestamp, level, self.loggers[logger_id],
+                                            raw.decode("utf-8", "replace")))
+        return entries
+
+
+def _merge_ranges(records: List[Tuple[int, float, int, int, int]]) -> List[Tuple[int, int, list]]:
+    """把相邻（间隔不超过 MERGE_GAP_BYTES）的记录合并成连续的读取范围，返回 [(起始偏移, 结束偏移, 记录列表)]"""
+    ranges = []
+    for record in records:
+        offset, end = record[0], record[0] + record[2]
+        if ranges and 0 <= offset - ranges[-1][1] <= MERGE_GAP_BYTES:
+            ranges[-1][1] = end
+            ranges[-1][2].append(record)
+        else:
+            ranges.append([offset, end, [record]])
+    return [tuple(item) for item in ranges]
+
+
+class LogIndex:
+    """日志目录的索引，支持按级别、时间范围、记录器和子串跨所有日志文件检索
+
+    级别、时间和记录器只用索引筛选；子串匹配只读取筛选后的记录，不会每次都重新扫描整个文件。
+    """
+
+    def __init__(self, log_dir=LOG_DIR):
+        self.log_dir = Path(log_dir)
+        self.index_dir = self.log_dir / INDEX_DIR_NAME
+        self._files: Dict[str, FileIndex] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, existing: Iterable[Path]):
+        """删除已不存在的日志文件的索引（被保留策略清理或手动删除）"""
+        names = {path.name for path in existing}
+        for name in list(self._files):
+            if name not in names:
+                del self._files[name]
+        try:
+            entries = list(os.scandir(self.index_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            log_name = entry.name
+            for suffix in (".tmp", ".json", ".idx"):
+                log_name = log_name[:-len(suffix)] if log_name.endswith(suffix) else log_name
+            if log_name not in names:
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+
+    def update(self) -> List[FileIndex]:
+        """更新所有日志文件的索引，按时间从旧到新返回"""
+        with self._lock:
+            logs = [path for path, _ in reversed(scan_logs(self.log_dir))]
+            self._prune(logs)
+            indexes = []
+            for path in logs:
+                index = self._files.get(path.name)
+                if index is None:
+                    index = self._files[path.name] = FileIndex(path, self.index_dir)
+                try:
+                    indexes.append(index.update())
+                except OSError as e:
+                    logging.getLogger(__name__).warning(f"⚠️ 无法索引日志文件 {path.name}: {e}")
+            return indexes
+
+    def search(self, min_level: int = 0, start: Optional[float] = None, end: Optional[float] = None,
+               text: Optional[str] = None, logger: Optional[str] = None, limit: int = 1000) -> List[LogEntry]:
+        """跨所有日志文件检索，返回按时间排序的最近 limit 条记录
+
+        min_level 为最低级别（如 logging.WARNING），start/end 为 Unix 时间戳，text 为不区分大小写的子串。
+        """
+        needle = text.casefold() if text else None
+        results: List[LogEntry] = []
+        # 从最新的文件往前找，够 limit 条即停止
+        for index in reversed(self.update()):
+            records = index.select(min_level, start, end, logger)
+            if needle is None:
+                records = records[-(limit - len(results)):]
+            entries = index.read(records)
+            if needle is not None:
+                entries = [entry for entry in entries if needle in entry.text.casefold()]
+            results[:0] = entries[-(limit - len(results)):]
+            if len(results) >= limit:
+                break
+        results.sort(key=lambda entry: entry.timestamp)
+        return results
+
+
+def parse_time(text: str) -> Optional[float]:
+    """解析检索框中输入的时间（"2024-01-01"、"2024-01-01 12:00"、"2024-01-01 12:00:00"），空字符串返回None"""
+    text = text.strip()
+    if not text:
+        return None
+    for pattern in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, pattern).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间: {text}（格式如 2024-01-01 12:00:00）")
+
+
+def format_entries(entries: Iterable[LogEntry]) -> str:
+    """把检索结果拼成显示文本，每条记录前标注所在的日志文件"""
+    return "".join(f"[{entry.file.name}] {entry.text}" for entry in entries)
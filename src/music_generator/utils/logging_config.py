@@ -1,22 +1,351 @@
+import atexit
+import configparser
+import copy
+import gzip
+import json
 import logging
 import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Dict, Optional
 
 
-def setup_logging(log_level=logging.INFO):
+# 异步日志队列的默认容量（条）
+DEFAULT_QUEUE_SIZE = 10000
+
+LOG_DIR = Path("logs")
+LOG_PREFIX = "music_generator_"
+MB = 1024 * 1024
+# 文本格式（默认）的日志行格式
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# 当前正在执行的生成任务ID（JobScheduler 执行任务时设置），附加到该任务期间的每条日志记录上
+_job_id: ContextVar[Optional[str]] = ContextVar("log_job_id", default=None)
+
+
+def read_logging_config(config_file="config/config.ini") -> Dict[str, str]:
+    """读取配置文件的 [logging] 段（日志系统在 ConfigManager 之前初始化，因此直接用 configparser 读取）"""
+    parser = configparser.ConfigParser()
+    try:
+        parser.read(config_file, encoding='utf-8')
+    except configparser.Error:
+        return {}
+    return dict(parser['logging']) if parser.has_section('logging') else {}
+
+
+@contextmanager
+def job_context(job_id: Optional[str]):
+    """在 with 块内把日志记录关联到指定的任务ID"""
+    token = _job_id.set(job_id)
+    try:
+        yield job_id
+    finally:
+        _job_id.reset(token)
+
+
+def current_job_id() -> Optional[str]:
+    """当前上下文的任务ID，不在任务中时为None"""
+    return _job_id.get()
+
+
+class JobContextFilter(logging.Filter):
+    """把当前任务ID附加到日志记录的 job_id 属性上
+
+    过滤器在调用日志的线程中执行，异步写入时监听线程拿到的记录也带有正确的任务ID。
+    """
+
+    def filter(self, record):
+        if getattr(record, 'job_id', None) is None:
+            record.job_id = _job_id.get()
+        return True
+
+
+def log_timing(logger, stage: str, started: float, message: Optional[str] = None, level=logging.INFO, **fields):
+    """记录一个阶段的耗时
+
+    started 为阶段开始时 time.perf_counter() 的值；stage、duration_ms 和 fields 作为结构化字段
+    附加在日志记录上（JSON 格式时输出为独立字段），文本格式只在消息末尾附上耗时。
+    """
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.log(level, f"{message or stage}，耗时: {duration_ms:.0f} ms",
+               extra={"stage": stage, "duration_ms": duration_ms, "log_fields": fields})
+    return duration_ms
+
+
+@contextmanager
+def log_stage(logger, stage: str, message: Optional[str] = None, level=logging.INFO, **fields):
+    """记录 with 块的耗时（见 log_timing）
+
+    with 语句得到 fields 字典，块内可以补充字段（如编码后的字节数）；块内抛出异常时记录 status=error 后继续抛出。
+    """
+    started = time.perf_counter()
+    try:
+        yield fields
+    except BaseException:
+        log_timing(logger, stage, started, f"{message or stage}失败", level, status="error", **fields)
+        raise
+    log_timing(logger, stage, started, message, level, status="ok", **fields)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """JSON Lines 格式：每条日志一行 JSON，便于离线统计吞吐量和延迟分布
+
+    固定字段为 time、ts（Unix时间戳）、level、logger、job_id、message；
+    log_timing 记录的日志另有 stage、duration_ms 及其附加字段。
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "job_id": getattr(record, 'job_id', None),
+            "message": record.getMessage(),
+        }
+        stage = getattr(record, 'stage', None)
+        if stage is not None:
+            entry["stage"] = stage
+            entry["duration_ms"] = getattr(record, 'duration_ms', None)
+            entry.update(getattr(record, 'log_fields', None) or {})
+        # 经过异步队列的记录只带有已格式化的 exc_text（见 DroppingQueueHandler.prepare）
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LogRotationPolicy:
+    """日志轮转与保留策略（配置 [logging]）
+
+    单个文件超过 max_bytes 或打开超过 rotate_hours 小时后换新文件；
+    日志目录最多保留 max_files 个文件、总计 max_total_bytes 字节、max_age_days 天以内的文件（0 表示不限制），
+    超出时从最旧的开始删除。compress=True 时轮转出的旧文件在后台线程中压缩为 .log.gz。
+    """
+
+    def __init__(self, max_bytes: int = 10 * MB, rotate_hours: float = 24.0, max_files: int = 20,
+                 max_total_bytes: int = 200 * MB, max_age_days: float = 30.0, compress: bool = True):
+        self.max_bytes = max_bytes
+        self.rotate_hours = rotate_hours
+        self.max_files = max_files
+        self.max_total_bytes = max_total_bytes
+        self.max_age_days = max_age_days
+        self.compress = compress
+
+    @classmethod
+    def from_config(cls, config_file="config/config.ini") -> "LogRotationPolicy":
+        """从配置文件的 [logging] 段读取策略；缺少或无法解析的项使用默认值"""
+        section = read_logging_config(config_file)
+        defaults = cls()
+
+        def number(key, default):
+            try:
+                return float(section.get(key, default))
+            except ValueError:
+                return float(default)
+
+        compress = configparser.ConfigParser.BOOLEAN_STATES.get(
+            section.get('compress', '').strip().lower(), defaults.compress)
+        return cls(max_bytes=int(number('max_file_mb', defaults.max_bytes / MB) * MB),
+                   rotate_hours=number('rotate_hours', defaults.rotate_hours),
+                   max_files=int(number('max_files', defaults.max_files)),
+                   max_total_bytes=int(number('max_total_mb', defaults.max_total_bytes / MB) * MB),
+                   max_age_days=number('max_age_days', defaults.max_age_days),
+                   compress=compress)
+
+    def __repr__(self):
+        params = ", ".join(f"{k}={v}" for k, v in vars(self).items())
+        return f"LogRotationPolicy({params})"
+
+
+def compress_log(path):
+    """把日志文件压缩为 .gz（先写临时文件再改名，中途退出不会留下不完整的压缩文件），返回压缩后的路径
+
+    压缩文件沿用原文件的修改时间：保留策略按修改时间排序和计算文件年龄，不能以压缩的时间为准。
+    """
+    path = Path(path)
+    target = path.with_name(path.name + '.gz')
+    partial = target.with_name(target.name + '.tmp')
+    with open(path, 'rb') as src, gzip.open(partial, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    shutil.copystat(path, partial)
+    os.replace(partial, target)
+    path.unlink()
+    return target
+
+
+def apply_retention(policy: LogRotationPolicy, log_dir=LOG_DIR, keep=()):
+    """按保留策略删除最旧的日志文件，keep 中的文件（如正在写入的文件）始终保留；返回删除的文件列表"""
+    keep = {os.path.abspath(path) for path in keep}
+    now = time.time()
+    removed = []
+    total = 0
+    for index, (path, stat) in enumerate(scan_logs(log_dir)):
+        total += stat.st_size
+        if os.path.abspath(path) in keep:
+            continue
+        expired = (
+            (policy.max_files and index >= policy.max_files)
+            or (policy.max_total_bytes and total > policy.max_total_bytes)
+            or (policy.max_age_days and now - stat.st_mtime > policy.max_age_days * 86400)
+        )
+        if expired:
+            try:
+                os.unlink(path)
+                removed.append(path)
+            except OSError:
+                pass
+    return removed
+
+
+class RotatingLogHandler(logging.FileHandler):
+    """按大小和时间轮转的日志文件处理器
+
+    轮转时换用新的带时间戳的文件（与每次启动新建的文件命名一致，日志查看器无需区分），
+    旧文件的压缩和保留策略清理在单独的后台线程中执行，不阻塞写日志的线程。
+    """
+
+    def __init__(self, log_dir=LOG_DIR, policy: Optional[LogRotationPolicy] = None, encoding='utf-8'):
+        self.log_dir = Path(log_dir)
+        self.policy = policy or LogRotationPolicy()
+        self._opened_at = time.time()
+        self._maintenance = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-maintenance")
+        super().__init__(self._new_filename(), encoding=encoding)
+
+    def _new_filename(self) -> Path:
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = self.log_dir / f"{LOG_PREFIX}{stamp}.log"
+        index = 1
+        while path.exists() or path.with_name(path.name + '.gz').exists():
+            path = self.log_dir / f"{LOG_PREFIX}{stamp}_{index}.log"
+            index += 1
+        return path
+
+    def should_rollover(self) -> bool:
+        if self.stream is None:
+            return False
+        if self.policy.rotate_hours and time.time() - self._opened_at >= self.policy.rotate_hours * 3600:
+            return True
+        return bool(self.policy.max_bytes) and self.stream.tell() >= self.policy.max_bytes
+
+    def rollover(self):
+        """关闭当前文件并换用新文件，旧文件交给后台线程压缩和清理"""
+        old = self.baseFilename
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.baseFilename = os.path.abspath(self._new_filename())
+        self._opened_at = time.time()
+        self.stream = self._open()
+        self.schedule_maintenance(old)
+
+    def schedule_maintenance(self, rotated: Optional[str] = None):
+        """在后台线程中压缩轮转出的文件并执行保留策略（解释器退出阶段无法提交时直接在当前线程执行）"""
+        try:
+            self._maintenance.submit(self._maintain, rotated)
+        except RuntimeError:
+            self._maintain(rotated)
+
+    def _maintain(self, rotated: Optional[str]):
+        try:
+            if rotated and self.policy.compress:
+                compress_log(rotated)
+            apply_retention(self.policy, self.log_dir, keep=[self.baseFilename])
+        except Exception as e:
+            # 不能再写日志（会递归进入本处理器），直接输出到标准错误
+            logging.lastResort.handle(logging.makeLogRecord({
+                "levelno": logging.WARNING, "levelname": "WARNING", "msg": f"⚠️ 日志维护失败: {e}"}))
+
+    def emit(self, record):
+        try:
+            if self.should_rollover():
+                self.rollover()
+        except Exception:
+            self.handleError(record)
+        super().emit(record)
+
+    def close(self):
+        super().close()
+        self._maintenance.shutdown(wait=True)
+
+
+# 在调用线程中格式化异常堆栈
+_exception_formatter = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """只把日志记录放入有界队列的处理器：队列已满时丢弃记录并计数，不阻塞调用线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record):
+        """在调用线程中合并消息参数，并把异常堆栈格式化为 exc_text
+
+        默认实现会把堆栈拼进消息并清空 exc_info/exc_text，JSON 格式因此丢失 exc 字段；
+        这里保留 exc_text，由监听线程的格式化器输出。不在队列中保留 exc_info，避免延长堆栈帧的生命周期。
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+
+class FlushingQueueListener(QueueListener):
+    """停止时阻塞等待放入结束标记，确保队列中剩余的记录都被写出"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+# 当前的异步日志状态（重复调用 setup_logging 时先停止旧的监听线程）
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[FlushingQueueListener] = None
+
+
+def setup_logging(log_level=logging.INFO, async_logging=True, queue_size=DEFAULT_QUEUE_SIZE,
+                  config_file="config/config.ini", log_format=None):
     """
     设置应用程序日志记录
+    async_logging=True 时，各线程只把日志记录放入有界队列，由单独的监听线程格式化并写入文件和控制台，
+    推理线程和界面线程不再直接做文件I/O；队列已满时丢弃记录并计数，退出时写出队列中剩余的记录。
+    日志文件按配置文件 [logging] 段的策略轮转和清理（见 LogRotationPolicy）。
+    log_format 为 text（默认）或 json（JSON Lines，见 JsonLinesFormatter），未指定时读取 [logging] format；
+    控制台始终输出文本格式。
     """
-    # 确保日志目录存在
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
+    global _queue_handler, _listener
+    stop_logging()
     
-    # 创建日志文件名（带时间戳）
-    log_filename = log_dir / f"music_generator_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    
-    # 配置日志格式
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    # 确保日志目录存在
+    LOG_DIR.mkdir(exist_ok=True)
+    policy = LogRotationPolicy.from_config(config_file)
+    if log_format is None:
+        log_format = read_logging_config(config_file).get('format', 'text').strip().lower()
+    unknown_format = None if log_format in ('text', 'json') else log_format
+    if unknown_format:
+        log_format = 'text'
     
     # 设置根日志记录器
     root_logger = logging.getLogger()
@@ -25,11 +354,13 @@ def setup_logging(log_level=logging.INFO):
     # 清除现有的处理器
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+        handler.close()
     
-    # 创建文件处理器
-    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
+    # 创建文件处理器（每次启动新建带时间戳的文件，之后按大小和时间轮转）
+    file_handler = RotatingLogHandler(LOG_DIR, policy)
+    log_filename = Path(os.path.relpath(file_handler.baseFilename))
     file_handler.setLevel(log_level)
-    file_formatter = logging.Formatter(log_format)
+    file_formatter = JsonLinesFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
     file_handler.setFormatter(file_formatter)
     
     # 创建控制台处理器
@@ -38,32 +369,149 @@ def setup_logging(log_level=logging.INFO):
     console_formatter = logging.Formatter("%(levelname)s - %(message)s")
     console_handler.setFormatter(console_formatter)
     
-    # 添加处理器到根记录器
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    # 添加处理器到根记录器（任务ID在调用日志的线程中附加）
+    if async_logging:
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = FlushingQueueListener(_queue_handler.queue, file_handler, console_handler,
+                                          respect_handler_level=True)
+        _listener.start()
+        root_handlers = [_queue_handler]
+    else:
+        root_handlers = [file_handler, console_handler]
+    for handler in root_handlers:
+        handler.addFilter(JobContextFilter())
+        root_logger.addHandler(handler)
     
     # 记录日志配置信息
     logging.info("="*60)
     logging.info("音乐生成器日志系统初始化")
     logging.info(f"日志文件: {log_filename}")
     logging.info(f"日志级别: {logging.getLevelName(log_level)}")
+    logging.info(f"异步日志: {'开启' if async_logging else '关闭'}，日志格式: {log_format}")
+    logging.info(f"日志轮转: {policy}")
     logging.info("="*60)
+    if unknown_format:
+        logging.warning(f"⚠️ 未知的日志格式 {unknown_format}，使用文本格式")
+    
+    # 每次启动都会新建文件，启动时也执行一次保留策略
+    file_handler.schedule_maintenance()
     
     return log_filename
 
 
+def dropped_log_records() -> int:
+    """异步日志因队列已满而丢弃的记录数"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def stop_logging():
+    """停止异步日志监听线程：写出队列中剩余的记录，并在有丢弃时补记一条警告（程序退出时自动调用）"""
+    global _queue_handler, _listener
+    listener, handler = _listener, _queue_handler
+    if listener is None:
+        return
+    _listener = _queue_handler = None
+    logging.getLogger().removeHandler(handler)
+    listener.stop()
+    if handler.dropped:
+        record = logging.makeLogRecord({
+            "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+            "msg": f"⚠️ 日志队列已满，共丢弃 {handler.dropped} 条日志记录",
+        })
+        listener.handle(record)
+    for target in listener.handlers:
+        target.close()
+
+
+atexit.register(stop_logging)
+
+
+def scan_logs(log_dir=LOG_DIR):
+    """一次遍历日志目录，返回按修改时间排序（最新的在前）的 [(路径, stat)]，包括压缩过的 .log.gz"""
+    try:
+        entries = [(Path(entry.path), entry.stat()) for entry in os.scandir(log_dir)
+                   if entry.is_file() and entry.name.endswith(('.log', '.log.gz'))]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda item: item[1].st_mtime, reverse=True)
+    return entries
+
+
 def get_existing_logs():
     """
-    获取现有的日志文件列表
+    获取现有的日志文件列表（按修改时间排序，最新的在前；文件数量由保留策略限制）
     """
-    log_dir = Path("logs")
-    if not log_dir.exists():
-        return []
-    
-    log_files = list(log_dir.glob("*.log"))
-    # 按修改时间排序（最新的在前）
-    log_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    return log_files
+    return [path for path, _ in scan_logs(LOG_DIR)]
+
+
+# 从文件末尾向前读取时每次读取的字节数
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def _decode_lines(data):
+    """把以换行结尾的字节块拆成行（保留换行符）
+
+    按 b'\n' 切分后再逐行解码：UTF-8 多字节字符中不会出现 0x0A，因此不会把字符切断。
+    """
+    return [line.rstrip(b'\r').decode('utf-8', errors='replace') + '\n' for line in data.split(b'\n')[:-1]]
+
+
+def _read_tail_blocks(log_file_path, max_lines, block_size):
+    """从文件末尾向前按块读取，直到读到足够的换行；返回 (倒序的块列表, 第一块的起始位置)"""
+    with open(log_file_path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        chunks = []
+        newlines = 0
+        # 多读一个换行，确保第一行是完整的
+        while position > 0 and newlines <= max_lines:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size)
+            chunks.append(chunk)
+            newlines += chunk.count(b'\n')
+    return chunks, position
+
+
+def tail_log_file(log_file_path, max_lines=100, block_size=TAIL_BLOCK_SIZE):
+    """
+    读取日志文件的最后 max_lines 个完整行，返回 (行列表, 偏移量)
+    从文件末尾按块向前读取，只读取需要的字节；偏移量为最后一个完整行之后的位置，
+    可交给 follow_log_file 继续读取新追加的内容。
+    """
+    if str(log_file_path).endswith('.gz'):
+        # 压缩过的轮转文件大小有限，整体解压后按相同方式处理
+        with gzip.open(log_file_path, 'rb') as f:
+            chunks, position = [f.read()], 0
+    else:
+        chunks, position = _read_tail_blocks(log_file_path, max_lines, block_size)
+    data = b''.join(reversed(chunks))
+    # 最后一行尚未写完时暂不返回，留给 follow_log_file
+    complete = data.rfind(b'\n') + 1
+    offset = position + complete
+    data = data[:complete]
+    if position > 0:
+        # 丢弃开头不完整的一行
+        data = data[data.find(b'\n') + 1:]
+    lines = _decode_lines(data)
+    return lines[-max_lines:] if max_lines else [], offset
+
+
+def follow_log_file(log_file_path, offset=0):
+    """
+    读取 offset 之后新追加的完整行，返回 (新行列表, 新偏移量)
+    文件变短（被清空或重新创建）时从头读取；压缩过的轮转文件不会再增长，直接返回空列表。
+    """
+    if str(log_file_path).endswith('.gz'):
+        return [], offset
+    with open(log_file_path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        if offset > size:
+            offset = 0
+        f.seek(offset)
+        data = f.read(size - offset)
+    complete = data.rfind(b'\n') + 1
+    return _decode_lines(data[:complete]), offset + complete
 
 
 def read_log_file(log_file_path, max_lines=100):
@@ -71,9 +519,6 @@ def read_log_file(log_file_path, max_lines=100):
     读取日志文件的最后几行
     """
     try:
-        with open(log_file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            # 返回最后max_lines行
-            return lines[-max_lines:] if len(lines) > max_lines else lines
+        return tail_log_file(log_file_path, max_lines)[0]
     except Exception as e:
-        return [f"无法读取日志文件: {str(e)}"]
\ No newline at end of file
+        return [f"无法读取日志文件: {str(e)}"]
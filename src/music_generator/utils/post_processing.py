@@ -0,0 +1,252 @@
+import logging
+import time
+from functools import lru_cache
+from math import gcd
+from typing import Any, Iterable, List, Tuple
+
+from .audio_stream import as_float32, as_frames
+
+# 各阶段都在 (帧数,) 或 (帧数, 声道数) 的 float32 数组上整体向量化计算，能原地修改的不复制
+
+
+class Stage:
+    """后处理阶段：process(audio, sample_rate) -> (audio, sample_rate)"""
+
+    name = "stage"
+
+    def process(self, audio, sample_rate: int):
+        raise NotImplementedError
+
+    def __repr__(self):
+        params = ", ".join(f"{k}={v}" for k, v in vars(self).items())
+        return f"{type(self).__name__}({params})"
+
+
+class TrimSilence(Stage):
+    """裁掉首尾的静音（按10毫秒分帧取峰值判断），返回原数组的切片视图"""
+
+    name = "trim"
+
+    def __init__(self, threshold_db: float = -60.0, keep_ms: float = 50.0, frame_ms: float = 10.0):
+        self.threshold_db = threshold_db
+        self.keep_ms = keep_ms
+        self.frame_ms = frame_ms
+
+    def process(self, audio, sample_rate):
+        import numpy as np
+        frame = max(1, int(sample_rate * self.frame_ms / 1000))
+        count = len(audio) // frame
+        if count == 0:
+            return audio, sample_rate
+        envelope = np.abs(audio[:count * frame]).reshape(count, -1).max(axis=1)
+        loud = np.flatnonzero(envelope > 10 ** (self.threshold_db / 20))
+        if len(loud) == 0:
+            # 整段都是静音时保持原样，不输出空音频
+            return audio, sample_rate
+        keep = int(sample_rate * self.keep_ms / 1000)
+        start = max(0, loud[0] * frame - keep)
+        end = min(len(audio), (loud[-1] + 1) * frame + keep)
+        return audio[start:end], sample_rate
+
+
+@lru_cache(maxsize=16)
+def resample_kernel(src_rate: int, dst_rate: int):
+    """多相重采样的低通FIR滤波器（Kaiser窗，与 scipy resample_poly 的默认设计相同），按采样率对缓存"""
+    import numpy as np
+    from scipy.signal import firwin
+    divisor = gcd(src_rate, dst_rate)
+    max_rate = max(src_rate, dst_rate) // divisor
+    kernel = firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    return kernel.astype(np.float32)
+
+
+def resample(audio, src_rate: int, dst_rate: int):
+    """多相滤波重采样（沿帧轴），采样率相同时原样返回；整数PCM先缩放为 [-1, 1] 的浮点数"""
+    if src_rate == dst_rate:
+        return audio
+    import numpy as np
+    from scipy.signal import resample_poly
+    divisor = gcd(src_rate, dst_rate)
+    audio = resample_poly(as_float32(audio), dst_rate // divisor, src_rate // divisor, axis=0,
+                          window=resample_kernel(src_rate, dst_rate))
+    return audio.astype(np.float32, copy=False)
+
+
+class Resample(Stage):
+    """重采样到目标采样率（与当前采样率相同时不做任何处理）"""
+
+    name = "resample"
+
+    def __init__(self, target_rate: int):
+        self.target_rate = target_rate
+
+    def process(self, audio, sample_rate):
+        if not self.target_rate:
+            return audio, sample_rate
+        return resample(audio, sample_rate, self.target_rate), self.target_rate
+
+
+class NormalizePeak(Stage):
+    """峰值归一化到目标电平（dBFS）"""
+
+    name = "peak"
+
+    def __init__(self, target_db: float = -1.0):
+        self.target_db = target_db
+
+    def process(self, audio, sample_rate):
+        import numpy as np
+        peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+        if peak > 0:
+            audio *= np.float32(10 ** (self.target_db / 20) / peak)
+        return audio, sample_rate
+
+
+def k_weighting_sos(sample_rate: int):
+    """ITU-R BS.1770 K加权滤波器（高架 + 高通两级双二阶节），按采样率计算系数"""
+    import numpy as np
+    # 高架滤波器（模拟头部声学效应）
+    gain_db, f0, q = 3.999843853973347, 1681.974450955533, 0.7071752369554196
+    k = np.tan(np.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    # 高通滤波器（RLB加权）
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+def integrated_loudness(audio, sample_rate: int) -> float:
+    """按 ITU-R BS.1770-4 计算积分响度（LUFS）：400毫秒块、75%重叠、绝对门限-70和相对门限-10"""
+    import numpy as np
+    from scipy.signal import sosfilt
+    filtered = sosfilt(k_weighting_sos(sample_rate).astype(np.float32), audio, axis=0)
+    # 各声道权重均为1，先按声道求和，再用累加和一次性求出所有块的均方
+    power = np.square(filtered, out=filtered)
+    if power.ndim == 2:
+        power = power.sum(axis=1)
+    cumulative = np.concatenate(([0.0], np.cumsum(power, dtype=np.float64)))
+    block, step = int(0.4 * sample_rate), int(0.1 * sample_rate)
+    if len(power) < block:
+        energies = np.array([cumulative[-1] / max(1, len(power))])
+    else:
+        starts = np.arange(0, len(power) - block + 1, step)
+        energies = (cumulative[starts + block] - cumulative[starts]) / block
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(energies)
+    gated = energies[loudness > -70.0]
+    if len(gated) == 0:
+        return float("-inf")
+    relative_gate = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+    gated = energies[loudness > max(-70.0, relative_gate)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+class NormalizeLoudness(Stage):
+    """响度归一化到目标 LUFS，增益受峰值上限约束（避免削波）"""
+
+    name = "lufs"
+
+    def __init__(self, target_lufs: float = -14.0, peak_db: float = -1.0):
+        self.target_lufs = target_lufs
+        self.peak_db = peak_db
+
+    def process(self, audio, sample_rate):
+        import numpy as np
+        if not len(audio):
+            return audio, sample_rate
+        loudness = integrated_loudness(audio, sample_rate)
+        if not np.isfinite(loudness):
+            return audio, sample_rate
+        gain = 10 ** ((self.target_lufs - loudness) / 20)
+        peak = float(np.max(np.abs(audio)))
+        if peak > 0:
+            gain = min(gain, 10 ** (self.peak_db / 20) / peak)
+        audio *= np.float32(gain)
+        return audio, sample_rate
+
+
+class Fade(Stage):
+    """线性淡入/淡出（原地修改首尾）"""
+
+    name = "fade"
+
+    def __init__(self, fade_in_ms: float = 0.0, fade_out_ms: float = 0.0):
+        self.fade_in_ms = fade_in_ms
+        self.fade_out_ms = fade_out_ms
+
+    def process(self, audio, sample_rate):
+        import numpy as np
+        fade_in = min(len(audio), int(sample_rate * self.fade_in_ms / 1000))
+        fade_out = min(len(audio), int(sample_rate * self.fade_out_ms / 1000))
+        if fade_in:
+            ramp = np.linspace(0.0, 1.0, fade_in, dtype=np.float32)
+            audio[:fade_in] *= ramp if audio.ndim == 1 else ramp[:, None]
+        if fade_out:
+            ramp = np.linspace(1.0, 0.0, fade_out, dtype=np.float32)
+            audio[len(audio) - fade_out:] *= ramp if audio.ndim == 1 else ramp[:, None]
+        return audio, sample_rate
+
+
+class PostProcessingChain:
+    """按顺序执行的后处理阶段组合"""
+
+    def __init__(self, stages: Iterable[Stage] = ()):
+        self.logger = logging.getLogger(__name__)
+        self.stages: List[Stage] = list(stages)
+
+    def add(self, stage: Stage) -> "PostProcessingChain":
+        self.stages.append(stage)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def __call__(self, audio: Any, sample_rate: int) -> Tuple[Any, int]:
+        """执行所有阶段，返回 (float32 音频数组, 采样率)
+
+        输入已是可写的 float32 数组时直接在原数组上处理，否则先转换一次（整数PCM缩放到 [-1, 1]）。
+        """
+        import numpy as np
+        audio = as_frames(audio)
+        if audio.dtype != np.float32:
+            audio = as_float32(audio)
+        elif not audio.flags.writeable:
+            audio = audio.copy()
+        for stage in self.stages:
+            started = time.perf_counter()
+            audio, sample_rate = stage.process(audio, sample_rate)
+            self.logger.debug(f"后处理 {stage.name} 耗时: {(time.perf_counter() - started) * 1000:.1f} ms")
+        return audio, sample_rate
+
+    def __repr__(self):
+        return f"PostProcessingChain({self.stages})"
+
+
+def build_chain(config_manager) -> PostProcessingChain:
+    """按配置 [audio] 组合后处理阶段：裁剪静音 -> 重采样 -> 归一化 -> 淡入淡出"""
+    def get(key: str, fallback: str) -> str:
+        return config_manager.get_value("audio", key, fallback)
+
+    chain = PostProcessingChain()
+    if config_manager.get_bool("audio", "trim_silence", True):
+        chain.add(TrimSilence(threshold_db=float(get("silence_threshold_db", "-60"))))
+    target_rate = int(get("sample_rate", "0"))
+    if target_rate:
+        chain.add(Resample(target_rate))
+    normalize = get("normalize", "lufs").lower()
+    if normalize == "peak":
+        chain.add(NormalizePeak(float(get("peak_db", "-1"))))
+    elif normalize == "lufs":
+        chain.add(NormalizeLoudness(float(get("target_lufs", "-14")), float(get("peak_db", "-1"))))
+    elif normalize != "none":
+        logging.getLogger(__name__).warning(f"⚠️ 未知的归一化方式 {normalize}，不做归一化")
+    fade_in, fade_out = float(get("fade_in_ms", "10")), float(get("fade_out_ms", "500"))
+    if fade_in or fade_out:
+        chain.add(Fade(fade_in, fade_out))
+    return chain
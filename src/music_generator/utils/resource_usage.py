@@ -0,0 +1,36 @@
+import os
+import sys
+from typing import Optional
+
+
+def current_rss_bytes() -> Optional[int]:
+    """获取当前进程的常驻内存（RSS），无法获取时返回None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    # Linux：直接读取 /proc，无需额外依赖
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        pass
+    return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """获取当前进程的峰值常驻内存，无法获取时返回None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return getattr(info, "peak_wset", info.rss)
+        except ImportError:
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回KB
+    return peak if sys.platform == "darwin" else peak * 1024
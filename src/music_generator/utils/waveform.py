@@ -0,0 +1,121 @@
+from typing import Any, List, Optional, Tuple
+
+from .audio_stream import as_frames
+
+# 第0级每个峰值覆盖的帧数
+BASE_BLOCK = 256
+
+
+class PeakPyramid:
+    """波形的 min/max 峰值金字塔
+
+    第0级每 BASE_BLOCK 帧保存一对 (最小值, 最大值)（所有声道合并），之后每一级把相邻两对合并。
+    绘制时按每像素覆盖的帧数选择合适的级别，只需处理与像素数同数量级的数据，任意缩放级别都是 O(像素数)；
+    放大到每像素不足 BASE_BLOCK 帧时直接读取原始采样（最多 BASE_BLOCK × 像素数 帧）。
+    """
+
+    def __init__(self, levels: List[Any], frames: int, sample_rate: int, base_block: int = BASE_BLOCK,
+                 audio: Any = None):
+        self.levels = levels  # 每级为 (n, 2) 的 float32 数组
+        self.audio = audio  # 原始音频（帧视图，不复制）
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.base_block = base_block
+
+    @classmethod
+    def build(cls, audio: Any, sample_rate: int, base_block: int = BASE_BLOCK) -> "PeakPyramid":
+        """对整段音频做一次向量化计算"""
+        import numpy as np
+        frames = as_frames(audio)
+        count = -(-len(frames) // base_block)
+        if count == 0:
+            return cls([np.zeros((1, 2), dtype=np.float32)], 0, sample_rate, base_block)
+        # 末尾不足一块的部分用最后一帧补齐，不影响最小/最大值
+        padded = frames
+        if len(frames) % base_block:
+            tail = np.repeat(frames[-1:], count * base_block - len(frames), axis=0)
+            padded = np.concatenate([frames, tail])
+        blocks = padded.reshape(count, -1)
+        level = np.stack([blocks.min(axis=1), blocks.max(axis=1)], axis=1).astype(np.float32)
+        levels = [level]
+        while len(level) > 1:
+            if len(level) % 2:
+                level = np.concatenate([level, level[-1:]])
+            pairs = level.reshape(-1, 2, 2)
+            level = np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+            levels.append(level)
+        return cls(levels, len(frames), sample_rate, base_block, frames)
+
+    def peaks(self, width: int, start: int = 0, end: Optional[int] = None) -> Tuple[Any, Any]:
+        """返回 [start, end) 帧范围在 width 个像素上的 (最小值数组, 最大值数组)"""
+        import numpy as np
+        end = self.frames if end is None else min(end, self.frames)
+        width = max(1, width)
+        if end <= start or self.frames == 0:
+            zeros = np.zeros(width, dtype=np.float32)
+            return zeros, zeros
+        frames_per_pixel = (end - start) / width
+        if frames_per_pixel < self.base_block and self.audio is not None:
+            raw = self.audio[start:end]
+            if raw.ndim == 2:
+                data_min, data_max = raw.min(axis=1), raw.max(axis=1)
+            else:
+                data_min = data_max = raw
+        else:
+            # 选择每个条目覆盖的帧数不超过每像素帧数的最粗级别
+            index = 0
+            while (index + 1 < len(self.levels)
+                   and self.base_block * 2 ** (index + 1) <= frames_per_pixel):
+                index += 1
+            block = self.base_block * 2 ** index
+            first = start // block
+            data = self.levels[index][first:max(first + 1, -(-end // block))]
+            data_min, data_max = data[:, 0], data[:, 1]
+        # 每个像素对应一段数据，用 reduceat 一次性归并
+        edges = np.linspace(0, len(data_min), width + 1)[:-1].astype(np.int64)
+        return np.minimum.reduceat(data_min, edges), np.maximum.reduceat(data_max, edges)
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+
+def peak_pyramid(audio_buffer) -> PeakPyramid:
+    """获取音频对象的峰值金字塔（每段音频只计算一次，缓存在音频对象上）"""
+    return audio_buffer.cached("peak_pyramid",
+                               lambda: PeakPyramid.build(audio_buffer.samples, audio_buffer.sample_rate))
+
+
+def spectrogram(audio: Any, sample_rate: int, width: int = 320, height: int = 64, n_fft: int = 1024):
+    """计算频谱缩略图：返回 (height, width) 的 0~1 数组，行从高频到低频
+
+    按宽度均匀取 width 个窗口做 STFT（不对每一帧都做变换），频率轴按对数刻度取 height 行。
+    """
+    import numpy as np
+    frames = as_frames(audio)
+    mono = frames.mean(axis=1) if frames.ndim == 2 else frames
+    if len(mono) < n_fft:
+        mono = np.pad(mono, (0, n_fft - len(mono)))
+    starts = np.linspace(0, len(mono) - n_fft, width).astype(np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(mono, n_fft)[starts]
+    spectrum = np.abs(np.fft.rfft(windows * np.hanning(n_fft).astype(np.float32), axis=1))
+    # 对数频率刻度：20Hz 到奈奎斯特频率
+    bins = spectrum.shape[1]
+    low = max(1, int(20 * n_fft / sample_rate))
+    rows = np.geomspace(low, bins - 1, height).astype(np.int64)[::-1]
+    db = 20 * np.log10(spectrum[:, rows].T + 1e-9)
+    top = db.max()
+    return np.clip((db - (top - 80)) / 80, 0.0, 1.0).astype(np.float32)
+
+
+def spectrogram_ppm(image: Any) -> bytes:
+    """把 0~1 的频谱数组转为彩色 PPM 图像字节（可直接交给 tk.PhotoImage），可在后台线程中调用"""
+    import numpy as np
+    # 简单的深蓝 -> 紫 -> 橙 -> 黄 色阶
+    stops = np.array([[0, 0, 32], [96, 16, 128], [224, 96, 48], [255, 240, 160]], dtype=np.float32)
+    position = image * (len(stops) - 1)
+    index = np.minimum(position.astype(np.int64), len(stops) - 2)
+    fraction = (position - index)[..., None]
+    rgb = stops[index] * (1 - fraction) + stops[index + 1] * fraction
+    height, width = image.shape
+    return f"P6 {width} {height} 255\n".encode("ascii") + rgb.astype(np.uint8).tobytes()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试非阻塞音频播放引擎：播放、暂停/继续、跳转和停止（使用空音频设备）
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator.utils.audio_player import AudioPlayer, NullAudioOutput, PlaybackState
+
+SAMPLE_RATE = 1000
+
+
+def make_player(realtime=True):
+    """每块 100 帧（0.1 秒），realtime=True 时按实际速度播放"""
+    states = []
+    output = NullAudioOutput(realtime=realtime)
+    player = AudioPlayer(output=output, block_frames=100, on_state_change=states.append)
+    return player, output, states
+
+
+def test_play_to_end():
+    player, output, states = make_player(realtime=False)
+    audio = np.zeros((2 * SAMPLE_RATE, 2), dtype=np.float32)
+    player.play(audio, SAMPLE_RATE)
+    assert player.wait(5)
+    assert output.frames_written == len(audio)
+    assert (output.sample_rate, output.channels) == (SAMPLE_RATE, 2)
+    assert player.state == PlaybackState.STOPPED
+    assert states == [PlaybackState.PLAYING, PlaybackState.STOPPED]
+    assert player.duration == 2.0
+
+
+def test_pause_and_resume(wait_until):
+    player, output, states = make_player()
+    player.play(np.zeros(3 * SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+    wait_until(lambda: output.frames_written >= 200)
+    player.pause()
+    assert player.state == PlaybackState.PAUSED
+    # 暂停时正在写入的块写完后不再前进
+    time.sleep(0.2)
+    paused_at = output.frames_written
+    time.sleep(0.3)
+    assert output.frames_written == paused_at
+    assert round(player.position * SAMPLE_RATE) == paused_at
+
+    player.toggle_pause()
+    assert player.state == PlaybackState.PLAYING
+    wait_until(lambda: output.frames_written > paused_at)
+    player.stop()
+    assert states[:3] == [PlaybackState.PLAYING, PlaybackState.PAUSED, PlaybackState.PLAYING]
+
+
+def test_seek_skips_audio(wait_until):
+    player, output, _ = make_player()
+    audio = np.zeros(3 * SAMPLE_RATE, dtype=np.float32)
+    player.play(audio, SAMPLE_RATE)
+    wait_until(lambda: output.frames_written >= 100)
+    player.seek(2.5)
+    assert player.position >= 2.5
+    assert player.wait(5)
+    # 跳过了中间的大部分音频
+    assert output.frames_written < len(audio) - SAMPLE_RATE
+    assert player.state == PlaybackState.STOPPED
+
+    # 跳转位置限制在音频范围内
+    player.seek(-1)
+    assert player.position == 0.0
+    player.seek(100)
+    assert player.position == 3.0
+
+
+def test_stop_ends_playback_thread(wait_until):
+    player, output, states = make_player()
+    player.play(np.zeros(10 * SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+    wait_until(lambda: output.frames_written >= 100)
+    player.pause()
+    # 暂停中也能停止，播放线程立即退出
+    player.stop()
+    assert player.wait(0)
+    assert player.state == PlaybackState.STOPPED
+    assert states[-1] == PlaybackState.STOPPED
+    stopped_at = output.frames_written
+    time.sleep(0.2)
+    assert output.frames_written == stopped_at
+    # 再次停止不会重复通知
+    player.stop()
+    assert states.count(PlaybackState.STOPPED) == 1
+
+
+def test_stream_starts_on_first_chunk(wait_until):
+    player, output, states = make_player(realtime=False)
+    player.open_stream(SAMPLE_RATE)
+    assert player.state == PlaybackState.STOPPED
+    player.feed(np.ones(250, dtype=np.float32))
+    # 第一块到达即开始播放，播放到已收到的末尾后等待后续的块
+    assert player.state == PlaybackState.PLAYING
+    wait_until(lambda: output.frames_written == 250)
+    time.sleep(0.1)
+    assert player.state == PlaybackState.PLAYING and output.frames_written == 250
+
+    player.feed(np.ones(150, dtype=np.float32))
+    wait_until(lambda: output.frames_written == 400)
+    player.end_stream()
+    assert player.wait(5)
+    assert player.duration == 0.4
+    assert states == [PlaybackState.PLAYING, PlaybackState.STOPPED]
+    # 流结束后追加的块被忽略
+    player.feed(np.ones(100, dtype=np.float32))
+    assert player.duration == 0.4
+
+
+def test_processor_plays_stream_while_generating():
+    from src.music_generator.utils.audio_processor import AudioProcessor
+    from src.music_generator.utils.audio_buffer import AudioBuffer
+
+    player, output, _ = make_player(realtime=False)
+    processor = AudioProcessor(player=player)
+    played_before_second = []
+
+    def chunks():
+        yield np.zeros(300, dtype=np.float32)
+        # 生成第二块时第一块已经在播放
+        played_before_second.append(player.state)
+        yield np.ones(200, dtype=np.float32)
+
+    started = []
+    audio, streamed = processor.play_stream(AudioBuffer(chunks(), SAMPLE_RATE), on_started=lambda: started.append(1))
+    assert streamed and started == [1]
+    assert played_before_second == [PlaybackState.PLAYING]
+    assert audio.sample_rate == SAMPLE_RATE and audio.frames == 500
+    assert player.wait(5) and output.frames_written == 500
+
+    # 整段数组不走流式播放
+    samples = np.zeros(100, dtype=np.float32)
+    assert processor.play_stream(samples) == (samples, False)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试模型管道后端：按配置选择后端、模拟管道的输出、缓存标识随实际加载的模型变化
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator.models.backends import ModelScopeBackend, StubBackend, create_backend
+from src.music_generator.models.modelscope_client import ModelScopeClient
+
+
+def test_create_backend_follows_config(config_manager):
+    assert isinstance(create_backend(config_manager, client=None), ModelScopeBackend)
+
+    config_manager.config.set("modelscope", "backend", "stub")
+    config_manager.config["stub"] = {"duration_s": "0.5", "latency_s": "0", "sample_rate": "8000"}
+    backend = create_backend(config_manager, client=None)
+    assert isinstance(backend, StubBackend)
+    assert (backend.duration_s, backend.sample_rate) == (0.5, 8000)
+
+    # 未知的后端名退回 modelscope
+    config_manager.config.set("modelscope", "backend", "unknown")
+    assert isinstance(create_backend(config_manager, client=None), ModelScopeBackend)
+
+
+def test_stub_pipeline_output():
+    pipeline = StubBackend(duration_s=0.5, sample_rate=8000).load()
+    single = pipeline("钢琴曲")
+    assert single["sample_rate"] == 8000
+    assert single["output_audio"].shape == (4000,)
+    assert single["output_audio"].dtype == np.float32
+
+    batch = pipeline(["钢琴曲", "吉他曲", "交响乐"])
+    assert batch["output_audio"].shape == (3, 4000)
+    assert batch["output_audio"].dtype == np.float32
+    # 相同的提示词和参数得到相同的音频，批量和逐条一致
+    np.testing.assert_array_equal(batch["output_audio"][0], single["output_audio"])
+    assert not np.array_equal(batch["output_audio"][0], batch["output_audio"][1])
+    assert not np.array_equal(pipeline("钢琴曲", steps=10)["output_audio"], single["output_audio"])
+
+
+def test_stub_cache_identity_depends_on_settings():
+    assert StubBackend(duration_s=1.0).cache_identity() != StubBackend(duration_s=2.0).cache_identity()
+    assert StubBackend(sample_rate=8000).cache_identity() != StubBackend(sample_rate=16000).cache_identity()
+
+
+def test_modelscope_cache_identity_follows_resolved_model(config_manager, monkeypatch):
+    client = ModelScopeClient(config_manager, inference_mode="thread")
+    backend = client.backend
+    assert isinstance(backend, ModelScopeBackend)
+    # 尚不知道实际使用的模型
+    assert backend.cache_identity() is None
+
+    # 解析缓存中记录了上次成功加载的组合（例如由推理子进程写入）
+    client.resolution_cache.put(client._resolution_key(), "ASLP-lab/DiffRhythm-base", None, None)
+    assert backend.cache_identity() == ("ASLP-lab/DiffRhythm-base", None, None)
+
+    # 加载时配置的模型失败、退回了其他模型：缓存标识随之变化
+    def load_fallback():
+        client._resolved_model = {"model_id": "facebook/musicgen-melody", "revision": None,
+                                  "task": "text_to_audio"}
+        return StubBackend(duration_s=0.1).load()
+
+    monkeypatch.setattr(client, "_load_modelscope_pipeline", load_fallback)
+    client.get_pipeline()
+    assert backend.cache_identity() == ("facebook/musicgen-melody", None, "text_to_audio")
+    client.shutdown()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试批量生成：支持列表输入的管道每个小批次只推理一次，输出按条拆分
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator.models.backends import StubBackend
+from src.music_generator.models.modelscope_client import ModelScopeClient
+
+
+class RecordingBackend(StubBackend):
+    """记录每次调用管道时的 text_inputs"""
+
+    def __init__(self, fail_first_load=False):
+        super().__init__(duration_s=0.1, sample_rate=8000)
+        self.calls = []
+        self.fail_first_load = fail_first_load
+
+    def load(self):
+        if self.fail_first_load:
+            self.fail_first_load = False
+            raise RuntimeError("模拟加载失败")
+        pipeline = super().load()
+
+        def run(text_inputs, **params):
+            self.calls.append(text_inputs)
+            return pipeline(text_inputs, **params)
+        return run
+
+
+def make_client(config_manager, backend):
+    client = ModelScopeClient(config_manager, inference_mode="thread", backend=backend)
+    client.result_cache = None
+    return client
+
+
+def test_batch_calls_pipeline_once_per_chunk(config_manager):
+    backend = RecordingBackend()
+    client = make_client(config_manager, backend)
+    prompts = ["a", "b", "c", "d"]
+    results = client.generate_batch(prompts, batch_size=4)
+
+    assert backend.calls == [prompts]
+    single = backend.load()
+    for prompt, result in zip(prompts, results):
+        assert result["batch_size"] == 4 and not result["cached"]
+        assert result["output_audio"].shape == (800,)
+        np.testing.assert_array_equal(result["output_audio"], single(prompt)["output_audio"])
+    assert client._batch_supported is True
+    client.shutdown()
+
+
+def test_load_failure_only_affects_current_call(config_manager):
+    backend = RecordingBackend(fail_first_load=True)
+    client = make_client(config_manager, backend)
+    # 加载失败时本批退回逐条推理（逐条推理时重新加载成功），不记住“不支持批量”
+    results = client.generate_batch(["a", "b"], batch_size=2)
+    assert all("error" not in result for result in results)
+    assert backend.calls == ["a", "b"]
+    assert client._batch_supported is not False
+
+    backend.calls.clear()
+    client.generate_batch(["c", "d"], batch_size=2)
+    assert backend.calls == [["c", "d"]]
+    client.shutdown()
+
+
+def test_split_batch_output():
+    split = ModelScopeClient._split_batch_output
+    mono = {"output_audio": np.zeros((2, 100)), "sample_rate": 8000}
+    assert [r["output_audio"].shape for r in split(mono, 2)] == [(100,), (100,)]
+    assert split(mono, 2)[0]["sample_rate"] == 8000
+    stereo_batch = {"output_audio": np.zeros((3, 2, 100))}
+    assert [r["output_audio"].shape for r in split(stereo_batch, 3)] == [(2, 100)] * 3
+    # 只有一条提示词时 (2, N) 是一条立体声音频
+    assert split({"output_audio": np.zeros((2, 100))}, 1)[0]["output_audio"].shape == (2, 100)
+    assert split({"output_audio": np.zeros((1, 100))}, 1)[0]["output_audio"].shape == (100,)
+    # 批维度与条数不符时无法拆分
+    assert split({"output_audio": np.zeros((3, 100))}, 2) is None
+    assert split({"text": "x"}, 2) is None
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试无界面批量生成入口：不支持的输出格式在开始推理之前就报错
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator import cli
+
+
+def test_unsupported_format_rejected_before_inference(tmp_path, monkeypatch, capsys):
+    def fail(*args, **kwargs):
+        raise AssertionError("不应创建模型客户端")
+    monkeypatch.setattr(cli, "ModelScopeClient", fail)
+
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["-o", str(tmp_path / "out"), "-f", "xyz", "--config", str(tmp_path / "config.ini")])
+    assert exc.value.code == 2
+    assert "xyz" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试任务调度器：按顺序执行、队列已满时拒绝、取消排队中的任务和关闭
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator.utils.job_scheduler import JobScheduler, JobStatus, QueueFullError
+
+
+def start_blocked(scheduler, wait_until):
+    """提交一个阻塞的任务并等待它开始运行，返回 (任务, 放行事件)"""
+    release = threading.Event()
+    job = scheduler.submit(release.wait, 10)
+    wait_until(lambda: scheduler.running_count() == 1)
+    return job, release
+
+
+def test_jobs_run_in_order_and_report_results():
+    scheduler = JobScheduler(workers=1, max_queue=8, name="test")
+    try:
+        order = []
+        jobs = [scheduler.submit(lambda i=i: order.append(i) or i * 2) for i in range(5)]
+        failing = scheduler.submit(lambda: 1 / 0)
+        for job in jobs + [failing]:
+            assert job.wait(5)
+        assert order == list(range(5))
+        assert [job.result for job in jobs] == [0, 2, 4, 6, 8]
+        assert failing.status == JobStatus.FAILED
+        assert isinstance(failing.error, ZeroDivisionError)
+        stats = scheduler.get_stats()
+        assert (stats["done"], stats["failed"], stats["queue_depth"], stats["running"]) == (5, 1, 0, 0)
+    finally:
+        scheduler.shutdown()
+
+
+def test_queue_full_rejects_submit(wait_until):
+    scheduler = JobScheduler(workers=1, max_queue=2, name="test")
+    try:
+        running, release = start_blocked(scheduler, wait_until)
+        # 正在运行的任务不占用队列名额
+        queued = [scheduler.submit(lambda: None) for _ in range(2)]
+        assert scheduler.queue_depth() == 2
+        with pytest.raises(QueueFullError):
+            scheduler.submit(lambda: None)
+        assert scheduler.get_stats()["rejected"] == 1
+
+        # 取消一个排队中的任务后腾出名额
+        assert scheduler.cancel(queued[0].job_id)
+        extra = scheduler.submit(lambda: "extra")
+        release.set()
+        assert extra.wait(5) and extra.result == "extra"
+        assert running.status == JobStatus.DONE
+    finally:
+        scheduler.shutdown()
+
+
+def test_cancel_only_affects_queued_jobs(wait_until):
+    scheduler = JobScheduler(workers=1, max_queue=4, name="test")
+    try:
+        running, release = start_blocked(scheduler, wait_until)
+        executed = []
+        queued = scheduler.submit(lambda: executed.append("queued"))
+        callbacks = []
+        queued.add_done_callback(lambda job: callbacks.append(job.status))
+
+        assert scheduler.cancel(queued.job_id)
+        assert queued.status == JobStatus.CANCELLED
+        assert queued.wait(0)
+        assert callbacks == [JobStatus.CANCELLED]
+        assert scheduler.queue_depth() == 0
+        # 正在运行、已结束和未知的任务都不能取消
+        assert not scheduler.cancel(running.job_id)
+        assert not scheduler.cancel(queued.job_id)
+        assert not scheduler.cancel("test-999999")
+
+        release.set()
+        assert running.wait(5)
+        follow_up = scheduler.submit(lambda: executed.append("follow-up"))
+        assert follow_up.wait(5)
+        # 被取消的任务不会被执行
+        assert executed == ["follow-up"]
+        assert scheduler.get_stats()["cancelled"] == 1
+    finally:
+        scheduler.shutdown()
+
+
+def test_shutdown_cancels_pending_jobs(wait_until):
+    scheduler = JobScheduler(workers=1, max_queue=4, name="test")
+    running, release = start_blocked(scheduler, wait_until)
+    pending = [scheduler.submit(lambda: None) for _ in range(3)]
+    scheduler.shutdown(wait=False)
+    # 正在运行的任务不受影响
+    release.set()
+    assert running.wait(5) and running.status == JobStatus.DONE
+    assert all(job.status == JobStatus.CANCELLED for job in pending)
+    with pytest.raises(RuntimeError):
+        scheduler.submit(lambda: None)
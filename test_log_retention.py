@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试日志保留策略：压缩过和未压缩的日志文件混合时按写入时间保留最新的文件
+"""
+
+import gzip
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator.utils.logging_config import LOG_PREFIX, LogRotationPolicy, apply_retention, compress_log
+
+DAY = 86400
+
+
+def make_logs(log_dir, ages_days):
+    """创建轮转出的日志文件，ages_days[i] 为第 i 个文件距今的天数（序号越大越新）"""
+    now = time.time()
+    paths = []
+    for index, age in enumerate(ages_days):
+        path = log_dir / f"{LOG_PREFIX}20240101_000000_{index}.log"
+        path.write_text(f"log {index}\n", encoding="utf-8")
+        os.utime(path, (now - age * DAY, now - age * DAY))
+        paths.append(path)
+    return paths
+
+
+def test_compress_keeps_modification_time(tmp_path):
+    path = make_logs(tmp_path, [3])[0]
+    mtime = path.stat().st_mtime
+    target = compress_log(path)
+    assert not path.exists()
+    assert abs(target.stat().st_mtime - mtime) < 1
+    with gzip.open(target, "rt", encoding="utf-8") as f:
+        assert f.read() == "log 0\n"
+
+
+def test_max_files_keeps_newest_across_compressed_files(tmp_path):
+    paths = make_logs(tmp_path, [9, 8, 7, 6, 5, 4, 3])
+    # 较旧的文件先压缩，压缩顺序与写入顺序无关
+    for path in reversed(paths[:5]):
+        compress_log(path)
+    policy = LogRotationPolicy(max_files=3, max_total_bytes=0, max_age_days=0)
+    apply_retention(policy, tmp_path)
+    remaining = sorted(p.name for p in tmp_path.iterdir())
+    assert remaining == sorted([f"{LOG_PREFIX}20240101_000000_4.log.gz",
+                                f"{LOG_PREFIX}20240101_000000_5.log",
+                                f"{LOG_PREFIX}20240101_000000_6.log"])
+
+
+def test_max_age_counts_from_write_time(tmp_path):
+    old, recent, current = make_logs(tmp_path, [40, 10, 0])
+    compress_log(old)
+    compress_log(recent)
+    policy = LogRotationPolicy(max_files=0, max_total_bytes=0, max_age_days=30)
+    removed = apply_retention(policy, tmp_path, keep=[current])
+    assert [p.name for p in removed] == [old.name + ".gz"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([recent.name + ".gz", current.name])
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试生成结果缓存：命中、残留临时文件的清理，以及缓存标识不重复计算
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator.models import resolution_cache
+from src.music_generator.models.modelscope_client import ModelScopeClient
+from src.music_generator.models.result_cache import ResultCache
+
+
+def test_put_and_get(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = cache.make_key("钢琴曲", "model", None, seed=1)
+    assert cache.get(key) is None
+    assert cache.put(key, {"output_audio": np.ones(100, dtype=np.float32), "sample_rate": 8000})
+    result = ResultCache(str(tmp_path)).get(key)
+    assert result["sample_rate"] == 8000
+    np.testing.assert_array_equal(result["output_audio"], np.ones(100, dtype=np.float32))
+
+
+def test_scan_ignores_and_removes_leftover_tmp_files(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = cache.make_key("钢琴曲", "model", None)
+    cache.put(key, {"output_audio": np.ones(100, dtype=np.float32)})
+    results_dir = tmp_path / "results"
+    stale = results_dir / f"{key}.123.tmp.npz"
+    fresh = results_dir / f"{key}.456.tmp.npz"
+    for path in (stale, fresh):
+        path.write_bytes(b"x" * 4096)
+    old = time.time() - ResultCache.STALE_TMP_SECONDS - 60
+    os.utime(stale, (old, old))
+
+    reopened = ResultCache(str(tmp_path))
+    assert list(reopened._entries) == [key]
+    assert reopened._total_bytes == (results_dir / f"{key}.npz").stat().st_size
+    # 过期的临时文件被删除，刚写入的（可能属于其他进程）保留
+    assert not stale.exists() and fresh.exists()
+
+
+def test_cache_identity_is_not_recomputed(config_manager, monkeypatch):
+    client = ModelScopeClient(config_manager, inference_mode="thread")
+    client.resolution_cache.put(client._resolution_key(), "ASLP-lab/DiffRhythm-base", None, None)
+    lookups = []
+    original = resolution_cache.get_library_version
+    monkeypatch.setattr(resolution_cache, "get_library_version", lambda name: lookups.append(name) or original(name))
+    loads = []
+    original_load = resolution_cache.json.load
+    monkeypatch.setattr(resolution_cache.json, "load", lambda f: loads.append(f) or original_load(f))
+
+    for _ in range(5):
+        assert client._result_cache_key("钢琴曲", None, {}) is not None
+    assert lookups == []
+    assert len(loads) <= 1
+    client.shutdown()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试本地HTTP生成服务：参数校验（400）、队列已满（429）和相同进行中请求的合并
+"""
+
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.music_generator.models.backends import StubBackend
+from src.music_generator.models.modelscope_client import ModelScopeClient
+from src.music_generator.server import GenerationService, create_server
+from src.music_generator.utils.audio_processor import AudioProcessor
+
+
+class GatedBackend(StubBackend):
+    """模拟后端：推理在 release 被设置之前一直阻塞，用于让任务保持在运行中"""
+
+    def __init__(self):
+        super().__init__(duration_s=0.2, sample_rate=8000)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def load(self):
+        pipeline = super().load()
+
+        def run(text_inputs, **params):
+            self.calls += 1
+            self.release.wait(10)
+            return pipeline(text_inputs, **params)
+        return run
+
+
+def start_service(config_manager, workers=1, max_queue=4):
+    backend = GatedBackend()
+    client = ModelScopeClient(config_manager, inference_mode="thread", backend=backend)
+    client.result_cache = None
+    service = GenerationService(client, AudioProcessor.from_config(config_manager),
+                                workers=workers, max_queue=max_queue)
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        backend.release.set()
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+        client.shutdown()
+    return server, service, backend, stop
+
+
+def post(server, body):
+    """发送 POST /generate，返回 (状态码, 响应头, 响应体)"""
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/generate", data=data)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_invalid_requests_return_400(config_manager):
+    server, service, backend, stop = start_service(config_manager)
+    try:
+        for body in (b"[1, 2]", b'"prompt"', b"not json", {"prompt": ""}, {"prompt": "a", "format": "xyz"},
+                     {"prompt": "a", "params": [1]}, {"prompt": "a", "seed": "1"}, {"prompt": "a", "seed": True}):
+            status, _, payload = post(server, body)
+            assert status == 400, body
+            assert "error" in json.loads(payload)
+        assert backend.calls == 0
+    finally:
+        stop()
+
+
+def test_queue_full_returns_429(config_manager, wait_until):
+    server, service, backend, stop = start_service(config_manager, workers=1, max_queue=1)
+    try:
+        running, _ = service.submit("running")
+        wait_until(lambda: service.scheduler.running_count() == 1)
+        queued, _ = service.submit("queued")
+        status, _, payload = post(server, {"prompt": "rejected"})
+        assert status == 429
+        assert "error" in json.loads(payload)
+        assert service.queue_stats()["rejected"] == 1
+
+        backend.release.set()
+        assert running.wait(10) and queued.wait(10)
+    finally:
+        stop()
+
+
+def test_identical_inflight_requests_are_coalesced(config_manager, wait_until):
+    server, service, backend, stop = start_service(config_manager)
+    try:
+        first, coalesced = service.submit("same prompt", 7, {"steps": 10})
+        assert not coalesced
+        second, coalesced = service.submit("  Same prompt ", 7, {"steps": 10})
+        assert coalesced and second is first
+        other, coalesced = service.submit("same prompt", 8, {"steps": 10})
+        assert not coalesced and other is not first
+
+        # 通过HTTP发送的相同请求也等待同一个任务
+        results = []
+        thread = threading.Thread(target=lambda: results.append(post(server, {"prompt": "same prompt", "seed": 7,
+                                                                              "params": {"steps": 10}})))
+        thread.start()
+        wait_until(lambda: service.queue_stats()["coalesced"] == 2)
+        backend.release.set()
+        thread.join(10)
+
+        status, headers, audio = results[0]
+        assert status == 200
+        assert headers["X-Job-Id"] == first.job_id
+        assert headers["X-Coalesced"] == "1"
+        assert audio[:4] == b"RIFF"
+        assert first.wait(10) and audio == first.result
+        # 任务结束后相同请求会重新推理
+        assert other.wait(10)
+        wait_until(lambda: service.queue_stats()["inflight"] == 0)
+        again, coalesced = service.submit("same prompt", 7, {"steps": 10})
+        assert not coalesced and again is not first
+        assert again.wait(10)
+    finally:
+        stop()
+
+
+def test_health_reports_pipeline_readiness(config_manager):
+    server, service, backend, stop = start_service(config_manager)
+    try:
+        def health():
+            url = f"http://127.0.0.1:{server.server_port}/health"
+            with urllib.request.urlopen(url, timeout=10) as response:
+                return json.loads(response.read())
+        assert health()["pipeline_loaded"] is False
+        backend.release.set()
+        job, _ = service.submit("warm")
+        assert job.wait(10)
+        assert health()["pipeline_loaded"] is True
+    finally:
+        stop()
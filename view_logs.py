@@ -6,15 +6,23 @@
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
+import logging
 import sys
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 
 # 添加项目路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
 
-from src.music_generator.utils.logging_config import get_existing_logs, read_log_file
+from src.music_generator.utils.logging_config import follow_log_file, get_existing_logs, tail_log_file
+from src.music_generator.utils.log_index import LogIndex, format_entries, parse_time
+
+# 最多显示的行数
+MAX_LINES = 1000
+# 检索时可选的最低日志级别
+LEVEL_CHOICES = ["全部", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 
 
 def main():
@@ -46,6 +54,8 @@ def main():
     
     # 获取日志文件列表
     log_files = get_existing_logs()
+    # 当前显示的日志文件及已读取到的位置，刷新时只读取之后新追加的内容
+    current = {"log": None, "offset": 0}
     
     if not log_files:
         ttk.Label(selection_frame, text="暂无日志文件", foreground="red").pack()
@@ -66,8 +76,11 @@ def main():
                 log_names = [log_file.name for log_file in log_files]
                 log_combo['values'] = log_names
                 log_combo.current(0)
-                # 更新日志内容显示
-                update_log_content()
+                if log_files[0] == current["log"]:
+                    # 仍是同一个文件时只追加新内容
+                    append_new_lines()
+                else:
+                    update_log_content()
             else:
                 log_combo['values'] = []
                 text_area.delete(1.0, tk.END)
@@ -75,6 +88,79 @@ def main():
         
         refresh_btn = ttk.Button(selection_frame, text="刷新", command=refresh_logs)
         refresh_btn.pack(side=tk.LEFT)
+        
+        # 自动刷新：每秒追加当前文件新写入的日志行
+        follow_var = tk.BooleanVar(value=False)
+        
+        def follow_tick():
+            if follow_var.get():
+                append_new_lines()
+                root.after(1000, follow_tick)
+        
+        follow_check = ttk.Checkbutton(selection_frame, text="自动刷新", variable=follow_var,
+                                       command=follow_tick)
+        follow_check.pack(side=tk.LEFT, padx=(10, 0))
+    
+    # 检索区域：按级别、时间范围和关键字跨所有日志文件检索
+    search_frame = ttk.LabelFrame(main_frame, text="检索所有日志", padding="10")
+    search_frame.pack(fill=tk.X, pady=(0, 10))
+    
+    ttk.Label(search_frame, text="级别≥").pack(side=tk.LEFT)
+    level_var = tk.StringVar(value=LEVEL_CHOICES[0])
+    ttk.Combobox(search_frame, textvariable=level_var, values=LEVEL_CHOICES, state="readonly",
+                 width=9).pack(side=tk.LEFT, padx=(0, 10))
+    ttk.Label(search_frame, text="从").pack(side=tk.LEFT)
+    start_var = tk.StringVar()
+    ttk.Entry(search_frame, textvariable=start_var, width=17).pack(side=tk.LEFT, padx=(0, 5))
+    ttk.Label(search_frame, text="到").pack(side=tk.LEFT)
+    end_var = tk.StringVar()
+    ttk.Entry(search_frame, textvariable=end_var, width=17).pack(side=tk.LEFT, padx=(0, 10))
+    ttk.Label(search_frame, text="关键字").pack(side=tk.LEFT)
+    keyword_var = tk.StringVar()
+    keyword_entry = ttk.Entry(search_frame, textvariable=keyword_var, width=18)
+    keyword_entry.pack(side=tk.LEFT, padx=(0, 10))
+    
+    # 索引保存在 logs/.index 中，每次检索只解析新追加的日志
+    log_index = LogIndex()
+    
+    def show_search_result(content):
+        search_btn.config(state=tk.NORMAL)
+        # 显示检索结果时不再自动追加当前文件的新内容
+        current["log"] = None
+        text_area.config(state=tk.NORMAL)
+        text_area.delete(1.0, tk.END)
+        text_area.insert(tk.END, content)
+        text_area.config(state=tk.DISABLED)
+        text_area.see(tk.END)
+    
+    def search_logs(event=None):
+        if str(search_btn["state"]) == tk.DISABLED:
+            return  # 上一次检索尚未完成
+        level = level_var.get()
+        try:
+            start, end = parse_time(start_var.get()), parse_time(end_var.get())
+        except ValueError as e:
+            messagebox.showwarning("时间格式", str(e))
+            return
+        min_level = 0 if level == LEVEL_CHOICES[0] else getattr(logging, level)
+        text = keyword_var.get().strip() or None
+        search_btn.config(state=tk.DISABLED)
+        
+        # 在后台线程中检索，避免大文件或压缩日志阻塞界面
+        def worker():
+            try:
+                entries = log_index.search(min_level=min_level, start=start, end=end, text=text, limit=MAX_LINES)
+                content = format_entries(entries) if entries else "没有符合条件的日志记录"
+            except Exception as e:
+                content = f"检索日志失败: {e}"
+            root.after(0, lambda: show_search_result(content))
+        
+        threading.Thread(target=worker, name="log-search", daemon=True).start()
+    
+    keyword_entry.bind("<Return>", search_logs)
+    search_btn = ttk.Button(search_frame, text="检索", command=search_logs)
+    search_btn.pack(side=tk.LEFT)
+    ttk.Button(search_frame, text="返回文件", command=lambda: update_log_content()).pack(side=tk.LEFT, padx=(5, 0))
     
     # 日志内容显示区域
     content_frame = ttk.LabelFrame(main_frame, text="日志内容", padding="10")
@@ -97,13 +183,37 @@ def main():
         text_area.config(state=tk.NORMAL)
         text_area.delete(1.0, tk.END)
         
-        log_content = read_log_file(selected_log, max_lines=1000)  # 只显示最后1000行
+        try:
+            # 只显示最后1000行，从文件末尾向前读取，不读取整个文件
+            log_content, current["offset"] = tail_log_file(selected_log, max_lines=MAX_LINES)
+        except Exception as e:
+            log_content, current["offset"] = [f"无法读取日志文件: {str(e)}"], 0
+        current["log"] = selected_log
         text_area.insert(tk.END, ''.join(log_content))
         text_area.config(state=tk.DISABLED)
         
         # 滚动到顶部
         text_area.yview_moveto(0)
     
+    # 追加当前日志文件中新写入的行
+    def append_new_lines():
+        if current["log"] is None:
+            return
+        try:
+            new_lines, current["offset"] = follow_log_file(current["log"], current["offset"])
+        except OSError:
+            return
+        if not new_lines:
+            return
+        text_area.config(state=tk.NORMAL)
+        text_area.insert(tk.END, ''.join(new_lines))
+        # 超过最大行数时删除最早的行
+        excess = int(text_area.index('end-1c').split('.')[0]) - MAX_LINES - 1
+        if excess > 0:
+            text_area.delete(1.0, f"{excess + 1}.0")
+        text_area.config(state=tk.DISABLED)
+        text_area.see(tk.END)
+    
     # 绑定下拉框选择事件
     def on_log_selected(event):
         update_log_content()